@@ -0,0 +1,118 @@
+"""Generation of express version statistics from pre-aggregated article sets.
+
+Generation of the same statistics as article_stat_gen but using a DataAccessor such that queries
+run against pre-aggregated article sets instead of scanning individual articles. Pre-aggregated
+counts are exact so approximate queries get the same values with an error bound of zero.
+
+License: BSD
+"""
+
+import typing
+
+import approx_util
+import data_util
+
+ESTIMATES = typing.Dict[str, approx_util.Estimate]
+
+
+class AccessorStatGenerator:
+    """Utility to generate express statistics from a DataAccessor."""
+
+    def __init__(self, accessor: data_util.DataAccessor):
+        """Create a new generator.
+
+        Args:
+            accessor: The accessor through which aggregate statistics are queried.
+        """
+        self._accessor = accessor
+
+    def get_accessor(self) -> data_util.DataAccessor:
+        """Get the accessor through which statistics are queried.
+
+        Returns:
+            The accessor given at construction.
+        """
+        return self._accessor
+
+    def execute(self, params: typing.Dict) -> typing.Dict[str, float]:
+        """Execute a query and generate summary statistics to describe the resulting aggregation.
+
+        Args:
+            params: Dictionary with parameters describing the query using the same keys as
+                article_stat_gen.StatGenerator.
+
+        Returns:
+            Mapping from group to percent of matching articles in that group where group may be
+            country, tag, category, keyword, etc. Percents are given from 0 to 1.
+        """
+        if 'queryStringParameters' in params:
+            params = params['queryStringParameters']
+
+        query = make_query(params)
+        result = self._accessor.execute_query(query)
+
+        dimension = params.get('dimension', '')
+        if dimension == 'country':
+            return self._get_percent_of_totals(result.get_countries(), result.get_country_totals())
+        elif dimension == 'month':
+            return self._get_percent_of_totals(result.get_buckets(), result.get_bucket_totals())
+
+        groups_getter = {
+            'keyword': lambda: result.get_keywords(),
+            'tag': lambda: result.get_tags(),
+            'category': lambda: result.get_categories()
+        }.get(dimension, None)
+
+        if groups_getter is None:
+            return {}
+
+        total = result.get_total_count()
+        if total == 0:
+            return {}
+
+        return dict(map(lambda x: (x.get_name(), x.get_count() / total), groups_getter()))
+
+    def execute_approximate(self, params: typing.Dict) -> ESTIMATES:
+        """Execute a query asking for statistics with error bounds like StatGenerator.
+
+        Args:
+            params: Dictionary with parameters describing the query using the same keys as
+                article_stat_gen.StatGenerator.
+
+        Returns:
+            Mapping from group to percent of matching articles in that group as exact estimates
+            given that pre-aggregated counts need no sketches.
+        """
+        return dict(map(
+            lambda x: (x[0], approx_util.make_exact(x[1])),
+            self.execute(params).items()
+        ))
+
+    def _get_percent_of_totals(self, groups: data_util.COUNTED_GROUPS,
+        group_totals: data_util.COUNTED_GROUPS) -> typing.Dict[str, float]:
+        totals = dict(map(lambda x: (x.get_name(), x.get_count()), group_totals))
+        return dict(map(
+            lambda x: (x.get_name(), x.get_count() / totals[x.get_name()]),
+            groups
+        ))
+
+
+def make_query(params: typing.Dict) -> data_util.Query:
+    """Convert express query parameters to a Query.
+
+    Args:
+        params: Dictionary with optional keyword, tag, category, and country along with optional
+            start and end months (like 2024-01) which are inclusive.
+
+    Returns:
+        Query which filters by the parameters where category is applied as a pre-category filter.
+    """
+    return data_util.Query(
+        None,
+        params.get('category', None),
+        params.get('country', None),
+        params.get('tag', None),
+        params.get('keyword', None),
+        params.get('start', None),
+        params.get('end', None)
+    )
@@ -0,0 +1,350 @@
+"""Sketches which approximate aggregate statistics in bounded memory for very large corpora.
+
+Sketches which approximate distinct counts (HyperLogLog) and the most frequent values (Space-Saving)
+using memory which does not grow with the number of articles. Each estimate reports bounds such that
+callers can show how far results may be from those of exact counting. Values are hashed with a
+stable hash so that estimates are the same across runs.
+
+License: BSD
+"""
+
+import hashlib
+import heapq
+import math
+import typing
+
+DEFAULT_PRECISION = 12
+DEFAULT_CAPACITY = 1000
+ERROR_SIGMAS = 3
+SPARSE_FRACTION = 0.25
+HASH_BITS = 64
+MAX_RATIO = 1.0
+
+COUNT_ESTIMATE = typing.Tuple[str, 'Estimate']
+
+
+class Estimate:
+    """Approximate value along with bounds in which the true value is expected to fall."""
+
+    def __init__(self, value: float, low: float, high: float):
+        """Create a new record of an estimate.
+
+        Args:
+            value: The estimated value.
+            low: The smallest value which the true value is expected to take.
+            high: The largest value which the true value is expected to take.
+        """
+        self._value = value
+        self._low = low
+        self._high = high
+
+    def get_value(self) -> float:
+        """Get the estimated value.
+
+        Returns:
+            The best estimate of the true value.
+        """
+        return self._value
+
+    def get_low(self) -> float:
+        """Get the lower bound of the estimate.
+
+        Returns:
+            The smallest value which the true value is expected to take.
+        """
+        return self._low
+
+    def get_high(self) -> float:
+        """Get the upper bound of the estimate.
+
+        Returns:
+            The largest value which the true value is expected to take.
+        """
+        return self._high
+
+    def get_error(self) -> float:
+        """Get the largest distance between the estimate and either of its bounds.
+
+        Returns:
+            Absolute error bound which is zero if the estimate is exact.
+        """
+        return max(self._value - self._low, self._high - self._value)
+
+
+class HyperLogLog:
+    """Sketch which estimates the number of distinct values seen using fixed memory.
+
+    Sketch which, like HyperLogLog++, keeps the hashes of values while there are few of them such
+    that small counts are exact (up to hash collisions). Once more than SPARSE_FRACTION of the
+    number of registers are seen, hashes are replaced by registers and counts are estimated.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        """Create a new empty sketch.
+
+        Args:
+            precision: Number of hash bits used to pick a register. The sketch uses about
+                2 ** precision bytes with a relative standard error of 1.04 / sqrt(2 ** precision).
+        """
+        self._precision = precision
+        self._num_registers = 2 ** precision
+        self._registers = bytearray(self._num_registers)
+        self._sparse: typing.Optional[typing.Set[int]] = set()
+
+    def add(self, value: str):
+        """Record that a value was seen.
+
+        Args:
+            value: The value like a URL. Values seen before do not change the estimate.
+        """
+        self._add_hash(get_hash(value))
+
+    def merge(self, other: 'HyperLogLog'):
+        """Add all of the values seen by another sketch to this one.
+
+        Args:
+            other: The sketch to merge into this one which must have the same precision.
+        """
+        if other._precision != self._precision:
+            raise RuntimeError('Cannot merge sketches of different precision.')
+
+        if other._sparse is not None:
+            for hashed in other._sparse:
+                self._add_hash(hashed)
+        else:
+            self._make_dense()
+            self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def get_relative_error(self) -> float:
+        """Get the relative standard error of the estimate.
+
+        Returns:
+            Standard error as a fraction of the estimate like 0.016 for 1.6%.
+        """
+        return 1.04 / math.sqrt(self._num_registers)
+
+    def get_estimate(self) -> Estimate:
+        """Estimate the number of distinct values seen.
+
+        Returns:
+            Estimate with bounds at ERROR_SIGMAS standard errors or exact if few values were seen.
+        """
+        if self._sparse is not None:
+            return make_exact(len(self._sparse))
+
+        # Improved estimator from Ertl (2017) which avoids bias where linear counting hands off.
+        num_registers = self._num_registers
+        max_rank = HASH_BITS - self._precision + 1
+        rank_counts = [0] * (max_rank + 1)
+        for rank in self._registers:
+            rank_counts[rank] += 1
+
+        denominator = num_registers * _tau(1 - rank_counts[max_rank] / num_registers)
+        for rank in range(max_rank - 1, 0, -1):
+            denominator = 0.5 * (denominator + rank_counts[rank])
+
+        denominator += num_registers * _sigma(rank_counts[0] / num_registers)
+        value = num_registers * num_registers / (2 * math.log(2) * denominator)
+
+        error = value * self.get_relative_error() * ERROR_SIGMAS
+        return Estimate(value, max(value - error, 0), value + error)
+
+    def _add_hash(self, hashed: int):
+        if self._sparse is not None:
+            self._sparse.add(hashed)
+            if len(self._sparse) > self._num_registers * SPARSE_FRACTION:
+                self._make_dense()
+            return
+
+        remaining_bits = HASH_BITS - self._precision
+        index = hashed >> remaining_bits
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def _make_dense(self):
+        sparse = self._sparse
+        if sparse is None:
+            return
+
+        self._sparse = None
+        for hashed in sparse:
+            self._add_hash(hashed)
+
+
+class SpaceSaving:
+    """Sketch which finds the most frequent values and their counts using fixed memory.
+
+    Sketch which tracks at most capacity values. When a new value arrives while full, it replaces
+    the tracked value with the smallest count and inherits that count as its error. Counts never
+    underestimate, overestimate by at most the recorded error, and any value occurring more than
+    total / capacity times is guaranteed to be tracked. Counts are exact if there are no more
+    distinct values than the capacity.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """Create a new empty sketch.
+
+        Args:
+            capacity: The maximum number of values to track.
+        """
+        self._capacity = capacity
+        self._counts: typing.Dict[str, int] = {}
+        self._errors: typing.Dict[str, int] = {}
+        self._heap: typing.List[typing.Tuple[int, str]] = []
+        self._total = 0
+
+    def add(self, value: str, count: int = 1):
+        """Record that a value was seen.
+
+        Args:
+            value: The value like a tag or keyword.
+            count: The number of times it was seen.
+        """
+        self._total += count
+
+        if value in self._counts:
+            self._counts[value] += count
+        elif len(self._counts) < self._capacity:
+            self._counts[value] = count
+            self._errors[value] = 0
+        else:
+            evicted, evicted_count = self._pop_smallest()
+            del self._counts[evicted]
+            del self._errors[evicted]
+            self._counts[value] = evicted_count + count
+            self._errors[value] = evicted_count
+
+        heapq.heappush(self._heap, (self._counts[value], value))
+
+        # Entries for prior counts are skipped lazily so rebuild before the heap grows unbounded.
+        if len(self._heap) > self._capacity * 4:
+            self._heap = list(map(lambda x: (x[1], x[0]), self._counts.items()))
+            heapq.heapify(self._heap)
+
+    def get_total(self) -> int:
+        """Get the total count of all values seen.
+
+        Returns:
+            Exact sum of counts added.
+        """
+        return self._total
+
+    def get_untracked_bound(self) -> int:
+        """Get the largest count which a value not reported by get_top could have.
+
+        Returns:
+            The smallest tracked count if values were evicted and zero otherwise.
+        """
+        if len(self._counts) < self._capacity:
+            return 0
+        else:
+            return min(self._counts.values())
+
+    def get_top(self, limit: typing.Optional[int] = None) -> typing.List[COUNT_ESTIMATE]:
+        """Get the tracked values with the largest counts.
+
+        Args:
+            limit: The maximum number of values to return or None to return all tracked values.
+
+        Returns:
+            List of value and count estimate from largest to smallest count.
+        """
+        ordered = sorted(self._counts.items(), key=lambda x: (-x[1], x[0]))
+        if limit is not None:
+            ordered = ordered[:limit]
+
+        return list(map(
+            lambda x: (x[0], Estimate(x[1], x[1] - self._errors[x[0]], x[1])),
+            ordered
+        ))
+
+    def _pop_smallest(self) -> typing.Tuple[str, int]:
+        while True:
+            count, value = heapq.heappop(self._heap)
+            if self._counts.get(value, None) == count:
+                return (value, count)
+
+
+def get_hash(value: str) -> int:
+    """Get a stable hash of a value.
+
+    Args:
+        value: The value to hash.
+
+    Returns:
+        Integer with HASH_BITS bits which, unlike hash, is the same across runs.
+    """
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=HASH_BITS // 8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def divide(numerator: Estimate, denominator: Estimate,
+    max_ratio: float = MAX_RATIO) -> Estimate:
+    """Estimate a ratio like a percent of articles from two estimates.
+
+    Args:
+        numerator: The estimate on top like the count of articles with a tag.
+        denominator: The estimate on bottom like the count of matching articles.
+        max_ratio: The largest value the true ratio may take. Defaults to MAX_RATIO as the
+            numerator usually counts a subset of what the denominator counts.
+
+    Returns:
+        Estimate of the ratio with bounds covering every combination of the input bounds (the upper
+        bound clamped to max_ratio unless the estimate itself is larger) or zero if the denominator
+        is zero.
+    """
+    if denominator.get_value() == 0:
+        return Estimate(0, 0, 0)
+
+    value = numerator.get_value() / denominator.get_value()
+    low = numerator.get_low() / denominator.get_high()
+    if denominator.get_low() > 0:
+        high = min(numerator.get_high() / denominator.get_low(), max_ratio)
+    else:
+        high = max_ratio
+
+    return Estimate(value, min(low, value), max(high, value))
+
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return math.inf
+
+    multiplier = 1.0
+    ret_sum = x
+    while True:
+        x = x * x
+        prior_sum = ret_sum
+        ret_sum += x * multiplier
+        multiplier += multiplier
+        if ret_sum == prior_sum:
+            return ret_sum
+
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0
+
+    multiplier = 1.0
+    ret_sum = 1 - x
+    while True:
+        x = math.sqrt(x)
+        prior_sum = ret_sum
+        multiplier *= 0.5
+        ret_sum -= (1 - x) ** 2 * multiplier
+        if ret_sum == prior_sum:
+            return ret_sum / 3
+
+
+def make_exact(value: float) -> Estimate:
+    """Make an estimate for a value which is known exactly.
+
+    Args:
+        value: The value.
+
+    Returns:
+        Estimate with both bounds equal to the value.
+    """
+    return Estimate(value, value, value)
@@ -3,12 +3,25 @@
 License: BSD
 """
 
+import base64
+import binascii
+import bisect
 import codecs
 import csv
+import hashlib
+import heapq
 import io
+import itertools
+import json
+import mmap
+import multiprocessing
 import os
+import random
+import sys
 import typing
 
+import chunk_util
+
 boto_available = False
 try:
     import boto3  # type: ignore
@@ -16,6 +29,9 @@ try:
 except:
     boto_available = False
 
+parallel_available = sys.platform != 'emscripten'
+mmap_available = sys.platform != 'emscripten'
+
 COLS = (
     'url',
     'published',
@@ -24,11 +40,35 @@ COLS = (
 )
 OBJ_BUCKET = 'gafj-topic-explorer'
 OBJ_PATH = 'articles.csv'
+LOCAL_PATH = os.path.join('csv', 'articles.csv')
+CHUNK_BYTES = 4 * 1024 * 1024
+DATASET_VERSION_LENGTH = 20
+FILTER_KEYS = ('keyword', 'tag', 'category', 'country')
+VALUE_SEPARATOR = ';'
+MONTH_LENGTH = 7
+DATE_KEYS = ('start', 'end')
+NO_FILTER_VALUES = {'', 'all'}
+CACHE_CONTROL = 'public, max-age=3600'
+CURSOR_HEADER = 'X-Next-Cursor'
+EXPOSE_HEADERS = 'ETag, ' + CURSOR_HEADER
+
+SEED = typing.Optional[typing.Union[int, str]]
 
 
 class Article:
     """Record with details of a single article's metadata."""
 
+    __slots__ = (
+        '_url',
+        '_title_original',
+        '_title_english',
+        '_published',
+        '_country',
+        '_keywords',
+        '_tags',
+        '_categories'
+    )
+
     def __init__(self, url: str, title_original: str, title_english: str, published: str,
         country: str, keywords: typing.List[str], tags: typing.List[str],
         categories: typing.List[str]):
@@ -134,6 +174,42 @@ class Article:
         }
 
 
+class LazyArticle(Article):
+    """Compact article record over the fields of a raw row which splits lists only when accessed.
+
+    Holds only the original strings from the article table such that rows discarded by filters or
+    serialized without inspecting their lists never allocate per-item strings. Lists are split
+    again on each access and so callers needing them repeatedly should keep the returned list.
+    """
+
+    __slots__ = ('_keywords_raw', '_tags_raw', '_categories_raw')
+
+    def __init__(self, pieces: typing.Sequence[str]):
+        """Create a new record from a row split on tabs.
+
+        Args:
+            pieces: The eight fields of the row in article table order (url, title_original,
+                title_english, published, country, keywords, tags, categories).
+        """
+        self._url = pieces[0]
+        self._title_original = pieces[1]
+        self._title_english = pieces[2]
+        self._published = pieces[3]
+        self._country = pieces[4]
+        self._keywords_raw = pieces[5]
+        self._tags_raw = pieces[6]
+        self._categories_raw = pieces[7]
+
+    def get_keywords(self) -> typing.List[str]:
+        return self._keywords_raw.split(';')
+
+    def get_tags(self) -> typing.List[str]:
+        return self._tags_raw.split(';')
+
+    def get_categories(self) -> typing.List[str]:
+        return self._categories_raw.split(';')
+
+
 class ArticleGetter:
     """Abstract base class for a strategy to query and filter articles."""
 
@@ -162,55 +238,198 @@ class ArticleGetter:
         """
         return self._make_response(self.execute_to_obj(params))
 
+    def execute_to_page(self, params: typing.Dict, limit: int, offset: int = 0,
+        seed: SEED = None) -> typing.List[Article]:
+        """Execute a query and return only a page of the matching articles.
+
+        Articles are streamed from the source such that no more than offset + limit matching
+        articles are held in memory at a time.
+
+        Args:
+            params: Dictionary describing the query.
+            limit: The maximum number of articles to return.
+            offset: The number of matching articles to skip before the page starts.
+            seed: If given, a uniform random sample is taken with articles in a random order
+                determined by this seed such that pages with the same seed do not overlap. If None,
+                articles are given in source order.
+
+        Returns:
+            Up to limit matching Article objects.
+        """
+        return select_page(self.execute_to_obj(params), limit, offset, seed)
+
+    def execute_to_cursor_page(self, params: typing.Dict, limit: int,
+        cursor: typing.Optional[str]) -> typing.Tuple[typing.List[Article], typing.Optional[str]]:
+        """Execute a query and return the next page of matching articles in source order.
+
+        Scanning starts at the byte offset encoded in the cursor such that later pages do not
+        rescan the source from the start.
+
+        Args:
+            params: Dictionary describing the query.
+            limit: The maximum number of articles to return.
+            cursor: Continuation token returned with the prior page or None for the first page.
+
+        Returns:
+            Tuple of up to limit matching Article objects and the continuation token for the next
+            page or None if the source was exhausted.
+
+        Raises:
+            ValueError: Raised if the cursor is malformed or from a different dataset version.
+        """
+        dataset_version = self.get_dataset_version()
+        start = 0 if cursor is None else decode_cursor(cursor, dataset_version)
+        position = start
+
+        def track_position(lines: typing.Iterable[bytes]) -> typing.Iterable[str]:
+            nonlocal position
+            for line in lines:
+                position += len(line)
+                yield line.decode('utf-8')
+
+        query_params = self._get_query_params(params)
+        source_lines = iter(self._get_source_bytes(start))
+        input_lines = track_position(source_lines)
+        matching = self._execute_query(query_params, input_lines)
+
+        articles = list(itertools.islice(matching, limit))
+
+        # A page ending on the last row gives no cursor as a range starting at the end of the file
+        # is rejected by S3 (InvalidRange).
+        exhausted = len(articles) < limit or next(source_lines, None) is None
+        if exhausted:
+            return (articles, None)
+        else:
+            return (articles, encode_cursor(position, dataset_version))
+
+    def execute_to_export(self, params: typing.Dict) -> typing.Dict:
+        """Execute a query and return a Lambda compatible export which is paginated if requested.
+
+        Args:
+            params: Dictionary describing the query which, if it includes a limit parameter, causes
+                only a page of results to be returned starting at the optional cursor parameter.
+
+        Returns:
+            Lambda compatible HTTP response with a CSV body and, if paginated with more results
+            remaining, a header with the cursor for the next page.
+        """
+        query_params = self._get_query_params(params)
+        if 'limit' not in query_params:
+            return make_response(self.execute_to_obj(params))
+
+        try:
+            limit = int(query_params['limit'])
+            if limit < 1:
+                raise ValueError('Limit must be positive.')
+
+            articles, next_cursor = self.execute_to_cursor_page(
+                params,
+                limit,
+                query_params.get('cursor', None)
+            )
+        except ValueError:
+            return make_bad_request_response('Invalid limit or cursor.')
+
+        response = make_response(articles)
+        if next_cursor is not None:
+            response['headers'][CURSOR_HEADER] = next_cursor
+            response['headers']['Access-Control-Expose-Headers'] = EXPOSE_HEADERS
+
+        return response
+
+    def get_dataset_version(self) -> str:
+        """Get a string which changes whenever the underlying articles change.
+
+        Returns:
+            Opaque version string for the article source.
+        """
+        raise RuntimeError('Use implementor.')
+
     def _parse_row(self, target_str: str) -> typing.Optional[Article]:
-        pieces = target_str.split('\t')
+        pieces = target_str.rstrip('\r\n').split('\t')
         if len(pieces) != 8:
             return None
 
-        return Article(
-            pieces[0],
-            pieces[1],
-            pieces[2],
-            pieces[3],
-            pieces[4],
-            pieces[5].split(';'),
-            pieces[6].split(';'),
-            pieces[7].split(';')
-        )
+        return LazyArticle(pieces)
 
     def _execute_query(self, query_params: typing.Dict[str, str],
         input_lines: typing.Iterable[str]) -> typing.Iterable[Article]:
-        articles_with_none = map(lambda x: self._parse_row(x), input_lines)
-        articles = filter(lambda x: x is not None, articles_with_none)  # type: ignore
-
-        if 'keyword' in query_params:
-            target_keyword = query_params['keyword']
-            articles = filter(
-                lambda x: target_keyword in x.get_keywords(),  # type: ignore
-                articles
+        matching = self._execute_query_rows(query_params, input_lines)
+        return map(lambda x: x[1], matching)
+
+    def _execute_query_rows(self, query_params: typing.Dict[str, str],
+        input_lines: typing.Iterable[str]) -> typing.Iterable[typing.Tuple[str, Article]]:
+        targets = dict(map(
+            lambda x: (x, frozenset(query_params[x].split(VALUE_SEPARATOR))),
+            filter(lambda x: x in query_params, FILTER_KEYS)
+        ))
+
+        # Cheap substring checks on the raw line: any line matching all filters must contain a value
+        # from every filter so other lines are rejected before splitting. Exact checks follow.
+        candidate_lines: typing.Iterable[str] = input_lines
+        if all(map(lambda x: len(x) == 1, targets.values())):
+            required_values = [value for values in targets.values() for value in values]
+            if required_values:
+                candidate_lines = filter(
+                    lambda x: all(map(x.__contains__, required_values)),
+                    input_lines
+                )
+        else:
+            required_options = list(targets.values())
+            candidate_lines = filter(
+                lambda x: all(map(lambda y: any(map(x.__contains__, y)), required_options)),
+                input_lines
+            )
+
+        rows_with_none = map(lambda x: (x, self._parse_row(x)), candidate_lines)
+        rows = filter(lambda x: x[1] is not None, rows_with_none)
+
+        if 'keyword' in targets:
+            target_keywords = targets['keyword']
+            rows = filter(
+                lambda x: not target_keywords.isdisjoint(x[1].get_keywords()),  # type: ignore
+                rows
+            )
+
+        if 'tag' in targets:
+            target_tags = targets['tag']
+            rows = filter(
+                lambda x: not target_tags.isdisjoint(x[1].get_tags()),  # type: ignore
+                rows
             )
 
-        if 'tag' in query_params:
-            target_tag = query_params['tag']
-            articles = filter(lambda x: target_tag in x.get_tags(), articles)  # type: ignore
+        if 'category' in targets:
+            target_categories = targets['category']
+            rows = filter(
+                lambda x: not target_categories.isdisjoint(x[1].get_categories()),  # type: ignore
+                rows
+            )
+
+        if 'country' in targets:
+            target_countries = targets['country']
+            rows = filter(
+                lambda x: x[1].get_country() in target_countries,  # type: ignore
+                rows
+            )
 
-        if 'category' in query_params:
-            target_category = query_params['category']
-            articles = filter(
-                lambda x: target_category in x.get_categories(),  # type: ignore
-                articles
+        # Months in ISO8601 order lexically so ranges compare the month prefix of publish dates.
+        if 'start' in query_params:
+            start_month = query_params['start'][:MONTH_LENGTH]
+            rows = filter(
+                lambda x: x[1].get_published()[:MONTH_LENGTH] >= start_month,  # type: ignore
+                rows
             )
 
-        if 'country' in query_params:
-            target_country = query_params['country']
-            articles = filter(
-                lambda x: x.get_country() == target_country,  # type: ignore
-                articles
+        if 'end' in query_params:
+            end_month = query_params['end'][:MONTH_LENGTH]
+            rows = filter(
+                lambda x: x[1].get_published()[:MONTH_LENGTH] <= end_month,  # type: ignore
+                rows
             )
 
-        articles = filter(lambda x: x.get_url() != 'url', articles)  # type: ignore
+        rows = filter(lambda x: x[1].get_url() != 'url', rows)  # type: ignore
 
-        return articles  # type: ignore
+        return rows  # type: ignore
 
     def _get_query_params(self, target: typing.Dict) -> typing.Dict:
         raise RuntimeError('Use implementor.')
@@ -218,6 +437,9 @@ class ArticleGetter:
     def _get_source(self) -> typing.Iterable[str]:
         raise RuntimeError('Use implementor.')
 
+    def _get_source_bytes(self, offset: int) -> typing.Iterable[bytes]:
+        raise RuntimeError('Use implementor.')
+
     def _make_response(self, matching: typing.Iterable[Article]) -> typing.Dict:
         raise RuntimeError('Use implementor.')
 
@@ -225,8 +447,44 @@ class ArticleGetter:
 class AwsLambdaArticleGetter(ArticleGetter):
     """Getter which queries for data from S3 and returns a Lambda HTTP response."""
 
+    def __init__(self):
+        """Create a new getter for a single Lambda invocation."""
+        self._dataset_version = None
+
+    def execute_to_native(self, params: typing.Dict):
+        """Execute a query and return a Lambda HTTP response, honoring If-None-Match.
+
+        Args:
+            params: The Lambda event describing the query including optional limit and cursor
+                parameters for pagination (see execute_to_export).
+
+        Returns:
+            Lambda compatible HTTP response which is empty with status 304 if the client already
+            has the current version of the export.
+        """
+        etag = make_etag('export', self._get_query_params(params), self.get_dataset_version())
+        if get_has_etag_match(params, etag):
+            return make_not_modified_response(etag)
+
+        response = self.execute_to_export(params)
+        if response['statusCode'] == 200:
+            add_cache_headers(response, etag)
+
+        return response
+
+    def get_dataset_version(self) -> str:
+        if not boto_available:
+            raise RuntimeError('Please install boto before lambda handler use.')
+
+        if self._dataset_version is None:
+            client = boto3.client('s3')
+            head = client.head_object(Bucket=OBJ_BUCKET, Key=OBJ_PATH)
+            self._dataset_version = head['ETag']
+
+        return self._dataset_version
+
     def _get_query_params(self, target: typing.Dict) -> typing.Dict:
-        return target['queryStringParameters']
+        return canonicalize_params(target.get('queryStringParameters', None))
 
     def _get_source(self) -> typing.Iterable[str]:
         if not boto_available:
@@ -238,49 +496,423 @@ class AwsLambdaArticleGetter(ArticleGetter):
         stream_reader = codecs.getreader('utf-8')
         return stream_reader(body)
 
-    def _make_response(self, matching: typing.Iterable[Article]):
-        csv_str = self._make_csv_str(matching)
-
-        res = {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'text/csv',
-                'Content-Disposition': 'attachment',
-                'filename': 'articles_export.csv',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': csv_str
-        }
-        return res
-
-    def _make_csv_str(self, articles: typing.Iterable[Article]) -> str:
-        articles_dicts = map(lambda x: x.to_dict(), articles)
-
-        output_target = io.StringIO()
+    def _get_source_bytes(self, offset: int) -> typing.Iterable[bytes]:
+        if not boto_available:
+            raise RuntimeError('Please install boto before lambda handler use.')
 
-        writer = csv.DictWriter(output_target, fieldnames=COLS, extrasaction='ignore')
-        writer.writeheader()
-        writer.writerows(articles_dicts)
+        client = boto3.client('s3')
+        obj = client.get_object(Bucket=OBJ_BUCKET, Key=OBJ_PATH, Range='bytes=%d-' % offset)
+        return split_lines(obj['Body'].iter_chunks())
 
-        return output_target.getvalue()
+    def _make_response(self, matching: typing.Iterable[Article]):
+        return make_response(matching)
 
 
 class LocalArticleGetter(ArticleGetter):
     """Getter which queries for articles from a file and returns Article objects."""
 
+    def get_dataset_version(self) -> str:
+        stat = os.stat(LOCAL_PATH)
+        return '%d-%d' % (stat.st_mtime_ns, stat.st_size)
+
     def _get_query_params(self, target: typing.Dict) -> typing.Dict:
-        return target
+        return canonicalize_params(target)
 
     def _get_source(self) -> typing.Iterable[str]:
-        with open(os.path.join('csv', 'articles.csv')) as f:
-            lines = f.readlines()
+        with open(LOCAL_PATH) as f:
+            for line in f:
+                yield line
 
-        return lines
+    def _get_source_bytes(self, offset: int) -> typing.Iterable[bytes]:
+        with open(LOCAL_PATH, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                yield line
 
     def _make_response(self, matching: typing.Iterable[Article]):
         return list(matching)
 
 
+class PreloadedArticleGetter(LocalArticleGetter):
+    """Getter which reads the articles file once and queries against it in memory.
+
+    Every query, including cursor pages and exports, reads the rows held in memory such that
+    changes to the file on disk are not seen until a new getter is created. Rows are given the byte
+    offsets they would have in a file holding the same rows and the dataset version is a hash of
+    those rows such that cursors and ETags describe the data served.
+    """
+
+    def __init__(self):
+        """Create a new getter, reading the articles file immediately."""
+        self._lines: typing.List[str] = []
+        self._line_starts: typing.List[int] = []
+        self._size = 0
+        self._digest = hashlib.sha256()
+        self._add_lines(super()._get_source())
+
+    def apply_delta(self, lines: typing.Iterable[str]):
+        """Add new article rows to those held in memory without rereading the file.
+
+        Args:
+            lines: The new rows in the article table format where any header row is ignored.
+        """
+        self._add_lines(lines)
+
+    def get_dataset_version(self) -> str:
+        return self._digest.hexdigest()[:DATASET_VERSION_LENGTH]
+
+    def _get_source(self) -> typing.Iterable[str]:
+        return self._lines
+
+    def _get_source_bytes(self, offset: int) -> typing.Iterable[bytes]:
+        start = bisect.bisect_left(self._line_starts, offset)
+        for line in self._lines[start:]:
+            yield line.encode('utf-8')
+
+    def _add_lines(self, lines: typing.Iterable[str]):
+        for line in lines:
+            terminated = line if line.endswith('\n') else line + '\n'
+            encoded = terminated.encode('utf-8')
+            self._lines.append(terminated)
+            self._line_starts.append(self._size)
+            self._size += len(encoded)
+            self._digest.update(encoded)
+
+
+class OffsetArticleGetter(LocalArticleGetter):
+    """Getter which reads only the rows starting at known byte offsets in the articles file.
+
+    Getter which seeks directly to rows (like those found by data_util.DataAccessor.get_offsets)
+    such that the cost of a query is proportional to the number of candidate rows rather than the
+    size of the file. Rows are still filtered by the query. The file is memory mapped if available
+    (see mmap_available) and read with seeks otherwise.
+    """
+
+    def __init__(self, offsets: typing.List[int]):
+        """Create a new getter.
+
+        Args:
+            offsets: Ascending byte offsets at which candidate rows start in the articles file.
+        """
+        self._offsets = offsets
+
+    def _get_source(self) -> typing.Iterable[str]:
+        with open(LOCAL_PATH, 'rb') as f:
+            if mmap_available and os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset in self._offsets:
+                        yield self._read_mapped(mapped, offset)
+            else:
+                for offset in self._offsets:
+                    self._check_offset(f, offset)
+                    f.seek(offset)
+                    yield f.readline().decode('utf-8')
+
+    def _read_mapped(self, mapped: mmap.mmap, offset: int) -> str:
+        if offset > 0 and mapped[offset - 1] != ord('\n'):
+            raise RuntimeError('Offset %d is not the start of a row. Rebuild offsets.' % offset)
+
+        end = mapped.find(b'\n', offset)
+        return mapped[offset:(len(mapped) if end == -1 else end + 1)].decode('utf-8')
+
+    def _check_offset(self, f: typing.BinaryIO, offset: int):
+        if offset == 0:
+            return
+
+        f.seek(offset - 1)
+        if f.read(1) != b'\n':
+            raise RuntimeError('Offset %d is not the start of a row. Rebuild offsets.' % offset)
+
+
+class ParallelArticleGetter(LocalArticleGetter):
+    """Getter which filters line-aligned chunks of the articles file in a process pool.
+
+    Getter which splits the articles file into byte ranges aligned to line boundaries and parses /
+    filters each in a worker process, yielding matches in file order. Workers return only the raw
+    matching lines which are cheap to transfer and chunks are capped in size such that each worker
+    only holds one bounded chunk's matches at a time. Starting the pool and transferring lines costs
+    more than it saves without several cores so this is only used when requested (see
+    local_stream_handler). Not available in the browser (see parallel_available).
+    """
+
+    def __init__(self, workers: typing.Optional[int] = None, chunk_bytes: int = CHUNK_BYTES):
+        """Create a new getter.
+
+        Args:
+            workers: The number of worker processes or None to use one per core.
+            chunk_bytes: The approximate maximum size of a chunk given to a worker at once.
+        """
+        self._workers = workers
+        self._chunk_bytes = chunk_bytes
+
+    def execute_to_obj(self, params: typing.Dict) -> typing.Iterable[Article]:
+        query_params = self._get_query_params(params)
+
+        num_workers = self._workers if self._workers else (os.cpu_count() or 1)
+        num_chunks = max(num_workers, os.path.getsize(LOCAL_PATH) // self._chunk_bytes + 1)
+        ranges = chunk_util.get_line_aligned_ranges(LOCAL_PATH, num_chunks)
+        tasks = [(LOCAL_PATH, start, end, query_params) for start, end in ranges]
+
+        return self._execute_tasks(tasks)
+
+    def _execute_tasks(self, tasks: typing.List[typing.Tuple]) -> typing.Iterable[Article]:
+        with multiprocessing.Pool(self._workers) as pool:
+            for matching_lines in pool.imap(_filter_range, tasks):
+                for line in matching_lines:
+                    article = self._parse_row(line)
+                    assert article is not None
+                    yield article
+
+
+def canonicalize_params(params: typing.Optional[typing.Dict]) -> typing.Dict[str, str]:
+    """Normalize query parameters so that equivalent queries have equal parameters.
+
+    Parameter names are lower cased, surrounding whitespace is removed, and values indicating no
+    filter (empty or "all" in any case) are dropped. Filter values holding multiple values joined by
+    VALUE_SEPARATOR are deduplicated and sorted. Values are otherwise left unchanged as filters
+    match them exactly.
+
+    Args:
+        params: The raw query parameters or None if no parameters were given.
+
+    Returns:
+        The canonical query parameters.
+    """
+    if params is None:
+        return {}
+
+    def canonicalize_value(key: str, value: str) -> str:
+        if key not in FILTER_KEYS:
+            return value
+
+        values = map(lambda x: x.strip(), value.split(VALUE_SEPARATOR))
+        return VALUE_SEPARATOR.join(sorted(set(filter(lambda x: x != '', values))))
+
+    stripped = map(lambda x: (str(x[0]).strip().lower(), str(x[1]).strip()), params.items())
+    canonical = map(lambda x: (x[0], canonicalize_value(x[0], x[1])), stripped)
+    allowed = filter(lambda x: x[1].lower() not in NO_FILTER_VALUES, canonical)
+    return dict(allowed)
+
+
+def select_page(articles: typing.Iterable[Article], limit: int, offset: int = 0,
+    seed: SEED = None) -> typing.List[Article]:
+    """Select a page of articles from a stream of articles.
+
+    If sampling, each article is given a random key from the seeded generator as it streams by and
+    only the offset + limit articles with the smallest keys are retained (a reservoir sample). The
+    page is then taken in key order so that the same seed gives consistent non-overlapping pages.
+
+    Args:
+        articles: The articles from which to select.
+        limit: The maximum number of articles to return.
+        offset: The number of articles to skip before the page starts.
+        seed: The seed with which to sample or None to take articles in the order given.
+
+    Returns:
+        Up to limit articles.
+    """
+    if seed is None:
+        return list(itertools.islice(articles, offset, offset + limit))
+
+    randomizer = random.Random(seed)
+    keyed = map(lambda x: (randomizer.random(), x), articles)
+    retained = heapq.nsmallest(offset + limit, keyed, key=lambda x: x[0])
+    return list(map(lambda x: x[1], retained[offset:]))
+
+
+def split_lines(chunks: typing.Iterable[bytes]) -> typing.Iterable[bytes]:
+    """Split a stream of arbitrary byte chunks into lines.
+
+    Args:
+        chunks: The chunks in order like those read from an HTTP response body.
+
+    Returns:
+        Iterable over lines including their line endings.
+    """
+    remainder = b''
+    for chunk in chunks:
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+
+    if remainder:
+        yield remainder
+
+
+def encode_cursor(offset: int, dataset_version: str) -> str:
+    """Make an opaque continuation token for a paginated export.
+
+    Args:
+        offset: The byte offset in the article file at which the next page starts scanning.
+        dataset_version: The version of the dataset to which the offset refers.
+
+    Returns:
+        URL safe token.
+    """
+    contents = json.dumps({'offset': offset, 'version': dataset_version})
+    return base64.urlsafe_b64encode(contents.encode('utf-8')).decode('utf-8').rstrip('=')
+
+
+def decode_cursor(cursor: str, dataset_version: str) -> int:
+    """Read a continuation token made by encode_cursor.
+
+    Args:
+        cursor: The token.
+        dataset_version: The current version of the dataset.
+
+    Returns:
+        The byte offset at which to resume scanning.
+
+    Raises:
+        ValueError: Raised if the token is malformed or refers to a different dataset version.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        contents = json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+        offset = int(contents['offset'])
+        version = contents['version']
+    except (TypeError, KeyError, json.JSONDecodeError, UnicodeDecodeError, binascii.Error):
+        raise ValueError('Malformed cursor.')
+
+    if version != dataset_version or offset < 0:
+        raise ValueError('Cursor does not match dataset.')
+
+    return offset
+
+
+def make_etag(endpoint: str, params: typing.Dict[str, str], dataset_version: str) -> str:
+    """Make an ETag for a response to a query.
+
+    Args:
+        endpoint: Name of the endpoint answering the query like export or stats.
+        params: The canonical query parameters.
+        dataset_version: The version of the dataset against which the query runs.
+
+    Returns:
+        Quoted ETag which is the same for equivalent queries against the same dataset version.
+    """
+    params_str = '&'.join(map(lambda x: '%s=%s' % x, sorted(params.items())))
+    key = '\t'.join([endpoint, params_str, dataset_version])
+    return '"%s"' % hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def get_has_etag_match(event: typing.Dict, etag: str) -> bool:
+    """Determine if a Lambda event's If-None-Match header matches an ETag.
+
+    Args:
+        event: The Lambda event with optional headers.
+        etag: The quoted ETag of the current response.
+
+    Returns:
+        True if the client already has the response for this ETag and False otherwise.
+    """
+    headers = event.get('headers', None)
+    if not headers:
+        return False
+
+    headers_lower = dict(map(lambda x: (x[0].lower(), x[1]), headers.items()))
+    if_none_match = headers_lower.get('if-none-match', None)
+    if not if_none_match:
+        return False
+
+    candidates = map(lambda x: x.strip(), if_none_match.split(','))
+    candidates_strong = map(lambda x: x[2:] if x.startswith('W/') else x, candidates)
+    return sum(map(lambda x: 1 if x in (etag, '*') else 0, candidates_strong)) > 0
+
+
+def add_cache_headers(response: typing.Dict, etag: str):
+    """Add ETag and Cache-Control headers to a Lambda compatible response.
+
+    Args:
+        response: The response to modify in place.
+        etag: The quoted ETag of the response.
+    """
+    response['headers']['ETag'] = etag
+    response['headers']['Cache-Control'] = CACHE_CONTROL
+    response['headers']['Access-Control-Expose-Headers'] = EXPOSE_HEADERS
+
+
+def make_not_modified_response(etag: str) -> typing.Dict:
+    """Make a Lambda compatible 304 response.
+
+    Args:
+        etag: The quoted ETag which the client already has.
+
+    Returns:
+        Lambda compatible HTTP response without a body.
+    """
+    response = {
+        'statusCode': 304,
+        'headers': {
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': ''
+    }
+    add_cache_headers(response, etag)
+    return response
+
+
+def make_bad_request_response(message: str) -> typing.Dict:
+    """Make a Lambda compatible 400 response.
+
+    Args:
+        message: Plain text description of the problem with the request.
+
+    Returns:
+        Lambda compatible HTTP response.
+    """
+    return {
+        'statusCode': 400,
+        'headers': {
+            'Content-Type': 'text/plain',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': message
+    }
+
+
+def make_csv_str(articles: typing.Iterable[Article]) -> str:
+    """Convert articles to the string contents of an export CSV file.
+
+    Args:
+        articles: The articles to serialize.
+
+    Returns:
+        The articles as a CSV string with the columns in COLS.
+    """
+    articles_dicts = map(lambda x: x.to_dict(), articles)
+
+    output_target = io.StringIO()
+
+    writer = csv.DictWriter(output_target, fieldnames=COLS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(articles_dicts)
+
+    return output_target.getvalue()
+
+
+def make_response(articles: typing.Iterable[Article]) -> typing.Dict:
+    """Make a Lambda compatible HTTP response with an export of articles.
+
+    Args:
+        articles: The articles to include in the export.
+
+    Returns:
+        Lambda compatible HTTP response with a CSV body.
+    """
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'text/csv',
+            'Content-Disposition': 'attachment',
+            'filename': 'articles_export.csv',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': make_csv_str(articles)
+    }
+
+
 def lambda_handler(event, context):
     """Entrypoint / driver for Lambda-based execution.
 
@@ -306,3 +938,65 @@ def local_handler(params: typing.Dict) -> typing.List[Article]:
     """
     article_getter = LocalArticleGetter()
     return article_getter.execute_to_native(params)  # type: ignore
+
+
+def get_preview_seed(params: typing.Dict[str, str]) -> str:
+    """Get the seed with which to sample articles for a preview of a query.
+
+    Args:
+        params: The parameters of the query.
+
+    Returns:
+        Seed which is the same for the same query such that previews are reproducible.
+    """
+    return '&'.join(map(lambda x: '%s=%s' % x, sorted(params.items())))
+
+
+def local_page_handler(params: typing.Dict, limit: int, offset: int = 0,
+    seed: SEED = None) -> typing.List[Article]:
+    """Entrypoint / driver for visualization app-based execution of a page of results.
+
+    Args:
+        params: The parameters of the query.
+        limit: The maximum number of articles to return.
+        offset: The number of matching articles to skip before the page starts.
+        seed: The seed with which to sample or None to take articles in file order.
+
+    Returns:
+        List of up to limit Articles.
+    """
+    article_getter = LocalArticleGetter()
+    return article_getter.execute_to_page(params, limit, offset, seed)
+
+
+def local_stream_handler(params: typing.Dict,
+    offsets: typing.Optional[typing.List[int]] = None,
+    parallel: bool = False) -> typing.Iterable[Article]:
+    """Entrypoint / driver for visualization app-based execution without holding all results.
+
+    Args:
+        params: The parameters of the query.
+        offsets: Optional byte offsets of a superset of the matching rows (see OffsetArticleGetter)
+            such that only those rows are read. Defaults to None to scan the file.
+        parallel: Flag indicating if chunks of the file should be filtered in a process pool across
+            cores (see ParallelArticleGetter) when offsets are not given and parallel_available.
+            Defaults to False to scan in this process.
+
+    Returns:
+        Iterable over matching Articles which reads the article file as it is consumed.
+    """
+    if offsets is not None:
+        article_getter: ArticleGetter = OffsetArticleGetter(offsets)
+    elif parallel and parallel_available:
+        article_getter = ParallelArticleGetter()
+    else:
+        article_getter = LocalArticleGetter()
+
+    return article_getter.execute_to_obj(params)
+
+
+def _filter_range(task: typing.Tuple) -> typing.List[str]:
+    path, start, end, query_params = task
+    input_lines = chunk_util.read_lines(path, start, end)
+    matching = LocalArticleGetter()._execute_query_rows(query_params, input_lines)
+    return [line for line, article in matching]
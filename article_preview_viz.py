@@ -1,9 +1,20 @@
 """Visualization movement which previews individual article's metadata.
 
+Visualization movement which previews individual article's metadata where matching articles are
+sampled on a background thread (if available) such that drawing continues with progress while the
+article file is read. If the accessor knows where matching rows start in the article file, only
+those rows are read instead of scanning the whole file. If those rows cannot be read (like if the
+article file changed since the offsets were found), the file is scanned instead and, if reading
+still fails, the error is shown rather than waiting on a load which will not finish.
+
 License: BSD
 """
 
+import heapq
 import random
+import sys
+import threading
+import typing
 
 import sketchingpy
 
@@ -13,6 +24,184 @@ import const
 import data_util
 import state_util
 
+PREVIEW_COUNT = 20
+
+threads_available = sys.platform != 'emscripten'
+
+
+class PreviewLoader:
+    """Loader which samples articles matching a query, on a background thread if available.
+
+    Articles are sampled as they stream in using the same seeded keys as article_getter.select_page
+    such that the sample may be shown before the scan completes and, once done, matches
+    select_page with a seed from article_getter.get_preview_seed. The sample and counters are only
+    changed under a lock such that they may be read from another thread while scanning.
+    """
+
+    def __init__(self, params: typing.Dict[str, str], limit: int,
+        accessor: typing.Optional[data_util.DataAccessor] = None,
+        query: typing.Optional[data_util.Query] = None):
+        """Create a new loader without starting it.
+
+        Args:
+            params: The parameters of the query.
+            limit: The maximum number of articles to sample.
+            accessor: Accessor which provides the byte offsets of a superset of the matching rows in
+                the article file such that only those rows are read or None to scan the file. These
+                are found while loading so that they are not computed on the caller's thread.
+                Defaults to None.
+            query: The query matching params with which offsets are requested from the accessor or
+                None to scan the file. Defaults to None.
+        """
+        self._params = params
+        self._limit = limit
+        self._accessor = accessor
+        self._query = query
+        self._lock = threading.Lock()
+        self._sample: typing.List[typing.Tuple[float, int, article_getter.Article]] = []
+        self._rows_scanned = 0
+        self._matching_count = 0
+        self._done = False
+        self._cancelled = False
+        self._error: typing.Optional[str] = None
+
+    def start(self):
+        """Start scanning, returning immediately if threads are available or when done otherwise."""
+        if threads_available:
+            threading.Thread(target=self._run, daemon=True).start()
+        else:
+            self._run()
+
+    def cancel(self):
+        """Stop scanning as soon as possible, leaving the sample incomplete."""
+        self._cancelled = True
+
+    def get_params(self) -> typing.Dict[str, str]:
+        """Get the query being loaded.
+
+        Returns:
+            The parameters of the query.
+        """
+        return self._params
+
+    def get_rows_scanned(self) -> int:
+        """Get the number of rows read from the article file so far.
+
+        Returns:
+            Count of rows scanned whether or not they matched.
+        """
+        with self._lock:
+            return self._rows_scanned
+
+    def get_matching_count(self) -> int:
+        """Get the number of matching articles found so far.
+
+        Returns:
+            Count of matching articles.
+        """
+        with self._lock:
+            return self._matching_count
+
+    def get_is_done(self) -> bool:
+        """Determine if the scan has completed.
+
+        Returns:
+            True if all rows were scanned and false if still loading or cancelled.
+        """
+        return self._done
+
+    def get_error(self) -> typing.Optional[str]:
+        """Get why the scan failed if it failed.
+
+        Returns:
+            Description of the error which stopped the scan or None if no error was encountered.
+        """
+        return self._error
+
+    def get_articles(self) -> typing.List[article_getter.Article]:
+        """Get the articles sampled so far.
+
+        Returns:
+            Up to limit articles in sample order.
+        """
+        with self._lock:
+            retained = sorted(self._sample, reverse=True)
+
+        return list(map(lambda x: x[2], retained))
+
+    def _run(self):
+        offsets = self._get_offsets()
+        if self._cancelled:
+            return
+
+        try:
+            self._scan(offsets)
+        except Exception as e:
+            if offsets is None:
+                self._error = str(e)
+                return
+
+            try:
+                self._scan(None)
+            except Exception as e:
+                self._error = str(e)
+
+    def _get_offsets(self) -> typing.Optional[typing.List[int]]:
+        if self._accessor is None or self._query is None:
+            return None
+
+        try:
+            return self._accessor.get_offsets(self._query)
+        except Exception:
+            return None
+
+    def _scan(self, offsets: typing.Optional[typing.List[int]]):
+        with self._lock:
+            self._sample = []
+            self._rows_scanned = 0
+            self._matching_count = 0
+
+        def on_row() -> bool:
+            with self._lock:
+                self._rows_scanned += 1
+
+            return not self._cancelled
+
+        getter = _ProgressArticleGetter(on_row, offsets)
+        randomizer = random.Random(article_getter.get_preview_seed(self._params))
+
+        for article in getter.execute_to_obj(self._params):
+            with self._lock:
+                entry = (-randomizer.random(), self._matching_count, article)
+                self._matching_count += 1
+
+                if len(self._sample) < self._limit:
+                    heapq.heappush(self._sample, entry)
+                elif entry > self._sample[0]:
+                    heapq.heapreplace(self._sample, entry)
+
+        self._done = not self._cancelled
+
+
+class _ProgressArticleGetter(article_getter.LocalArticleGetter):
+
+    def __init__(self, on_row: typing.Callable[[], bool],
+        offsets: typing.Optional[typing.List[int]]):
+        self._on_row = on_row
+        self._offsets = offsets
+
+    def _get_source(self) -> typing.Iterable[str]:
+        if self._offsets is None:
+            source = super()._get_source()
+        else:
+            source = article_getter.OffsetArticleGetter(self._offsets)._get_source()
+
+        for line in source:
+            if not self._on_row():
+                return
+
+            yield line
+
 
 class ArticlePreviewViz(abstract.VizMovement):
     """Movement which shows title and other metadata previews of articles matching a query."""
@@ -23,15 +212,15 @@ class ArticlePreviewViz(abstract.VizMovement):
 
         Args:
             sketch: The sketch in which this movement operates.
-            accessor: Unused accessor which provides access to article aggregate statistics.
+            accessor: Accessor which provides where matching articles start in the article file.
             state: Object describing the global visualization state modified by multiple movements.
         """
         self._sketch = sketch
         self._accessor = accessor
         self._state = state
         self._loading_drawn = False
-        self._articles = None
-        self._state_loaded = None
+        self._loader: typing.Optional[PreviewLoader] = None
+        self._urls_drawn: typing.Optional[typing.List[str]] = None
         self._locked = False
 
     def lock(self):
@@ -43,9 +232,8 @@ class ArticlePreviewViz(abstract.VizMovement):
         pass
 
     def check_state(self, mouse_x: float, mouse_y: float):
-        """Refresh data if articles not loaded, otherwise noop."""
-        if not self._articles:
-            self.refresh_data()
+        """Start loading articles if filters changed, otherwise noop."""
+        self.refresh_data()
 
     def draw(self):
         """Draw article list or a please wait message."""
@@ -62,75 +250,142 @@ class ArticlePreviewViz(abstract.VizMovement):
         self._sketch.set_fill(const.INACTIVE_COLOR)
         self._sketch.draw_text(5, 25, 'Matching articles')
 
-        if not self._loading_drawn:
+        if not self._loading_drawn or self._loader is None:
             self._sketch.draw_text(5, 70, 'Please wait...')
             self._loading_drawn = True
             self._state.invalidate()
-        elif self._articles:
-            self._draw_articles_buffer()
+        else:
+            self._draw_loaded(self._loader)
 
         self._sketch.pop_style()
         self._sketch.pop_transform()
 
     def refresh_data(self):
-        """Load underlying article metadata list if required."""
-        if self._state_loaded == self._state.serialize():
-            return
-
+        """Start loading a sample of matching articles if filters changed, cancelling prior load."""
         if not self._loading_drawn:
             return
 
-        params = {}
-
-        def add_to_params(value, key):
-            if value is None:
-                return
-            else:
-                params[key] = value
-
-        add_to_params(self._state.get_keyword_selected(), 'keyword')
-        add_to_params(self._state.get_tag_selected(), 'tag')
-        add_to_params(self._state.get_category_selected(), 'category')
-        add_to_params(self._state.get_country_selected(), 'country')
-
-        self._articles = article_getter.local_handler(params)
-        random.shuffle(self._articles)
+        params = self._get_params()
+        if self._loader is not None and self._loader.get_params() == params:
+            return
 
-        self._state_loaded = self._state.serialize()
+        if self._loader is not None:
+            self._loader.cancel()
+
+        self._loader = PreviewLoader(
+            params,
+            PREVIEW_COUNT,
+            self._accessor,
+            self._state.get_query()
+        )
+        self._urls_drawn = None
+        self._loader.start()
         self._state.invalidate()
-        self._draw_articles()
 
     def on_change_to(self):
         """Prepare loading screen prior to first or invalidated cache draw."""
         self.refresh_data()
         self._loading_drawn = False
 
+    def reset(self):
+        """Cancel any load in progress and discard loaded articles such that they load again."""
+        if self._loader is not None:
+            self._loader.cancel()
+
+        self._loader = None
+        self._urls_drawn = None
+
     def download_articles(self):
         """Produce a CSV export describing matching articles."""
         def callback(filename):
             if not filename.endswith('.csv'):
                 filename = filename + '.csv'
 
-            article_dicts = map(lambda x: x.to_dict(), self._articles)
-            self._sketch.get_data_layer().write_csv(
-                article_dicts,
-                [
-                    'url',
-                    'published',
-                    'country',
-                    'keywordList',
-                    'tagList',
-                    'categoryList'
-                ],
-                filename
-            )
+            offsets = self._accessor.get_offsets(self._state.get_query())
+            try:
+                self._write_articles(filename, offsets)
+            except Exception as e:
+                if offsets is None:
+                    self._sketch.get_dialog_layer().show_alert('Download failed: %s' % e)
+                    return
+
+                try:
+                    self._write_articles(filename, None)
+                except Exception as e:
+                    self._sketch.get_dialog_layer().show_alert('Download failed: %s' % e)
 
         self._sketch.get_dialog_layer().get_file_save_location(callback)
 
-    def _draw_articles_buffer(self):
+    def _write_articles(self, filename: str, offsets: typing.Optional[typing.List[int]]):
+        articles = article_getter.local_stream_handler(self._get_params(), offsets)
+        article_dicts = map(lambda x: x.to_dict(), articles)
+        data_layer = self._sketch.get_data_layer()
+        assert data_layer is not None
+        data_layer.write_csv(
+            article_dicts,
+            [
+                'url',
+                'published',
+                'country',
+                'keywordList',
+                'tagList',
+                'categoryList'
+            ],
+            filename
+        )
+
+    def _get_params(self) -> typing.Dict[str, str]:
+        params = {}
+
+        def add_to_params(value, key):
+            if value is None:
+                return
+            else:
+                params[key] = value
+
+        add_to_params(self._state.get_keyword_selected(), 'keyword')
+        add_to_params(self._state.get_tag_selected(), 'tag')
+        add_to_params(self._state.get_category_selected(), 'category')
+        add_to_params(self._state.get_country_selected(), 'country')
+
+        return params
+
+    def _draw_loaded(self, loader: PreviewLoader):
+        articles = loader.get_articles()
+        urls = list(map(lambda x: x.get_url(), articles))
+        if urls != self._urls_drawn:
+            self._draw_articles(articles)
+            self._urls_drawn = urls
+
         self._sketch.draw_buffer(0, 0, 'articles')
 
-    def _draw_articles(self):
+        self._sketch.set_text_font(const.FONT, 14)
+        self._sketch.set_text_align('right', 'center')
+        self._sketch.set_fill(const.INACTIVE_COLOR)
+
+        error = loader.get_error()
+        if error is not None:
+            status = 'Could not load articles'
+        elif loader.get_is_done() and len(articles) < loader.get_matching_count():
+            status = 'Showing a sample of %d' % len(articles)
+        elif loader.get_is_done():
+            status = 'Showing all %d' % len(articles)
+        else:
+            status = 'Scanned %d articles...' % loader.get_rows_scanned()
+
+        self._sketch.draw_text(const.WIDTH - 5, 25, status)
+
+        if error is not None:
+            self._sketch.set_text_font(const.FONT, 14)
+            self._sketch.set_text_align('left', 'center')
+            self._sketch.draw_text(5, 70, 'Could not load articles: %s' % error)
+
+        if loader.get_is_done() and len(articles) == 0:
+            self._sketch.set_text_font(const.FONT, 30)
+            self._sketch.set_text_align('left', 'center')
+            self._sketch.draw_text(5, 70, 'No matching articles')
+
+    def _draw_articles(self, articles: typing.List[article_getter.Article]):
         self._sketch.push_transform()
         self._sketch.push_style()
 
@@ -144,7 +399,7 @@ class ArticlePreviewViz(abstract.VizMovement):
         self._sketch.draw_text(5, 25, 'Matching articles')
 
         y = 80
-        for article in self._articles[:20]:
+        for article in articles[:PREVIEW_COUNT]:
             self._sketch.set_text_font(const.FONT, 16)
             self._sketch.set_text_align('left', 'baseline')
             # Display comma-separated, alphabetically sorted tags instead of title
@@ -0,0 +1,162 @@
+"""Memory and throughput comparison of eager and lazy article records.
+
+Comparison of article_getter.Article built eagerly with every list field split (as rows were parsed
+before LazyArticle) against article_getter.LazyArticle on a large synthetic article table made by
+repeating rows from csv/articles.csv with unique URLs. Reports peak traced memory and time for an
+unfiltered export (which holds every record) and for a filtered query. If used from the command
+line, takes an optional number of synthetic rows and an optional keyword on which to filter.
+
+License: BSD
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+import article_getter
+
+DEFAULT_NUM_ROWS = 200000
+DEFAULT_KEYWORD = 'security'
+SOURCE_PATH = os.path.join('csv', 'articles.csv')
+
+PARSER = typing.Callable[[str], typing.Optional[article_getter.Article]]
+
+
+def write_synthetic(source_path: str, output_path: str, num_rows: int):
+    """Write a synthetic article table by repeating rows from an existing table.
+
+    Args:
+        source_path: Path to the article table from which rows are drawn.
+        output_path: Path at which to write the synthetic table.
+        num_rows: The number of rows (excluding header) to write.
+    """
+    with open(source_path) as f:
+        lines = f.read().split('\n')
+
+    header = lines[0]
+    rows = [x for x in lines[1:] if x.strip() != '']
+
+    with open(output_path, 'w') as f:
+        f.write(header + '\n')
+        for i in range(0, num_rows):
+            pieces = rows[i % len(rows)].split('\t', 1)
+            f.write('%s#%d\t%s\n' % (pieces[0], i, pieces[1]))
+
+
+def parse_eager(line: str) -> typing.Optional[article_getter.Article]:
+    """Parse a row into an Article with all list fields split up front.
+
+    Args:
+        line: The raw row.
+
+    Returns:
+        Parsed article or None if the row is invalid.
+    """
+    pieces = line.rstrip('\r\n').split('\t')
+    if len(pieces) != 8:
+        return None
+
+    return article_getter.Article(
+        pieces[0],
+        pieces[1],
+        pieces[2],
+        pieces[3],
+        pieces[4],
+        pieces[5].split(';'),
+        pieces[6].split(';'),
+        pieces[7].split(';')
+    )
+
+
+def parse_lazy(line: str) -> typing.Optional[article_getter.Article]:
+    """Parse a row into a LazyArticle.
+
+    Args:
+        line: The raw row.
+
+    Returns:
+        Parsed article or None if the row is invalid.
+    """
+    pieces = line.rstrip('\r\n').split('\t')
+    if len(pieces) != 8:
+        return None
+
+    return article_getter.LazyArticle(pieces)
+
+
+def measure_export(path: str, parser: PARSER) -> typing.Tuple[float, int]:
+    """Measure parsing and holding every record like an unfiltered export.
+
+    Args:
+        path: Path to the article table.
+        parser: Function converting a raw row to a record.
+
+    Returns:
+        Tuple of seconds elapsed and peak traced bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    with open(path) as f:
+        records = [x for x in map(parser, f) if x is not None]
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert len(records) > 0
+    return (elapsed, peak)
+
+
+def measure_filter(path: str, parser: PARSER, keyword: str) -> typing.Tuple[float, int]:
+    """Measure streaming records through a keyword filter.
+
+    Args:
+        path: Path to the article table.
+        parser: Function converting a raw row to a record.
+        keyword: The keyword on which to filter.
+
+    Returns:
+        Tuple of seconds elapsed and the number of matching records.
+    """
+    start = time.perf_counter()
+
+    with open(path) as f:
+        records = filter(lambda x: x is not None, map(parser, f))
+        matching = sum(map(
+            lambda x: 1 if keyword in x.get_keywords() else 0,  # type: ignore
+            records
+        ))
+
+    return (time.perf_counter() - start, matching)
+
+
+def main():
+    """Entry point for running the comparison from the command line."""
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_ROWS
+    keyword = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_KEYWORD
+
+    parsers = [('eager', parse_eager), ('lazy', parse_lazy)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'articles.csv')
+        write_synthetic(SOURCE_PATH, path, num_rows)
+        print('Synthetic table: %d rows, %.1f MB' % (num_rows, os.path.getsize(path) / 1e6))
+
+        for name, parser in parsers:
+            export_seconds, export_peak = measure_export(path, parser)
+            filter_seconds, matching = measure_filter(path, parser, keyword)
+            print('%s: export %.2fs peak %.1f MB, filter %.2fs (%d matching)' % (
+                name,
+                export_seconds,
+                export_peak / 1e6,
+                filter_seconds,
+                matching
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
 """Alternative endpoint for generating query article statistics used for express version.
 
+Alternative endpoint for generating query article statistics used for express version. Counts are
+exact by default. If the approximate parameter is true, counts are instead estimated with sketches
+from approx_util in memory which does not grow with the number of articles or distinct values and
+responses include an error column giving the bound on each percent.
+
 License: BSD
 """
 
@@ -8,8 +13,15 @@ import io
 import itertools
 import typing
 
+import approx_util
 import article_getter
 
+APPROXIMATE_KEY = 'approximate'
+TRUE_VALUES = ('true', '1', 'yes')
+
+STRATEGY = typing.Callable[[article_getter.Article], typing.List[str]]
+ESTIMATES = typing.Dict[str, approx_util.Estimate]
+
 
 class StatGenerator:
     """Utility to generate statistics outside the interactive visualization."""
@@ -30,21 +42,17 @@ class StatGenerator:
 
         Returns:
             Mapping from group to count of matching articles in that group where group may be
-            country, tag, category, keyword, etc.
+            country, month, tag, category, keyword, etc. Estimated if the approximate parameter is
+            true.
         """
-        matching = self._inner_getter.execute_to_obj(params)
-        if 'queryStringParameters' in params:
-            dimension = params['queryStringParameters']['dimension']
-        else:
-            dimension = params['dimension']
+        if get_is_approximate(params):
+            estimates = self.execute_approximate(params)
+            return dict(map(lambda x: (x[0], x[1].get_value()), estimates.items()))
 
-        strategy = {
-            'country': lambda x: [x.get_country()],
-            'keyword': lambda x: x.get_keywords(),
-            'tag': lambda x: x.get_tags(),
-            'category': lambda x: x.get_categories()
-        }.get(dimension, None)
+        matching = self._inner_getter.execute_to_obj(params)
+        dimension = get_query_params(params).get('dimension', '')
 
+        strategy = get_strategy(dimension)
         if strategy is None:
             return {}
 
@@ -53,9 +61,9 @@ class StatGenerator:
 
         counts: typing.Dict[str, float] = {}
 
-        if dimension == 'country':
-            country_counts = self.get_country_counts()
-            total_getter = lambda x: country_counts[x]
+        if dimension in ('country', 'month'):
+            population_counts = self._get_population_counts(params, strategy)
+            total_getter = lambda x: population_counts[x]
         else:
             total = len(matching_values_nest)
             total_getter = lambda x: total
@@ -66,59 +74,193 @@ class StatGenerator:
         ret_tuples = map(lambda item: (item[0], item[1] / total_getter(item[0])), counts.items())
         return dict(ret_tuples)
 
+    def execute_approximate(self, params: typing.Dict,
+        capacity: int = approx_util.DEFAULT_CAPACITY) -> ESTIMATES:
+        """Execute a query estimating summary statistics in bounded memory.
+
+        Matching articles are counted with HyperLogLog over URLs and group counts are found with
+        Space-Saving such that only the (up to) capacity most common groups are reported.
+
+        Args:
+            params: Dictionary with parameters describing the query.
+            capacity: The maximum number of groups to track.
+
+        Returns:
+            Mapping from group to estimated percent of matching articles in that group with bounds.
+        """
+        matching = self._inner_getter.execute_to_obj(params)
+        dimension = get_query_params(params).get('dimension', '')
+
+        strategy = get_strategy(dimension)
+        if strategy is None:
+            return {}
+
+        counts = approx_util.SpaceSaving(capacity)
+        urls = approx_util.HyperLogLog()
+        for article in matching:
+            urls.add(article.get_url())
+            for value in strategy(article):
+                counts.add(value)
+
+        total = urls.get_estimate()
+        if dimension in ('country', 'month'):
+            population_counts = self._get_approximate_population_counts(params, strategy, capacity)
+            population_total = population_counts.get_total()
+            population_estimates = dict(population_counts.get_top())
+
+            # Groups evicted from the population sketch are only known to fall within its total.
+            total_getter = lambda x, count: population_estimates.get(
+                x,
+                approx_util.Estimate(count.get_value(), count.get_low(), population_total)
+            )
+        else:
+            total_getter = lambda x, count: total
+
+        return dict(map(
+            lambda x: (x[0], approx_util.divide(x[1], total_getter(x[0], x[1]))),
+            counts.get_top()
+        ))
+
     def get_country_counts(self) -> typing.Dict[str, int]:
         """Get the total number of articles per country in the dataset.
 
         Returns:
             Mapping from name of country to count of articles.
         """
-        all_articles = self._inner_getter.execute_to_obj({'queryStringParameters': {}})
-        all_article_countries = map(lambda x: x.get_country(), all_articles)
+        return self._get_population_counts({}, lambda x: [x.get_country()])
+
+    def _get_population_counts(self, params: typing.Dict,
+        strategy: STRATEGY) -> typing.Dict[str, int]:
+        all_values = itertools.chain(*map(strategy, self._get_population(params)))
 
         ret_counts: typing.Dict[str, int] = {}
-        for country in all_article_countries:
-            ret_counts[country] = ret_counts.get(country, 0) + 1
+        for value in all_values:
+            ret_counts[value] = ret_counts.get(value, 0) + 1
 
         return ret_counts
 
+    def _get_approximate_population_counts(self, params: typing.Dict, strategy: STRATEGY,
+        capacity: int) -> approx_util.SpaceSaving:
+        counts = approx_util.SpaceSaving(capacity)
+        for value in itertools.chain(*map(strategy, self._get_population(params))):
+            counts.add(value)
+
+        return counts
+
+    def _get_population(self, params: typing.Dict) -> typing.Iterable[article_getter.Article]:
+        # The population ignores filters other than the range of publication dates.
+        query_params = get_query_params(params)
+        date_params = dict(filter(lambda x: x[0] in article_getter.DATE_KEYS, query_params.items()))
+        population_params: typing.Dict
+        if 'queryStringParameters' in params:
+            population_params = {'queryStringParameters': date_params}
+        else:
+            population_params = date_params
+
+        return self._inner_getter.execute_to_obj(population_params)
+
+
+def get_strategy(dimension: str) -> typing.Optional[STRATEGY]:
+    """Get the function which finds the groups of an article for a dimension.
+
+    Args:
+        dimension: The name of the dimension like country, month, keyword, tag, or category.
+
+    Returns:
+        Function returning the groups in which an article falls or None if dimension is unknown.
+        Articles without any keywords, tags, or categories fall in no group for that dimension
+        (matching the pre-aggregated statistics of accessor_stat_gen).
+    """
+    def get_month(article: article_getter.Article) -> typing.List[str]:
+        published = article.get_published()
+        if len(published) < article_getter.MONTH_LENGTH:
+            return []
+        else:
+            return [published[:article_getter.MONTH_LENGTH]]
+
+    def get_named(values: typing.List[str]) -> typing.List[str]:
+        return [x for x in values if x != '']
+
+    strategies: typing.Dict[str, STRATEGY] = {
+        'country': lambda x: [x.get_country()],
+        'month': get_month,
+        'keyword': lambda x: get_named(x.get_keywords()),
+        'tag': lambda x: get_named(x.get_tags()),
+        'category': lambda x: get_named(x.get_categories())
+    }
+    return strategies.get(dimension, None)
+
+
+def get_is_approximate(params: typing.Dict) -> bool:
+    """Determine if a query asks for approximate statistics.
 
-def make_csv_str(target: typing.Dict[str, float]) -> str:
+    Args:
+        params: Lambda event with queryStringParameters or dictionary of parameters.
+
+    Returns:
+        True if the approximate parameter is true and false otherwise.
+    """
+    return get_query_params(params).get(APPROXIMATE_KEY, '').lower() in TRUE_VALUES
+
+
+def get_query_params(params: typing.Dict) -> typing.Dict[str, str]:
+    """Get canonical query parameters from either a Lambda event or plain parameters.
+
+    Args:
+        params: Lambda event with queryStringParameters or dictionary of parameters.
+
+    Returns:
+        Canonical query parameters.
+    """
+    if 'queryStringParameters' in params:
+        return article_getter.canonicalize_params(params['queryStringParameters'])
+    else:
+        return article_getter.canonicalize_params(params)
+
+
+def make_csv_str(target: typing.Dict[str, float],
+    errors: typing.Optional[typing.Dict[str, float]] = None) -> str:
     """Convert a collection of group counts to the string contents of a CSV file.
 
     Args:
         target: The values to serialize to CSV.
+        errors: Optional error bound for each value which, if given, is written as an error column.
 
     Returns:
         The input target as a CSV string.
     """
     output_target = io.StringIO()
 
-    target_flat = map(lambda x: {'name': x[0], 'percent': x[1]}, target.items())
-
-    writer = csv.DictWriter(output_target, fieldnames=['name', 'percent'])
+    if errors is None:
+        fieldnames = ['name', 'percent']
+        target_flat = map(lambda x: {'name': x[0], 'percent': x[1]}, target.items())
+    else:
+        errors_given = errors
+        fieldnames = ['name', 'percent', 'error']
+        target_flat = map(
+            lambda x: {'name': x[0], 'percent': x[1], 'error': errors_given[x[0]]},
+            target.items()
+        )
+
+    writer = csv.DictWriter(output_target, fieldnames=fieldnames)
     writer.writeheader()
     writer.writerows(target_flat)
 
     return output_target.getvalue()
 
 
-def lambda_handler(event, context):
-    """Entrypoint / driver for Lambda-based execution.
+def make_response(target: typing.Dict[str, float],
+    errors: typing.Optional[typing.Dict[str, float]] = None) -> typing.Dict:
+    """Make a Lambda compatible HTTP response with a collection of group percents.
 
     Args:
-        event: Information about the Lambda event including query parameters.
-        context: Unused Lambda contextual information.
+        target: The values to serialize to CSV.
+        errors: Optional error bound for each value.
 
     Returns:
-        Lambda compatible HTTP response.
+        Lambda compatible HTTP response with a CSV body.
     """
-    inner_getter = article_getter.AwsLambdaArticleGetter()
-    generator = StatGenerator(inner_getter)
-
-    matching = generator.execute(event)
-    csv_str = make_csv_str(matching)
-
-    res = {
+    return {
         'statusCode': 200,
         'headers': {
             'Content-Type': 'text/csv',
@@ -126,6 +268,39 @@ def lambda_handler(event, context):
             'filename': 'articles_summary.csv',
             'Access-Control-Allow-Origin': '*'
         },
-        'body': csv_str
+        'body': make_csv_str(target, errors)
     }
-    return res
+
+
+def lambda_handler(event, context):
+    """Entrypoint / driver for Lambda-based execution.
+
+    Args:
+        event: Information about the Lambda event including query parameters.
+        context: Unused Lambda contextual information.
+
+    Returns:
+        Lambda compatible HTTP response.
+    """
+    inner_getter = article_getter.AwsLambdaArticleGetter()
+
+    etag = article_getter.make_etag(
+        'stats',
+        get_query_params(event),
+        inner_getter.get_dataset_version()
+    )
+    if article_getter.get_has_etag_match(event, etag):
+        return article_getter.make_not_modified_response(etag)
+
+    generator = StatGenerator(inner_getter)
+    if get_is_approximate(event):
+        estimates = generator.execute_approximate(event)
+        response = make_response(
+            dict(map(lambda x: (x[0], x[1].get_value()), estimates.items())),
+            dict(map(lambda x: (x[0], x[1].get_error()), estimates.items()))
+        )
+    else:
+        response = make_response(generator.execute(event))
+
+    article_getter.add_cache_headers(response, etag)
+    return response
@@ -0,0 +1,399 @@
+"""Utilities for precomputing and loading the map basemap.
+
+Utilities which render the basemap and the projected country centerpoints ahead of time, storing
+them on disk under a key derived from the geojson contents and the map configuration. Assets are
+read and parsed into a MapSource without using the sketch such that they may be loaded off the main
+thread while other startup assets load. If run from the command line, builds the basemap used by the
+overview map.
+
+License: BSD
+"""
+
+import hashlib
+import json
+import math
+import os
+import typing
+
+import sketchingpy
+import sketchingpy.data_struct
+import sketchingpy.geo
+
+import const
+import startup_util
+
+GEOJSON_PATH = os.path.join('geojson', 'zoomed_out.geojson')
+CENTERPOINTS_PATH = os.path.join('csv', 'centerpoints.csv')
+BASEMAP_DIR = 'basemap'
+
+POINT = typing.Tuple[float, float]
+POINTS = typing.List[POINT]
+GEOPOINTS = typing.Dict[str, POINT]
+RECORDS = typing.List[typing.Dict]
+
+
+class MapSource:
+    """Map assets read and parsed ahead of drawing for a map configuration."""
+
+    def __init__(self, key: str, geopoints: typing.Optional[GEOPOINTS],
+        geojson: typing.Optional[typing.Dict], centerpoints: typing.Optional[RECORDS],
+        image_path: typing.Optional[str] = None):
+        """Create a new record of loaded map assets.
+
+        Args:
+            key: The key returned by get_cache_key for the geojson and map configuration.
+            geopoints: Precomputed mapping from country name to pixel coordinates or None if no
+                precomputed basemap is available for the key.
+            geojson: The parsed geojson or None if a precomputed basemap is available.
+            centerpoints: The country centerpoint records or None if a precomputed basemap is
+                available.
+            image_path: The path from which the precomputed basemap image should be loaded or None
+                to use get_image_path. Defaults to None.
+        """
+        self._key = key
+        self._geopoints = geopoints
+        self._geojson = geojson
+        self._centerpoints = centerpoints
+        self._image_path = image_path
+
+    def get_key(self) -> str:
+        """Get the key under which a precomputed basemap would be stored.
+
+        Returns:
+            The key returned by get_cache_key.
+        """
+        return self._key
+
+    def get_geopoints(self) -> typing.Optional[GEOPOINTS]:
+        """Get the precomputed country centerpoints in pixel space.
+
+        Returns:
+            Mapping from country name to pixel coordinates or None if the basemap must be drawn.
+        """
+        return self._geopoints
+
+    def get_geojson(self) -> typing.Optional[typing.Dict]:
+        """Get the geojson from which the basemap would be drawn.
+
+        Returns:
+            The parsed geojson or None if a precomputed basemap is available.
+        """
+        return self._geojson
+
+    def get_centerpoints(self) -> typing.Optional[RECORDS]:
+        """Get the country centerpoints to be projected if the basemap is drawn.
+
+        Returns:
+            Records with name, longitude, and latitude or None if a precomputed basemap is
+            available.
+        """
+        return self._centerpoints
+
+    def get_image_path(self) -> str:
+        """Get the path from which the precomputed basemap image should be loaded.
+
+        Returns:
+            Path to the PNG file which may have been resolved to a deployed path.
+        """
+        if self._image_path is None:
+            return get_image_path(self._key)
+
+        return self._image_path
+
+
+def get_cache_key(geojson_contents: str, width: int, height: int, zoom: float,
+    placement_x: float, placement_y: float) -> str:
+    """Get the key under which a basemap rendering is stored.
+
+    Args:
+        geojson_contents: The raw string contents of the geojson from which the basemap is drawn.
+        width: The width of the sketch in pixels.
+        height: The height of the sketch in pixels.
+        zoom: The map zoom level.
+        placement_x: The horizontal pixel coordinate at which the map is centered.
+        placement_y: The vertical pixel coordinate at which the map is centered.
+
+    Returns:
+        Hex string which changes if the geojson or any part of the map configuration changes.
+    """
+    params = [width, height, zoom, placement_x, placement_y, const.BG_COLOR, const.MAP_STROKE_COLOR]
+    params_str = '\t'.join(map(lambda x: str(x), params))
+
+    hasher = hashlib.sha256()
+    hasher.update(geojson_contents.encode('utf-8'))
+    hasher.update(params_str.encode('utf-8'))
+    return hasher.hexdigest()[:16]
+
+
+def get_image_path(key: str) -> str:
+    """Get the path at which a basemap image is stored.
+
+    Args:
+        key: The key returned by get_cache_key.
+
+    Returns:
+        Path to the PNG file containing the rendered basemap.
+    """
+    return os.path.join(BASEMAP_DIR, key + '.png')
+
+
+def get_geopoints_path(key: str) -> str:
+    """Get the path at which projected country centerpoints are stored.
+
+    Args:
+        key: The key returned by get_cache_key.
+
+    Returns:
+        Path to the JSON file mapping country name to pixel coordinates.
+    """
+    return os.path.join(BASEMAP_DIR, key + '.json')
+
+
+def configure_map(sketch: sketchingpy.Sketch2D, center_x: float, center_y: float):
+    """Set the map view used for the basemap.
+
+    Args:
+        sketch: The sketch whose map view should be configured.
+        center_x: The horizontal coordinate to center the map within the sketch.
+        center_y: The vertical coordinate to center the map within the sketch.
+    """
+    sketch.set_map_pan(0, 0)
+    sketch.set_map_placement(center_x, center_y)
+    sketch.set_map_zoom(const.MAP_ZOOM)
+
+
+def simplify_points(points: POINTS, tolerance: float) -> POINTS:
+    """Simplify a polygon ring using Ramer-Douglas-Peucker.
+
+    Args:
+        points: The longitude / latitude points of the ring.
+        tolerance: The maximum distance in degrees that a removed point may be from the simplified
+            line. Zero or below leaves the points unchanged.
+
+    Returns:
+        Simplified points or the original points if simplification would collapse the ring.
+    """
+    if tolerance <= 0 or len(points) < 4:
+        return points
+
+    keep = [False] * len(points)
+    keep[0] = True
+    keep[-1] = True
+
+    ranges = [(0, len(points) - 1)]
+    while len(ranges) > 0:
+        start_i, end_i = ranges.pop()
+        start = points[start_i]
+        end = points[end_i]
+
+        max_dist = 0.0
+        max_i = -1
+        for i in range(start_i + 1, end_i):
+            dist = _get_distance_to_segment(points[i], start, end)
+            if dist > max_dist:
+                max_dist = dist
+                max_i = i
+
+        if max_i != -1 and max_dist > tolerance:
+            keep[max_i] = True
+            ranges.append((start_i, max_i))
+            ranges.append((max_i, end_i))
+
+    simplified = [point for point, kept in zip(points, keep) if kept]
+    if len(simplified) < 4:
+        return points
+    else:
+        return simplified
+
+
+def build_geo_shapes(sketch: sketchingpy.Sketch2D, source: typing.Dict,
+    tolerance: float = 0) -> typing.List:
+    """Convert geojson to shapes under the sketch's current map view.
+
+    Args:
+        sketch: The sketch whose map view should be used for projection.
+        source: The loaded geojson.
+        tolerance: Optional simplification tolerance in degrees. Defaults to 0 (no simplification).
+
+    Returns:
+        List of closed shapes in pixel space.
+    """
+    if tolerance <= 0:
+        geo_polygons = sketch.parse_geojson(source)
+        return [x.to_shape() for x in geo_polygons]
+
+    raw_polygons = sketchingpy.geo.parse_geojson(source)
+    simplified_polygons = map(lambda x: simplify_points(x, tolerance), raw_polygons)
+
+    def build_shape(points: POINTS):
+        builder = sketch.start_geo_polygon(points[0][0], points[0][1])
+        for point in points[1:]:
+            builder.add_coordinate(point[0], point[1])
+        return builder.to_shape()
+
+    return [build_shape(x) for x in simplified_polygons]
+
+
+def draw_geo_shapes(sketch: sketchingpy.Sketch2D, shapes: typing.List):
+    """Stroke the basemap shapes using the basemap style.
+
+    Args:
+        sketch: The sketch or buffer in which the shapes should be drawn.
+        shapes: The shapes from build_geo_shapes.
+    """
+    sketch.push_style()
+
+    sketch.clear_fill()
+    sketch.set_stroke(const.MAP_STROKE_COLOR)
+    sketch.set_stroke_weight(2)
+
+    for shape in shapes:
+        sketch.draw_shape(shape)
+
+    sketch.pop_style()
+
+
+def project_geopoints(sketch: sketchingpy.Sketch2D,
+    centerpoints: typing.Optional[RECORDS] = None) -> GEOPOINTS:
+    """Project country centerpoints to pixels under the sketch's current map view.
+
+    Args:
+        sketch: The sketch whose map view should be used for projection.
+        centerpoints: The centerpoint records already loaded or None to read them. Defaults to
+            None.
+
+    Returns:
+        Mapping from country name to pixel coordinates.
+    """
+    if centerpoints is None:
+        data_layer = sketch.get_data_layer()
+        assert data_layer is not None
+        centerpoints_raw = data_layer.get_csv(CENTERPOINTS_PATH)
+    else:
+        centerpoints_raw = centerpoints
+
+    geopoints_flat = map(
+        lambda x: (
+            x['name'],
+            sketch.convert_geo_to_pixel(float(x['longitude']), float(x['latitude']))
+        ),
+        centerpoints_raw
+    )
+    return dict(geopoints_flat)
+
+
+def load_source(data_layer: sketchingpy.data_struct.DataLayer, center_x: float,
+    center_y: float, resolve: typing.Optional[startup_util.RESOLVER] = None) -> MapSource:
+    """Read and parse the assets needed to show the map without using the sketch.
+
+    Args:
+        data_layer: The data layer from which assets are read which must be safe to use from
+            another thread if called off the main thread.
+        center_x: The horizontal coordinate to center the map within the sketch.
+        center_y: The vertical coordinate to center the map within the sketch.
+        resolve: Function which maps paths of assets to the paths from which they should be fetched
+            (like startup_util.Manifest.resolve) or None to fetch paths as given. Defaults to None.
+
+    Returns:
+        Precomputed centerpoints if a precomputed basemap is available for the geojson and map
+        configuration or, otherwise, the parsed geojson and centerpoint records.
+    """
+    if resolve is None:
+        resolve = startup_util.Manifest({}).resolve
+
+    geojson_contents = startup_util.read_text(data_layer, GEOJSON_PATH, resolve)
+    key = get_cache_key(
+        geojson_contents,
+        const.WIDTH,
+        const.HEIGHT,
+        const.MAP_ZOOM,
+        center_x,
+        center_y
+    )
+
+    try:
+        geopoints_raw = data_layer.get_json(resolve(get_geopoints_path(key)))
+    except:
+        # Prefer a copy already on the file system like one fetched through the py-config.
+        if os.path.exists(CENTERPOINTS_PATH):
+            centerpoints_path = CENTERPOINTS_PATH
+        else:
+            centerpoints_path = resolve(CENTERPOINTS_PATH)
+
+        return MapSource(
+            key,
+            None,
+            json.loads(geojson_contents),
+            list(data_layer.get_csv(centerpoints_path))
+        )
+
+    geopoints = dict(map(lambda x: (x[0], (x[1][0], x[1][1])), geopoints_raw.items()))
+    return MapSource(key, geopoints, None, None, resolve(get_image_path(key)))
+
+
+def build_basemap(center_x: float, center_y: float) -> str:
+    """Render the basemap and centerpoints to disk.
+
+    Args:
+        center_x: The horizontal coordinate to center the map within the sketch.
+        center_y: The vertical coordinate to center the map within the sketch.
+
+    Returns:
+        The key under which the basemap was stored.
+    """
+    sketch = sketchingpy.Sketch2DStatic(const.WIDTH, const.HEIGHT)
+    data_layer = sketch.get_data_layer()
+    assert data_layer is not None
+
+    sketch.push_map()
+    configure_map(sketch, center_x, center_y)
+
+    geojson_contents = data_layer.get_text(GEOJSON_PATH)
+    key = get_cache_key(
+        geojson_contents,
+        const.WIDTH,
+        const.HEIGHT,
+        const.MAP_ZOOM,
+        center_x,
+        center_y
+    )
+
+    shapes = build_geo_shapes(sketch, json.loads(geojson_contents))
+    geopoints = project_geopoints(sketch)
+
+    sketch.pop_map()
+
+    sketch.clear(const.BG_COLOR)
+    draw_geo_shapes(sketch, shapes)
+
+    os.makedirs(BASEMAP_DIR, exist_ok=True)
+    sketch.save_image(get_image_path(key))
+    data_layer.write_json(geopoints, get_geopoints_path(key))
+
+    return key
+
+
+def _get_distance_to_segment(point: POINT, start: POINT, end: POINT) -> float:
+    delta_x = end[0] - start[0]
+    delta_y = end[1] - start[1]
+    length_squared = delta_x ** 2 + delta_y ** 2
+
+    if length_squared == 0:
+        return math.sqrt((point[0] - start[0]) ** 2 + (point[1] - start[1]) ** 2)
+
+    progress = ((point[0] - start[0]) * delta_x + (point[1] - start[1]) * delta_y) / length_squared
+    progress = min(1, max(0, progress))
+
+    closest_x = start[0] + progress * delta_x
+    closest_y = start[1] + progress * delta_y
+    return math.sqrt((point[0] - closest_x) ** 2 + (point[1] - closest_y) ** 2)
+
+
+def main():
+    """Entry point for building the basemap used by the overview map."""
+    key = build_basemap(const.MAP_CENTER_X, const.MAP_CENTER_Y)
+    print('Wrote basemap %s' % key)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Headless batch rendering of many visualization states to static images.
+
+Headless batch rendering of many visualization states to static images, typically used for reports
+and regression screenshots. Jobs are spread across a process pool where each worker loads the
+dataset once and renders many images. If used from the command line, takes the path to a JSON file
+describing the jobs, the directory in which to write images, and an optional number of workers.
+
+The job file contains a list of objects with an optional movement (overview, grid, country,
+category, tag, keyword), optional filters (country, category, tag, keyword), and an optional name.
+An object may also have an "each" attribute naming a dimension (country, category, tag, keyword) in
+which case the job is repeated with a filter for every value of that dimension in the dataset.
+
+License: BSD
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import time
+import typing
+
+import data_util
+import viz
+
+MANIFEST_FILENAME = 'manifest.json'
+FILTERS = ['country', 'category', 'tag', 'keyword']
+MOVEMENTS = ['overview', 'grid', 'country', 'category', 'tag', 'keyword']
+
+JOB = typing.Dict[str, typing.Optional[str]]
+
+_worker_visualization: typing.Optional[viz.NewsVisualization] = None
+
+
+class RenderJob:
+    """Description of a single image to render."""
+
+    def __init__(self, index: int, name: str, movement: str, filters: JOB):
+        """Create a new record of a render job.
+
+        Args:
+            index: The position of this job within the batch, used to order outputs.
+            name: Human readable name for this job.
+            movement: The movement to render like overview or grid.
+            filters: Mapping from filter dimension (country, category, tag, keyword) to the value
+                for which to filter or None if no filter is applied for that dimension.
+        """
+        self._index = index
+        self._name = name
+        self._movement = movement
+        self._filters = filters
+
+    def get_index(self) -> int:
+        """Get the position of this job within the batch.
+
+        Returns:
+            Zero-indexed position of this job.
+        """
+        return self._index
+
+    def get_name(self) -> str:
+        """Get the human readable name of this job.
+
+        Returns:
+            Name describing this job.
+        """
+        return self._name
+
+    def get_movement(self) -> str:
+        """Get the movement to render.
+
+        Returns:
+            The name of the movement like overview or grid.
+        """
+        return self._movement
+
+    def get_filters(self) -> JOB:
+        """Get the filters to apply prior to rendering.
+
+        Returns:
+            Mapping from filter dimension to the value for which to filter or None if not filtered.
+        """
+        return self._filters
+
+    def get_filename(self) -> str:
+        """Get the filename for the image rendered by this job.
+
+        Returns:
+            Filename unique within the batch.
+        """
+        safe_name = ''.join(map(lambda x: x if x.isalnum() else '_', self._name))
+        return '%05d_%s.png' % (self._index, safe_name[:60])
+
+
+def expand_jobs(specs: typing.List[typing.Dict],
+    accessor: data_util.DataAccessor) -> typing.List[RenderJob]:
+    """Convert job descriptions into render jobs, expanding "each" requests.
+
+    Args:
+        specs: List of job descriptions as found in the job JSON file.
+        accessor: Accessor with which to find all values of a dimension for "each" requests.
+
+    Returns:
+        List of render jobs in the order in which they were described.
+    """
+    all_results = accessor.execute_query(data_util.Query(None, None, None, None, None))
+    values_by_dimension = {
+        'country': all_results.get_countries(),
+        'category': all_results.get_categories(),
+        'tag': all_results.get_tags(),
+        'keyword': all_results.get_keywords()
+    }
+
+    jobs_flat: typing.List[typing.Tuple[str, str, JOB]] = []
+
+    for spec in specs:
+        movement = spec.get('movement', 'overview')
+        if movement not in MOVEMENTS:
+            raise RuntimeError('Unexpected movement: %s' % movement)
+
+        filters = dict(map(lambda x: (x, spec.get(x, None)), FILTERS))
+
+        each = spec.get('each', None)
+        if each is None:
+            default_name = '_'.join([movement] + [str(x) for x in filters.values() if x])
+            jobs_flat.append((spec.get('name', default_name), movement, filters))
+        elif each in values_by_dimension:
+            for group in values_by_dimension[each]:
+                value = group.get_name()
+                new_filters = dict(filters)
+                new_filters[each] = value
+                name = '%s_%s_%s' % (spec.get('name', movement), each, value)
+                jobs_flat.append((name, movement, new_filters))
+        else:
+            raise RuntimeError('Unexpected dimension: %s' % each)
+
+    return [RenderJob(i, x[0], x[1], x[2]) for i, x in enumerate(jobs_flat)]
+
+
+def render_batch(jobs: typing.List[RenderJob], output_dir: str,
+    workers: typing.Optional[int] = None) -> typing.List[typing.Dict]:
+    """Render jobs across a process pool and write a manifest.
+
+    Args:
+        jobs: The jobs to render.
+        output_dir: The directory in which images and the manifest should be written.
+        workers: The number of worker processes or None to use one per core.
+
+    Returns:
+        Manifest records in job order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [(x, output_dir) for x in jobs]
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        records = pool.map(_render_job, tasks, chunksize=1)
+
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(manifest_path, 'w') as f:
+        json.dump(records, f, indent=2)
+
+    return records
+
+
+def _init_worker():
+    global _worker_visualization
+    _worker_visualization = viz.NewsVisualization(interactive=False)
+
+
+def _render_job(task: typing.Tuple[RenderJob, str]) -> typing.Dict:
+    job, output_dir = task
+    visualization = _worker_visualization
+    assert visualization is not None
+
+    start = time.time()
+
+    state = visualization.get_state()
+    filters = job.get_filters()
+    state.set_country_selected(filters['country'])  # type: ignore
+    state.set_category_selected(filters['category'])  # type: ignore
+    state.set_tag_selected(filters['tag'])  # type: ignore
+    state.set_keyword_selected(filters['keyword'])  # type: ignore
+
+    visualization.set_movement(job.get_movement())
+
+    filename = job.get_filename()
+    visualization.save_image(os.path.join(output_dir, filename))
+
+    return {
+        'index': job.get_index(),
+        'name': job.get_name(),
+        'movement': job.get_movement(),
+        'filters': filters,
+        'filename': filename,
+        'seconds': time.time() - start
+    }
+
+
+def main():
+    """Entry point for batch rendering from the command line."""
+    if len(sys.argv) < 3:
+        print('Usage: python batch_render.py jobs.json output_dir [workers]')
+        sys.exit(1)
+
+    jobs_path = sys.argv[1]
+    output_dir = sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    with open(jobs_path) as f:
+        specs = json.load(f)
+
+    with open(os.path.join('txt', 'serialized.txt')) as f:
+        accessor = data_util.CompressedDataAccessor(f.read().split('\n'))
+
+    jobs = expand_jobs(specs, accessor)
+    records = render_batch(jobs, output_dir, workers)
+    print('Rendered %d images to %s' % (len(records), output_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Utilities for splitting line-oriented files into chunks for parallel processing.
+
+License: BSD
+"""
+
+import os
+import typing
+
+BYTE_RANGE = typing.Tuple[int, int]
+
+
+def get_line_aligned_ranges(path: str, num_chunks: int,
+    start: int = 0) -> typing.List[BYTE_RANGE]:
+    """Split a file into byte ranges which start and end on line boundaries.
+
+    Args:
+        path: The path to the file to split.
+        num_chunks: The desired number of ranges. Fewer may be returned for small files.
+        start: The offset of the start of a line from which to split such that earlier lines are
+            excluded. Defaults to zero to split the entire file.
+
+    Returns:
+        List of (start, end) byte offsets in file order where end is exclusive. Together they
+        cover the file from start without overlap.
+    """
+    size = os.path.getsize(path)
+    if size <= start:
+        return []
+
+    num_chunks = max(1, num_chunks)
+    target_size = max(1, (size - start) // num_chunks)
+
+    boundaries = [start]
+    with open(path, 'rb') as f:
+        while boundaries[-1] < size:
+            f.seek(min(boundaries[-1] + target_size, size))
+            if f.tell() < size:
+                f.readline()
+            boundaries.append(f.tell())
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def read_lines(path: str, start: int, end: int) -> typing.Iterable[str]:
+    """Read the lines found within a byte range.
+
+    Args:
+        path: The path to the file to read.
+        start: The offset of the first byte of the first line.
+        end: The offset just after the last byte of the last line.
+
+    Returns:
+        Iterable over decoded lines including their line endings.
+    """
+    return map(lambda x: x[1], read_lines_with_offsets(path, start, end))
+
+
+def read_lines_with_offsets(path: str, start: int,
+    end: int) -> typing.Iterable[typing.Tuple[int, str]]:
+    """Read the lines found within a byte range along with where each starts.
+
+    Args:
+        path: The path to the file to read.
+        start: The offset of the first byte of the first line.
+        end: The offset just after the last byte of the last line.
+
+    Returns:
+        Iterable over tuples of the byte offset at which a line starts in the file and the decoded
+        line including its line ending.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                return
+
+            yield (position, line.decode('utf-8'))
+            position += len(line)
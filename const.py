@@ -38,6 +38,11 @@ SELECTOR_Y = BUTTON_Y
 SELECTOR_WIDTH = WIDTH - (BUTTON_WIDTH + 5) * 2
 SELECTOR_HEIGHT = BUTTON_HEIGHT + 2
 
+MAP_CENTER_X = WIDTH / 5 * 2
+MAP_CENTER_Y = HEIGHT / 7 * 5
+MAP_ZOOM = 0.2
+MAP_STROKE_COLOR = '#C0C0C0'
+
 FONT = os.path.join('third_party_web', 'IBMPlexMono-Regular.ttf')
 
 REWRITES = {
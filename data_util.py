@@ -1,15 +1,33 @@
 """Utilities for querying for article summary statistics.
 
 Utilities for querying for and working with summary statistics which describe a collection of
-Articles.
+Articles. Filters may have multiple values per dimension (like several countries) where articles
+matching any value are included for that dimension and articles must satisfy every dimension.
+Articles are also counted by publication month (bucket) so that queries may filter by a range of
+months and report trends without reading individual articles. Article sets may also record the byte
+offsets of their rows in the article table such that matching articles can be read directly. Those
+offsets are only used while the article table matches the signature (size and modification time)
+recorded with them as they point into whichever table the compressed file was built from.
 
 License: BSD
 """
 
+import bisect
+import functools
+import heapq
 import itertools
+import operator
+import os
 import typing
 
 OPT_STR = typing.Optional[str]
+FILTER_VALUES = typing.Optional[typing.Union[str, typing.Iterable[str]]]
+VALUE_SEPARATOR = ';'
+BUCKET_LENGTH = 7
+BUCKETS = typing.Dict[str, int]
+NO_OFFSETS = '-1'
+ARTICLES_PATH = os.path.join('csv', 'articles.csv')
+DICTIONARY_COMMANDS = {'n', 'c', 't', 'k'}
 PATH_DB = 'articles.db'
 CATEGORIES = {
     'people and society',
@@ -20,31 +38,148 @@ CATEGORIES = {
 }
 
 
+def make_values(target: FILTER_VALUES) -> typing.FrozenSet[str]:
+    """Normalize one or more filter values.
+
+    Args:
+        target: None, a single value, values joined by VALUE_SEPARATOR, or an iterable of values.
+
+    Returns:
+        Set of the individual values which is empty if no filter should be applied.
+    """
+    if target is None:
+        return frozenset()
+
+    if isinstance(target, str):
+        target = target.split(VALUE_SEPARATOR)
+
+    return frozenset(filter(lambda x: x != '', target))
+
+
+def get_bucket(published: str) -> OPT_STR:
+    """Get the time bucket (month) in which an article was published.
+
+    Args:
+        published: The ISO8601 date or datetime on which the article was published.
+
+    Returns:
+        The bucket like 2024-01 or None if the date is missing or too short.
+    """
+    if len(published) < BUCKET_LENGTH:
+        return None
+
+    return published[:BUCKET_LENGTH]
+
+
+def encode_offsets(offsets: typing.Iterable[int]) -> str:
+    """Serialize ascending byte offsets compactly.
+
+    Args:
+        offsets: The offsets in ascending order.
+
+    Returns:
+        The first offset followed by the difference from each offset to the next, joined by
+        VALUE_SEPARATOR, or NO_OFFSETS if there are no offsets.
+    """
+    offsets_list = list(offsets)
+    if len(offsets_list) == 0:
+        return NO_OFFSETS
+
+    differences = map(lambda x: x[1] - x[0], zip([0] + offsets_list[:-1], offsets_list))
+    return VALUE_SEPARATOR.join(map(lambda x: str(x), differences))
+
+
+def decode_offsets(target: str) -> typing.List[int]:
+    """Parse byte offsets serialized by encode_offsets.
+
+    Args:
+        target: The serialized offsets.
+
+    Returns:
+        The offsets in ascending order.
+    """
+    if target == NO_OFFSETS:
+        return []
+
+    differences = map(lambda x: int(x), target.split(VALUE_SEPARATOR))
+    return list(itertools.accumulate(differences))
+
+
+def get_table_signature(path: str = ARTICLES_PATH) -> OPT_STR:
+    """Describe the contents of an article table such that offsets into it can be checked.
+
+    Only the file metadata is read so that the check is cheap enough to run on every call. A table
+    which is copied or touched without changing its contents no longer matches such that its
+    offsets are ignored until the compressed file is rebuilt.
+
+    Args:
+        path: Path to the article table. Defaults to ARTICLES_PATH.
+
+    Returns:
+        The size in bytes and modification time in nanoseconds joined by a colon or None if the file
+        is not available (like in the browser).
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return '%d:%d' % (stat.st_size, stat.st_mtime_ns)
+
+
+def join_values(values: typing.FrozenSet[str]) -> OPT_STR:
+    """Serialize filter values in a stable order.
+
+    Args:
+        values: The individual filter values.
+
+    Returns:
+        The values sorted and joined by VALUE_SEPARATOR or None if there are no values.
+    """
+    if len(values) == 0:
+        return None
+
+    return VALUE_SEPARATOR.join(sorted(values))
+
+
 class Query:
-    """Object describing a query for a set of articles to be summarized as statistics."""
+    """Object describing a query for a set of articles to be summarized as statistics.
 
-    def __init__(self, category: OPT_STR, pre_category: OPT_STR, country: OPT_STR, tag: OPT_STR,
-        keyword: OPT_STR):
+    Each filter dimension may have multiple values given as an iterable or as a string with values
+    joined by VALUE_SEPARATOR. Articles matching any value within a dimension are included for that
+    dimension and articles must be included by every dimension with filters.
+    """
+
+    def __init__(self, category: OPT_STR, pre_category: FILTER_VALUES, country: FILTER_VALUES,
+        tag: FILTER_VALUES, keyword: FILTER_VALUES, start: OPT_STR = None, end: OPT_STR = None):
         """Create a new query.
 
         Args:
             category: The database name for a category for which articles should be filtered. Pass
                 None if all categories should be included.
-            pre_category: The database name for a second category for which articles should be
+            pre_category: The database name(s) for second categories for which articles should be
                 filtered prior to applying other filters. Pass None if all categories should be
                 included.
-            country: The database name for a country for which articles should be filtered. Pass
+            country: The database name(s) for countries for which articles should be filtered. Pass
                 None if all countries should be included.
-            tag: The database name for a tag for which articles should be filtered. Pass None if all
-                tags should be included.
-            keyword: The database name for a keyword for which articles should be filtered. Pass
+            tag: The database name(s) for tags for which articles should be filtered. Pass None if
+                all tags should be included.
+            keyword: The database name(s) for keywords for which articles should be filtered. Pass
                 None if all keywords should be included.
+            start: The first bucket (month like 2024-01) in which articles should be included where
+                longer ISO8601 dates are truncated to their month. Pass None if there is no lower
+                bound on publication date. Defaults to None.
+            end: The last bucket (month like 2024-12) in which articles should be included where
+                longer ISO8601 dates are truncated to their month. Pass None if there is no upper
+                bound on publication date. Defaults to None.
         """
         self._category = category
-        self._pre_category = pre_category
-        self._country = country
-        self._tag = tag
-        self._keyword = keyword
+        self._pre_categories = make_values(pre_category)
+        self._countries = make_values(country)
+        self._tags = make_values(tag)
+        self._keywords = make_values(keyword)
+        self._start = None if start is None else start[:BUCKET_LENGTH]
+        self._end = None if end is None else end[:BUCKET_LENGTH]
 
     def has_category(self) -> bool:
         """Determine if this query has a category for which articles should be filtered.
@@ -69,16 +204,25 @@ class Query:
         Returns:
             True if there is a category pre-filter and False otherwise.
         """
-        return self._pre_category is not None
+        return len(self._pre_categories) > 0
 
     def get_pre_category(self) -> OPT_STR:
-        """Get the potential category for which this query pre-filters.
+        """Get the potential categories for which this query pre-filters.
 
         Returns:
-            The database name for a category for which articles should be pre-filtered. Will be None
-            if all categories should be included.
+            The database names for categories for which articles should be pre-filtered joined by
+            VALUE_SEPARATOR in sorted order. Will be None if all categories should be included.
         """
-        return self._pre_category
+        return join_values(self._pre_categories)
+
+    def get_pre_categories(self) -> typing.FrozenSet[str]:
+        """Get the individual categories for which this query pre-filters.
+
+        Returns:
+            Set of database names for categories where articles in any are included. Empty if
+            all categories should be included.
+        """
+        return self._pre_categories
 
     def has_country(self) -> bool:
         """Determine if this query has a country for which articles should be filtered.
@@ -86,16 +230,25 @@ class Query:
         Returns:
             True if there is a country filter and False otherwise.
         """
-        return self._country is not None
+        return len(self._countries) > 0
 
     def get_country(self) -> OPT_STR:
-        """Get the potential country for which this query filters.
+        """Get the potential countries for which this query filters.
 
         Returns:
-            The database name for a country for which articles should be filtered. Will be None if
+            The database names for countries for which articles should be filtered joined by
+            VALUE_SEPARATOR in sorted order. Will be None if all countries should be included.
+        """
+        return join_values(self._countries)
+
+    def get_countries(self) -> typing.FrozenSet[str]:
+        """Get the individual countries for which this query filters.
+
+        Returns:
+            Set of database names for countries where articles in any are included. Empty if
             all countries should be included.
         """
-        return self._country
+        return self._countries
 
     def has_tag(self) -> bool:
         """Determine if this query has a tag for which articles should be filtered.
@@ -103,16 +256,25 @@ class Query:
         Returns:
             True if there is a tag filter and False otherwise.
         """
-        return self._tag is not None
+        return len(self._tags) > 0
 
     def get_tag(self) -> OPT_STR:
-        """Get the potential tag for which this query filters.
+        """Get the potential tags for which this query filters.
 
         Returns:
-            The database name for a tag for which articles should be filtered. Will be None if
+            The database names for tags for which articles should be filtered joined by
+            VALUE_SEPARATOR in sorted order. Will be None if all tags should be included.
+        """
+        return join_values(self._tags)
+
+    def get_tags(self) -> typing.FrozenSet[str]:
+        """Get the individual tags for which this query filters.
+
+        Returns:
+            Set of database names for tags where articles in any are included. Empty if
             all tags should be included.
         """
-        return self._tag
+        return self._tags
 
     def has_keyword(self) -> bool:
         """Determine if this query has a keyword for which articles should be filtered.
@@ -120,16 +282,49 @@ class Query:
         Returns:
             True if there is a keyword filter and False otherwise.
         """
-        return self._keyword is not None
+        return len(self._keywords) > 0
 
     def get_keyword(self) -> OPT_STR:
-        """Get the potential keyword for which this query filters.
+        """Get the potential keywords for which this query filters.
 
         Returns:
-            The database name for a keyword for which articles should be filtered. Will be None if
+            The database names for keywords for which articles should be filtered joined by
+            VALUE_SEPARATOR in sorted order. Will be None if all keywords should be included.
+        """
+        return join_values(self._keywords)
+
+    def get_keywords(self) -> typing.FrozenSet[str]:
+        """Get the individual keywords for which this query filters.
+
+        Returns:
+            Set of database names for keywords where articles in any are included. Empty if
             all keywords should be included.
         """
-        return self._keyword
+        return self._keywords
+
+    def has_date_range(self) -> bool:
+        """Determine if this query filters by publication date.
+
+        Returns:
+            True if there is a start or end bucket and False otherwise.
+        """
+        return self._start is not None or self._end is not None
+
+    def get_start(self) -> OPT_STR:
+        """Get the first bucket in which articles are included.
+
+        Returns:
+            Inclusive bucket (month like 2024-01) or None if there is no lower bound.
+        """
+        return self._start
+
+    def get_end(self) -> OPT_STR:
+        """Get the last bucket in which articles are included.
+
+        Returns:
+            Inclusive bucket (month like 2024-12) or None if there is no upper bound.
+        """
+        return self._end
 
     def get_has_filters(self) -> bool:
         """Determine if this query has any filters.
@@ -142,7 +337,8 @@ class Query:
             self.has_pre_category(),
             self.has_country(),
             self.has_tag(),
-            self.has_keyword()
+            self.has_keyword(),
+            self.has_date_range()
         ]
         return sum(map(lambda x: 1 if x else 0, all_flags)) > 0
 
@@ -155,11 +351,15 @@ class Query:
         """
         components = [
             self._category,
-            self._pre_category,
-            self._country,
-            self._tag,
-            self._keyword
+            self.get_pre_category(),
+            self.get_country(),
+            self.get_tag(),
+            self.get_keyword()
         ]
+
+        if self.has_date_range():
+            components += [self._start, self._end]
+
         components_str = map(lambda x: str(x), components)
         return '\t'.join(components_str)
 
@@ -197,6 +397,7 @@ class CountedGroup:
 
 
 COUNTED_GROUPS = typing.List[CountedGroup]
+NAMED = typing.Union['Country', 'Category', 'Tag', 'Keyword']
 
 
 class Country:
@@ -244,7 +445,9 @@ class Result:
 
     def __init__(self, total_count: int, group_count: int, categories: COUNTED_GROUPS,
         countries: COUNTED_GROUPS, country_totals: COUNTED_GROUPS, tags: COUNTED_GROUPS,
-        keywords: COUNTED_GROUPS, has_filters: bool):
+        keywords: COUNTED_GROUPS, has_filters: bool,
+        buckets: typing.Optional[COUNTED_GROUPS] = None,
+        bucket_totals: typing.Optional[COUNTED_GROUPS] = None):
         """Create a record of a query result.
 
         Args:
@@ -260,6 +463,11 @@ class Result:
             has_filters: Flag indicating if the query used to generate these results had any
                 filters. True if the query had filters and false if it had no filters and all of the
                 population is in this result.
+            buckets: The number of these articles published in each bucket (month) in
+                chronological order or None if not available. Defaults to None.
+            bucket_totals: The number of all articles in the target population published in each
+                bucket regardless of if they satisfy the query's filters or None if not available.
+                Defaults to None.
         """
         self._total_count = total_count
         self._group_count = group_count
@@ -269,6 +477,8 @@ class Result:
         self._tags = tags
         self._keywords = keywords
         self._has_filters = has_filters
+        self._buckets = [] if buckets is None else buckets
+        self._bucket_totals = [] if bucket_totals is None else bucket_totals
 
     def get_total_count(self) -> int:
         """Get the number of articles in the population from which these articles were queried.
@@ -337,6 +547,24 @@ class Result:
         """
         return self._has_filters
 
+    def get_buckets(self) -> COUNTED_GROUPS:
+        """Get the number of these query results published in each time bucket.
+
+        Returns:
+            Counts per bucket (month like 2024-01) in chronological order. Articles without a
+            publication date are not included.
+        """
+        return self._buckets
+
+    def get_bucket_totals(self) -> COUNTED_GROUPS:
+        """Get the total number of articles per time bucket from which these results were queried.
+
+        Returns:
+            Counts per bucket (month like 2024-01) in chronological order of all articles in the
+            target population regardless of if they satisfy the query's filters.
+        """
+        return self._bucket_totals
+
 
 class Tag:
     """Object representing a tag in the topic model."""
@@ -416,7 +644,8 @@ class ArticleSet:
     """
 
     def __init__(self, country: Country, categories: typing.List[Category], tags: typing.List[Tag],
-        keywords: typing.List[Keyword], count: int):
+        keywords: typing.List[Keyword], count: int, buckets: typing.Optional[BUCKETS] = None,
+        offsets: OPT_STR = None):
         """Create a new record of a set of articles with identical results in the topical model.
 
         Args:
@@ -425,12 +654,20 @@ class ArticleSet:
             tags: List of tags in which all of these articles are members.
             keywords: List of keywords in which all of these articles are members.
             count: Number of articles in this set.
+            buckets: Mapping from bucket (month like 2024-01) to number of these articles published
+                in that bucket or None if publication dates are not known. Defaults to None.
+            offsets: The byte offsets of these articles' rows in the article table serialized by
+                encode_offsets (decoded only if requested) or None if not known. Defaults to None.
         """
         self._country = country
         self._categories = categories
         self._tags = tags
         self._keywords = keywords
         self._count = count
+        self._buckets = buckets if buckets is not None else {}
+        self._bucket_names: typing.Optional[typing.List[str]] = None
+        self._bucket_prefix: typing.List[int] = []
+        self._offsets = offsets
 
     def get_country(self) -> Country:
         """Get the country where all of these articles are found.
@@ -505,6 +742,79 @@ class ArticleSet:
         """
         return self._count
 
+    def get_buckets(self) -> BUCKETS:
+        """Get the number of these articles published per time bucket.
+
+        Returns:
+            Mapping from bucket (month like 2024-01) to count which is empty if publication dates
+            are not known.
+        """
+        return self._buckets
+
+    def get_offsets(self) -> typing.Optional[typing.List[int]]:
+        """Get where the rows of these articles start in the article table.
+
+        Returns:
+            Byte offsets in ascending order or None if not known.
+        """
+        if self._offsets is None:
+            return None
+
+        return decode_offsets(self._offsets)
+
+    def get_count_in_range(self, start: OPT_STR, end: OPT_STR) -> int:
+        """Get the number of these articles published within a range of time buckets.
+
+        Args:
+            start: The first bucket to include (inclusive) or None if no lower bound.
+            end: The last bucket to include (inclusive) or None if no upper bound.
+
+        Returns:
+            Count of articles in the range. Articles without a publication date are never in range.
+        """
+        low, high = self._get_bucket_indices(start, end)
+        return self._bucket_prefix[high] - self._bucket_prefix[low]
+
+    def get_in_range(self, start: OPT_STR, end: OPT_STR) -> 'ArticleSet':
+        """Get the subset of these articles published within a range of time buckets.
+
+        Args:
+            start: The first bucket to include (inclusive) or None if no lower bound.
+            end: The last bucket to include (inclusive) or None if no upper bound.
+
+        Returns:
+            New article set with the same metadata whose count and buckets only include articles in
+            the range. Offsets are those of all of these articles as they are not recorded per
+            bucket.
+        """
+        low, high = self._get_bucket_indices(start, end)
+        names = typing.cast(typing.List[str], self._bucket_names)
+        prefix = self._bucket_prefix
+        buckets = dict(map(lambda i: (names[i], prefix[i + 1] - prefix[i]), range(low, high)))
+        return ArticleSet(
+            self._country,
+            self._categories,
+            self._tags,
+            self._keywords,
+            prefix[high] - prefix[low],
+            buckets,
+            self._offsets
+        )
+
+    def _get_bucket_indices(self, start: OPT_STR, end: OPT_STR) -> typing.Tuple[int, int]:
+        # Prefix sums built on first use such that the count in a range of buckets is a difference
+        # of two entries.
+        if self._bucket_names is None:
+            bucket_items = sorted(self._buckets.items())
+            bucket_counts = map(lambda x: x[1], bucket_items)
+            self._bucket_prefix = list(itertools.accumulate(bucket_counts, initial=0))
+            self._bucket_names = [x[0] for x in bucket_items]
+
+        names = self._bucket_names
+        low = 0 if start is None else bisect.bisect_left(names, start)
+        high = len(names) if end is None else bisect.bisect_right(names, end)
+        return (low, max(low, high))
+
     def _check_for(self, name: str, target) -> bool:
         names = map(lambda x: x.get_name(), target)
         matched = filter(lambda x: x == name, names)
@@ -526,47 +836,162 @@ class DataAccessor:
         """
         raise RuntimeError('Use implementor.')
 
+    def get_offsets(self, query: Query) -> typing.Optional[typing.List[int]]:
+        """Find where the rows of articles which may match a query start in the article table.
+
+        Args:
+            query: The query whose country, pre-category, tag, keyword, and date range filters
+                select articles. The category (see Query.get_category) does not narrow them.
+
+        Returns:
+            Ascending byte offsets of a superset of the matching rows such that rows still need to
+            be filtered or None if offsets are not available or do not describe the current article
+            table in which case the table should be scanned.
+        """
+        return None
+
+
+class SwappableDataAccessor(DataAccessor):
+    """Data accessor which delegates to another accessor that may be replaced while running."""
+
+    def __init__(self, inner: DataAccessor):
+        """Create a new accessor.
+
+        Args:
+            inner: The accessor to which queries are initially delegated.
+        """
+        self._inner = inner
+
+    def swap(self, inner: DataAccessor):
+        """Replace the accessor to which queries are delegated.
+
+        Queries already executing finish against the prior accessor.
+
+        Args:
+            inner: The fully loaded accessor to use for future queries.
+        """
+        self._inner = inner
+
+    def get_inner(self) -> DataAccessor:
+        """Get the accessor to which queries are currently delegated.
+
+        Returns:
+            The current inner accessor.
+        """
+        return self._inner
+
+    def execute_query(self, query: Query) -> Result:
+        return self._inner.execute_query(query)
+
+    def get_offsets(self, query: Query) -> typing.Optional[typing.List[int]]:
+        return self._inner.get_offsets(query)
+
 
 class CompressedDataAccessor(DataAccessor):
-    """Data accessor which queries inside a file using a custom compressed article format."""
+    """Data accessor which queries inside a file using a custom compressed article format.
+
+    Filters are evaluated with bitmaps over article sets such that each filter value has an integer
+    whose bit i is set if article set i has that value. Values within a dimension are combined by
+    union (or) and dimensions by intersection (and) so many values cost about as much as one.
+    Bitmaps are built from recorded positions the first time each value is queried. Publication date
+    ranges are applied to matching article sets through prefix sums over their time buckets and the
+    population totals (per country and per bucket) come from per-country prefix sums such that a
+    range costs about one subtraction per bucket rather than a rescan of articles. Article sets from
+    files without time buckets are excluded from queries with a date range.
+
+    Article sets may end with the byte offsets of their rows in the article table. These are only
+    returned while the article table matches the signature given by the last table line (o
+    signature, see get_table_signature) such that offsets into a different or changed table are
+    never used.
+
+    Files may also hold population lines (p country count buckets) which fix the per-country and
+    per-bucket totals independently of the article sets loaded and summary lines (s category field
+    values) with precomputed results for queries without filters (category -1 if none). These allow
+    a file with only dictionaries and summaries to answer the default views while article sets are
+    loaded later (see ShardedDataAccessor).
+    """
 
-    def __init__(self, contents: typing.Iterable[str]):
+    def __init__(self, contents: typing.Iterable[str], table_path: str = ARTICLES_PATH):
         """Create a new accessor around contents of a compressed file.
 
         Args:
             contents: The string lines of the compressed file.
+            table_path: Path to the article table into which offsets point. Defaults to
+                ARTICLES_PATH.
         """
+        self._table_path = table_path
+        self._table_signature: OPT_STR = None
         self._countries: typing.Dict[int, Country] = {}
         self._categories: typing.Dict[int, Category] = {}
         self._tags: typing.Dict[int, Tag] = {}
         self._keywords: typing.Dict[int, Keyword] = {}
         self._articles: typing.List[ArticleSet] = []
+        self._positions: typing.Dict[typing.Tuple[str, str], typing.List[int]] = {}
+        self._bitmaps: typing.Dict[typing.Tuple[str, str], int] = {}
+        self._populations: typing.Optional[typing.List[ArticleSet]] = None
+        self._fixed_populations: typing.List[ArticleSet] = []
+        self._summaries: typing.Dict[OPT_STR, typing.Dict[str, str]] = {}
 
-        self._last_query_str = ''
-        self._last_result: typing.Optional[Result] = None
+        self._last_query: typing.Optional[typing.Tuple[str, Result]] = None
 
-        strategies = {
-            'n': lambda x: self._load_country(x),
-            'c': lambda x: self._load_category(x),
-            't': lambda x: self._load_tag(x),
-            'k': lambda x: self._load_keyword(x),
-            'a': lambda x: self._load_article_set(x)
-        }
+        self._load_lines(contents)
 
-        for line in contents:
-            command = line[0]
-            strategy = strategies[command]
-            strategy(line)
+    def apply_delta(self, contents: typing.Iterable[str]):
+        """Merge lines appended to the compressed file without reloading it.
+
+        Dictionary lines (n, c, t, k) add entries and a lines add article sets. The cached result,
+        filter bitmaps, and population totals are cleared if the delta holds any other line (like
+        article sets or population totals) as those may change counts for every query (including
+        country totals) whereas new dictionary entries are not referenced by prior article sets.
+        New article sets also discard summary and population lines loaded before the delta as those
+        were precomputed without the new articles.
+
+        Args:
+            contents: The string lines of the delta in the same compressed format.
+        """
+        lines = list(filter(lambda x: x.strip() != '', contents))
+
+        if any(map(lambda x: x[0] == 'a', lines)):
+            self._summaries = {}
+            self._fixed_populations = []
+
+        self._merge_lines(lines)
+
+    def load_shard(self, contents: typing.Iterable[str]):
+        """Merge article sets already counted by the loaded summary and population lines.
+
+        Unlike apply_delta, summary and population lines are kept as the shard holds part of the
+        articles from which they were precomputed (see ShardedDataAccessor).
+
+        Args:
+            contents: The string lines of the shard in the same compressed format.
+        """
+        self._merge_lines(list(filter(lambda x: x.strip() != '', contents)))
 
     def execute_query(self, query: Query) -> Result:
         id_str = query.get_id_str()
-        if self._last_query_str == id_str:
-            assert self._last_result is not None
-            return self._last_result
+        last_query = self._last_query
+        if last_query is not None and last_query[0] == id_str:
+            return last_query[1]
+
+        summary = self._get_summary(query)
+        if summary is not None:
+            self._last_query = (id_str, summary)
+            return summary
 
+        populations = self._get_populations()
         addressable = self._get_addressable(query)
+        if query.has_date_range():
+            addressable = self._get_in_range(addressable, query.get_start(), query.get_end())
+            populations = self._get_in_range(populations, query.get_start(), query.get_end())
+            by_country = self._get_by_country(populations)
+        elif len(self._fixed_populations) > 0:
+            by_country = self._get_by_country(self._fixed_populations)
+        else:
+            by_country = self._get_by_country(self._articles)
+
         total_count = self._get_total_count(addressable)
-        by_country = self._get_by_country(self._articles)
+        bucket_totals = self._get_by_bucket(populations)
 
         category = query.get_category()
         group_count = self._get_total_count_in_category(addressable, category)
@@ -574,6 +999,7 @@ class CompressedDataAccessor(DataAccessor):
         categories = self._get_categories_in_category(addressable, category)
         tags = self._get_tags_in_category(addressable, category)
         keywords = self._get_keywords_in_category(addressable, category)
+        buckets = self._get_by_bucket_in_category(addressable, category)
 
         new_result = Result(
             total_count,
@@ -583,46 +1009,163 @@ class CompressedDataAccessor(DataAccessor):
             by_country,
             tags,
             keywords,
-            query.get_has_filters()
+            query.get_has_filters(),
+            buckets,
+            bucket_totals
         )
 
-        self._last_query_str = id_str
-        self._last_result = new_result
+        self._last_query = (id_str, new_result)
 
         return new_result
 
-    def _get_addressable(self, query: Query) -> typing.List[ArticleSet]:
-        addressable_group: typing.Iterable[ArticleSet] = self._articles
+    def get_populated_country_ids(self) -> typing.Dict[str, int]:
+        """Get the ids of countries found in the population totals.
 
-        if query.has_country():
-            target_country = query.get_country()
-            addressable_group = filter(
-                lambda article: article.get_country().get_name() == target_country,
-                addressable_group
-            )
+        Returns:
+            Mapping from country name to id for countries in population lines if loaded or, if not,
+            countries with articles that have publication dates.
+        """
+        populated = set(map(lambda x: x.get_country().get_name(), self._get_populations()))
+        country_items = filter(lambda x: x[1].get_name() in populated, self._countries.items())
+        return dict(map(lambda x: (x[1].get_name(), x[0]), country_items))
 
-        if query.has_pre_category():
-            target_category = query.get_pre_category()
-            addressable_group = filter(
-                lambda article: article.has_category(target_category),  # type: ignore
-                addressable_group
-            )
+    def has_summary(self, query: Query) -> bool:
+        """Determine if a query can be answered from summary lines without any article sets.
 
-        if query.has_tag():
-            target_tag = query.get_tag()
-            addressable_group = filter(
-                lambda article: article.has_tag(target_tag),  # type: ignore
-                addressable_group
-            )
+        Args:
+            query: The query to check.
 
-        if query.has_keyword():
-            target_keyword = query.get_keyword()
-            addressable_group = filter(
-                lambda article: article.has_keyword(target_keyword),  # type: ignore
-                addressable_group
-            )
+        Returns:
+            True if the query has no filters and a summary was loaded for its category.
+        """
+        return not query.get_has_filters() and query.get_category() in self._summaries
+
+    def _get_summary(self, query: Query) -> typing.Optional[Result]:
+        if not self.has_summary(query):
+            return None
+
+        fields = self._summaries[query.get_category()]
+        names: typing.Dict[str, typing.Mapping[int, NAMED]] = {
+            'categories': self._categories,
+            'countries': self._countries,
+            'tags': self._tags,
+            'keywords': self._keywords
+        }
+
+        def load_groups(field: str) -> COUNTED_GROUPS:
+            pairs = self._load_buckets(fields[field]).items()
+            if field == 'buckets':
+                return list(map(lambda x: CountedGroup(x[0], x[1]), pairs))
+
+            names_by_id = names[field]
+            return list(map(
+                lambda x: CountedGroup(names_by_id[int(x[0])].get_name(), x[1]),
+                pairs
+            ))
+
+        populations = self._get_populations()
+        if len(self._fixed_populations) > 0:
+            by_country = self._get_by_country(self._fixed_populations)
+        else:
+            by_country = self._get_by_country(self._articles)
+
+        return Result(
+            int(fields['total']),
+            int(fields['group']),
+            load_groups('categories'),
+            load_groups('countries'),
+            by_country,
+            load_groups('tags'),
+            load_groups('keywords'),
+            False,
+            load_groups('buckets'),
+            self._get_by_bucket(populations)
+        )
+
+    def _get_addressable(self, query: Query) -> typing.List[ArticleSet]:
+        dimensions = [
+            ('country', query.get_countries()),
+            ('category', query.get_pre_categories()),
+            ('tag', query.get_tags()),
+            ('keyword', query.get_keywords())
+        ]
+        dimensions_filtered = filter(lambda x: len(x[1]) > 0, dimensions)
+
+        masks = map(
+            lambda x: functools.reduce(
+                operator.or_,
+                map(lambda value: self._get_bitmap(x[0], value), x[1]),
+                0
+            ),
+            dimensions_filtered
+        )
+        mask = functools.reduce(operator.and_, masks, -1)
+        if mask == -1:
+            return list(self._articles)
+
+        # Binary digits reversed such that character i describes article set i.
+        selectors = map('1'.__eq__, bin(mask)[:1:-1])
+        return list(itertools.compress(self._articles, selectors))
+
+    def get_offsets(self, query: Query) -> typing.Optional[typing.List[int]]:
+        if self._table_signature is None:
+            return None
+
+        if self._table_signature != get_table_signature(self._table_path):
+            return None
 
-        return list(addressable_group)
+        addressable = self._get_addressable(query)
+        if query.has_date_range():
+            addressable = self._get_in_range(addressable, query.get_start(), query.get_end())
+
+        offsets = list(map(lambda x: x.get_offsets(), addressable))
+        if None in offsets:
+            return None
+
+        return list(heapq.merge(*offsets))  # type: ignore
+
+    def _get_in_range(self, target: typing.List[ArticleSet], start: OPT_STR,
+        end: OPT_STR) -> typing.List[ArticleSet]:
+        in_range = map(lambda x: x.get_in_range(start, end), target)
+        return list(filter(lambda x: x.get_count() > 0, in_range))
+
+    def _get_populations(self) -> typing.List[ArticleSet]:
+        if self._populations is not None:
+            return self._populations
+
+        if len(self._fixed_populations) > 0:
+            self._populations = self._fixed_populations
+            return self._populations
+
+        buckets_by_country: typing.Dict[str, BUCKETS] = {}
+        countries: typing.Dict[str, Country] = {}
+        for article in self._articles:
+            country = article.get_country()
+            countries[country.get_name()] = country
+            country_buckets = buckets_by_country.setdefault(country.get_name(), {})
+            for bucket, count in article.get_buckets().items():
+                country_buckets[bucket] = country_buckets.get(bucket, 0) + count
+
+        # One set per country holding all of its articles with publication dates.
+        self._populations = list(map(
+            lambda x: ArticleSet(countries[x[0]], [], [], [], sum(x[1].values()), x[1]),
+            buckets_by_country.items()
+        ))
+        return self._populations
+
+    def _get_bitmap(self, dimension: str, name: str) -> int:
+        key = (dimension, name)
+        cached = self._bitmaps.get(key, None)
+        if cached is not None:
+            return cached
+
+        bits = bytearray((len(self._articles) + 7) // 8)
+        for position in self._positions.get(key, []):
+            bits[position >> 3] |= 1 << (position & 7)
+
+        bitmap = int.from_bytes(bits, 'little')
+        self._bitmaps[key] = bitmap
+        return bitmap
 
     def _get_total_count(self, target: typing.List[ArticleSet]) -> int:
         return sum(map(lambda x: x.get_count(), target))
@@ -637,6 +1180,25 @@ class CompressedDataAccessor(DataAccessor):
 
         return self._convert_dict_to_counted_groups(ret_counts)
 
+    def _get_by_bucket(self, target: typing.Iterable[ArticleSet]) -> COUNTED_GROUPS:
+        ret_counts: typing.Dict[str, int] = {}
+
+        for article in target:
+            for bucket, count in article.get_buckets().items():
+                ret_counts[bucket] = ret_counts.get(bucket, 0) + count
+
+        objs = map(lambda x: CountedGroup(x[0], x[1]), ret_counts.items())
+        return sorted(objs, key=lambda x: x.get_name())
+
+    def _get_by_bucket_in_category(self, target: typing.List[ArticleSet],
+        category: OPT_STR) -> COUNTED_GROUPS:
+
+        in_category: typing.Iterable[ArticleSet] = target
+        if category:
+            in_category = filter(lambda x: x.has_category(category), target)
+
+        return self._get_by_bucket(in_category)
+
     def _get_total_count_in_category(self, target: typing.List[ArticleSet],
         category: OPT_STR) -> int:
 
@@ -730,6 +1292,35 @@ class CompressedDataAccessor(DataAccessor):
         objs = map(lambda x: CountedGroup(x[0], x[1]), target.items())
         return sorted(objs, key=lambda x: x.get_count(), reverse=True)
 
+    def _merge_lines(self, lines: typing.List[str]):
+        self._load_lines(lines)
+
+        if any(map(lambda x: x[0] not in DICTIONARY_COMMANDS, lines)):
+            self._last_query = None
+            self._bitmaps = {}
+            self._populations = None
+
+    def _load_lines(self, contents: typing.Iterable[str]):
+        strategies = {
+            'n': lambda x: self._load_country(x),
+            'c': lambda x: self._load_category(x),
+            't': lambda x: self._load_tag(x),
+            'k': lambda x: self._load_keyword(x),
+            'a': lambda x: self._load_article_set(x),
+            'p': lambda x: self._load_population(x),
+            's': lambda x: self._load_summary(x),
+            'o': lambda x: self._load_table_signature(x)
+        }
+
+        # Files end with a line ending which leaves an empty last line.
+        for line in filter(lambda x: x != '', contents):
+            command = line[0]
+            strategy = strategies[command]
+            strategy(line)
+
+    def _load_table_signature(self, line: str):
+        self._table_signature = line.split(' ')[1]
+
     def _load_country(self, line: str):
         pieces = line.split(' ')
         new_id = int(pieces[1])
@@ -777,11 +1368,106 @@ class CompressedDataAccessor(DataAccessor):
         tag_ids = load_id_list(pieces[3])
         keyword_ids = load_id_list(pieces[4])
         count = int(pieces[5])
+        buckets = self._load_buckets(pieces[6]) if len(pieces) > 6 else None
+        offsets = pieces[7] if len(pieces) > 7 else None
 
         country = self._countries[country_id]
         categories = [self._categories[x] for x in category_ids]
         tags = [self._tags[x] for x in tag_ids]
         keywords = [self._keywords[x] for x in keyword_ids]
 
-        new_article_set = ArticleSet(country, categories, tags, keywords, count)
+        new_article_set = ArticleSet(country, categories, tags, keywords, count, buckets, offsets)
+        position = len(self._articles)
         self._articles.append(new_article_set)
+
+        positions = self._positions
+        positions.setdefault(('country', country.get_name()), []).append(position)
+        for category in categories:
+            positions.setdefault(('category', category.get_name()), []).append(position)
+
+        for tag in tags:
+            positions.setdefault(('tag', tag.get_name()), []).append(position)
+
+        for keyword in keywords:
+            positions.setdefault(('keyword', keyword.get_name()), []).append(position)
+
+    def _load_population(self, line: str):
+        pieces = line.split(' ')
+        country = self._countries[int(pieces[1])]
+        count = int(pieces[2])
+        buckets = self._load_buckets(pieces[3])
+        self._fixed_populations.append(ArticleSet(country, [], [], [], count, buckets))
+        self._populations = None
+
+    def _load_summary(self, line: str):
+        pieces = line.split(' ')
+        category_id = int(pieces[1])
+        category = None if category_id == -1 else self._categories[category_id].get_name()
+        self._summaries.setdefault(category, {})[pieces[2]] = pieces[3]
+        self._last_query = None
+
+    def _load_buckets(self, target: str) -> BUCKETS:
+        if target == '-1':
+            return {}
+
+        pairs = map(lambda x: x.split(':'), target.split(';'))
+        return dict(map(lambda x: (x[0], int(x[1])), pairs))
+
+
+class ShardedDataAccessor(DataAccessor):
+    """Data accessor which loads article sets from per-country shards only when a query needs them.
+
+    Data accessor around a small global file in the compressed format which holds the dictionaries,
+    population lines, and summary lines such that the default views (queries without filters) are
+    answered without reading any article sets. Other queries first load the shards (files of a lines
+    for a single country) which they need: those of the selected countries if filtering by country
+    or all shards otherwise. Each shard is loaded at most once and merged into the same accessor so
+    counts match those of the full file though groups with equal counts may be listed in a different
+    order depending on the order in which shards were loaded.
+    """
+
+    def __init__(self, contents: typing.Iterable[str],
+        loader: typing.Callable[[int], typing.Iterable[str]]):
+        """Create a new accessor around the contents of a global file.
+
+        Args:
+            contents: The string lines of the global file.
+            loader: Function which takes a country id and returns the string lines of its shard.
+        """
+        self._inner = CompressedDataAccessor(filter(lambda x: x.strip() != '', contents))
+        self._loader = loader
+        self._country_ids = self._inner.get_populated_country_ids()
+        self._loaded: typing.Set[int] = set()
+
+    def execute_query(self, query: Query) -> Result:
+        if not self._inner.has_summary(query):
+            self._load_shards(query)
+
+        return self._inner.execute_query(query)
+
+    def get_offsets(self, query: Query) -> typing.Optional[typing.List[int]]:
+        self._load_shards(query)
+        return self._inner.get_offsets(query)
+
+    def get_loaded(self) -> typing.Set[int]:
+        """Get the shards loaded so far.
+
+        Returns:
+            Set of ids of countries whose shards were merged into this accessor.
+        """
+        return set(self._loaded)
+
+    def _load_shards(self, query: Query):
+        if query.has_country():
+            country_ids = self._country_ids
+            known = filter(lambda x: x in country_ids, query.get_countries())
+            needed = set(map(lambda x: country_ids[x], known))
+        else:
+            needed = set(self._country_ids.values())
+
+        pending = sorted(needed - self._loaded)
+        if len(pending) == 0:
+            return
+
+        self._inner.load_shard(itertools.chain(*map(self._loader, pending)))
+        self._loaded.update(pending)
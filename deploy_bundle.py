@@ -0,0 +1,311 @@
+"""Deploy-time bundler which prepares the web version for fewer fetches and long-lived caching.
+
+Deploy-time step run on the deploy directory (see support/prepare_deploy.sh) after modules are
+copied as .pyscript files. Merges the modules listed in the index.html py-config and the entry point
+(viz) into a single script which registers them as importable modules before starting the
+visualization. Copies data assets (the compressed article format and its shards, the basemap, the
+geojson, and CSV files) to content-hashed names which may be cached indefinitely and writes gzip
+(and, if the brotli module is installed, brotli) precompressed variants next to each text asset for
+static hosts which serve them with Content-Encoding. Writes a manifest mapping the paths used by the
+code to hashed paths which is read at startup by startup_util.load_manifest, points the py-config
+and main.js at the bundle and hashed names, and reports the transfer size before and after. Sizes
+before and after are both uncompressed such that they compare like for like. The size if the host
+serves the precompressed variants is reported separately as that requires the host to be configured
+to send a .gz or .br file with Content-Encoding when the browser accepts it (like gzip_static and
+brotli_static in nginx). Original files are left in place for the express version and pages already
+open. If used from the command line, takes an optional path to the deploy directory.
+
+License: BSD
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import typing
+
+import startup_util
+
+brotli_available = False
+try:
+    import brotli  # type: ignore
+    brotli_available = True
+except:
+    brotli_available = False
+
+DEFAULT_DEPLOY_DIR = 'deploy'
+ENTRY_MODULE = 'viz'
+MODULE_EXTENSION = '.pyscript'
+BUNDLE_NAME = 'app'
+HASH_LENGTH = 20
+DATA_PATTERNS = [
+    'txt/serialized.txt',
+    'txt/shards/*.txt',
+    'basemap/*.png',
+    'basemap/*.json',
+    'geojson/*.geojson',
+    'csv/*.csv'
+]
+COMPRESSED_EXTENSIONS = {'.csv', '.geojson', '.json', '.pyscript', '.txt'}
+INDEX_PATH = 'index.html'
+MAIN_SCRIPT_PATH = os.path.join('js', 'main.js')
+PY_CONFIG_START = '<py-config>'
+PY_CONFIG_END = '</py-config>'
+ENTRY_PATTERN = re.compile(r'viz\.pyscript(\?v=[^"]*)?')
+HASHED_PATTERN = re.compile(r'\.[0-9a-f]{%d}\.' % HASH_LENGTH)
+
+SIZES = typing.Dict[str, int]
+REPORT = typing.Dict[str, SIZES]
+
+BUNDLE_TEMPLATE = '''"""Modules of the visualization merged by deploy_bundle.
+
+License: BSD
+"""
+
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+
+SOURCES = %s
+
+
+class BundleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in SOURCES:
+            return None
+
+        return importlib.util.spec_from_loader(fullname, self)
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        code = compile(SOURCES[module.__name__], module.__name__ + '.py', 'exec')
+        exec(code, module.__dict__)
+
+
+sys.meta_path.insert(0, BundleFinder())
+importlib.import_module(%s).main()
+'''
+
+
+def get_hashed_path(path: str, contents: bytes) -> str:
+    """Get the content-addressed path for an asset.
+
+    Args:
+        path: The path of the asset like txt/serialized.txt.
+        contents: The bytes of the asset.
+
+    Returns:
+        Path with a hash of the contents before the extension which changes only if the contents
+        change like txt/serialized.0123456789abcdef0123.txt.
+    """
+    stem, extension = os.path.splitext(path)
+    digest = hashlib.sha256(contents).hexdigest()[:HASH_LENGTH]
+    return '%s.%s%s' % (stem, digest, extension)
+
+
+def make_bundle(sources: typing.Dict[str, str], entry: str = ENTRY_MODULE) -> str:
+    """Merge modules into a single script which starts the visualization.
+
+    Args:
+        sources: Mapping from module name to source code.
+        entry: The name of the module whose main function is called. Defaults to ENTRY_MODULE.
+
+    Returns:
+        Source of a script which makes the modules importable and calls the entry's main.
+    """
+    sources_str = json.dumps(sources, indent=4, sort_keys=True)
+    return BUNDLE_TEMPLATE % (sources_str, repr(entry))
+
+
+def compress(path: str) -> SIZES:
+    """Write precompressed variants of an asset next to it.
+
+    Args:
+        path: The path to the asset. Variants are only written for text extensions.
+
+    Returns:
+        Mapping from encoding (identity, gzip, br) to size in bytes for the variants available.
+    """
+    with open(path, 'rb') as f:
+        contents = f.read()
+
+    sizes = {'identity': len(contents)}
+    if os.path.splitext(path)[1] not in COMPRESSED_EXTENSIONS:
+        return sizes
+
+    # Zero mtime such that unchanged contents give identical files.
+    gzipped = gzip.compress(contents, compresslevel=9, mtime=0)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzipped)
+    sizes['gzip'] = len(gzipped)
+
+    if brotli_available:
+        brotlied = brotli.compress(contents)
+        with open(path + '.br', 'wb') as f:
+            f.write(brotlied)
+        sizes['br'] = len(brotlied)
+
+    return sizes
+
+
+def read_py_config(html: str) -> typing.Dict:
+    """Parse the py-config of a page.
+
+    Args:
+        html: The contents of the page.
+
+    Returns:
+        The parsed py-config.
+    """
+    start, end = _get_py_config_bounds(html)
+    return json.loads(html[start:end])
+
+
+def write_py_config(html: str, config: typing.Dict) -> str:
+    """Replace the py-config of a page.
+
+    Args:
+        html: The contents of the page.
+        config: The new py-config.
+
+    Returns:
+        The contents of the page with the new py-config.
+    """
+    start, end = _get_py_config_bounds(html)
+    config_lines = json.dumps(config, indent=4).split('\n')
+    config_str = '\n'.join(map(lambda x: '        ' + x, config_lines))
+    return html[:start] + '\n' + config_str + '\n        ' + html[end:]
+
+
+def bundle(deploy_dir: str = DEFAULT_DEPLOY_DIR) -> REPORT:
+    """Bundle modules and hash data assets within a deploy directory.
+
+    Args:
+        deploy_dir: The directory prepared by support/prepare_deploy.sh. Defaults to
+            DEFAULT_DEPLOY_DIR.
+
+    Returns:
+        Report with the number of files and bytes transferred before (one fetch per module) and
+        after (bundled) under the keys before and after, both uncompressed. The bytes after if the
+        host serves the smallest precompressed variant of each file are under precompressed.
+    """
+    def get_path(relative: str) -> str:
+        return os.path.join(deploy_dir, relative)
+
+    def read_bytes(relative: str) -> bytes:
+        with open(get_path(relative), 'rb') as f:
+            return f.read()
+
+    def write_hashed(relative: str, contents: bytes) -> str:
+        hashed = get_hashed_path(relative, contents)
+        with open(get_path(hashed), 'wb') as f:
+            f.write(contents)
+        return hashed
+
+    with open(get_path(INDEX_PATH)) as f:
+        html = f.read()
+
+    config = read_py_config(html)
+    files = config['files']
+    module_names = [x[:-3] for x in files.values() if x.endswith('.py')] + [ENTRY_MODULE]
+
+    before_sizes = []
+    sources = {}
+    for name in module_names:
+        contents = read_bytes(name + MODULE_EXTENSION)
+        before_sizes.append(len(contents))
+        sources[name] = contents.decode('utf-8')
+
+    after_sizes = []
+    precompressed_sizes = []
+
+    def add_after(relative: str):
+        sizes = compress(get_path(relative))
+        after_sizes.append(sizes['identity'])
+        precompressed_sizes.append(min(sizes.values()))
+
+    bundle_contents = make_bundle(sources).encode('utf-8')
+    bundle_path = write_hashed(BUNDLE_NAME + MODULE_EXTENSION, bundle_contents)
+    add_after(bundle_path)
+
+    data_paths = sorted(set(_find_data_paths(deploy_dir)))
+    manifest = {}
+    for relative in data_paths:
+        contents = read_bytes(relative)
+        before_sizes.append(len(contents))
+        hashed = write_hashed(relative, contents)
+        add_after(hashed)
+        manifest[relative] = hashed
+
+    with open(get_path(startup_util.MANIFEST_PATH), 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+    add_after(startup_util.MANIFEST_PATH)
+
+    # Modules now come from the bundle and remaining files (like data prefetched at startup) from
+    # their hashed names.
+    data_files = filter(lambda x: not x[1].endswith('.py'), files.items())
+    new_files = dict(map(
+        lambda x: ('/' + manifest[x[1]] if x[1] in manifest else x[0], x[1]),
+        data_files
+    ))
+    new_files['/' + startup_util.MANIFEST_PATH] = startup_util.MANIFEST_PATH
+    config['files'] = new_files
+
+    with open(get_path(INDEX_PATH), 'w') as f:
+        f.write(write_py_config(html, config))
+
+    with open(get_path(MAIN_SCRIPT_PATH)) as f:
+        main_script = f.read()
+
+    if ENTRY_PATTERN.search(main_script) is None:
+        raise RuntimeError('Could not find entry point script in %s.' % MAIN_SCRIPT_PATH)
+
+    with open(get_path(MAIN_SCRIPT_PATH), 'w') as f:
+        f.write(ENTRY_PATTERN.sub(bundle_path, main_script))
+
+    return {
+        'before': {'files': len(before_sizes), 'bytes': sum(before_sizes)},
+        'after': {'files': len(after_sizes), 'bytes': sum(after_sizes)},
+        'precompressed': {'files': len(precompressed_sizes), 'bytes': sum(precompressed_sizes)}
+    }
+
+
+def _find_data_paths(deploy_dir: str) -> typing.Iterable[str]:
+    for pattern in DATA_PATTERNS:
+        for path in glob.glob(os.path.join(deploy_dir, pattern)):
+            if HASHED_PATTERN.search(os.path.basename(path)) is None:
+                yield os.path.relpath(path, deploy_dir).replace(os.sep, '/')
+
+
+def _get_py_config_bounds(html: str) -> typing.Tuple[int, int]:
+    start = html.find(PY_CONFIG_START)
+    end = html.find(PY_CONFIG_END)
+    if start == -1 or end == -1:
+        raise RuntimeError('Could not find py-config.')
+
+    return (start + len(PY_CONFIG_START), end)
+
+
+def main():
+    """Entry point for bundling the deploy directory from the command line."""
+    deploy_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DEPLOY_DIR
+
+    report = bundle(deploy_dir)
+
+    for name in ['before', 'after']:
+        sizes = report[name]
+        print('%s: %d files, %d bytes' % (name, sizes['files'], sizes['bytes']))
+
+    sizes = report['precompressed']
+    print('after with Content-Encoding: %d files, %d bytes' % (sizes['files'], sizes['bytes']))
+
+
+if __name__ == '__main__':
+    main()
@@ -133,7 +133,7 @@ class GridColumn:
 
         y = 0.0
 
-        category_selected = current_state.get_category_selected() == self._category
+        category_selected = self._category in current_state.get_categories_selected()
         category_hovering = current_state.get_category_hovering() == self._category
         y = self._draw_header(y, category_selected, category_hovering)
 
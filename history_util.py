@@ -0,0 +1,403 @@
+"""Undo / redo history of filters which keeps the results computed for each step.
+
+Undo / redo history of the values selected in the visualization state. Each entry keeps references
+to the results of the queries executed while it was current such that going back or forward draws
+without executing queries again. Results are estimated in size and those of the least recently
+visited entries are released once over a memory budget (they are then executed again if needed).
+The history can be exported as a session of steps which may be replayed against an accessor for
+benchmarking. If used from the command line, takes the path to an exported session and optionally
+the path to the compressed file, printing the time taken with and without the history's results.
+
+License: BSD
+"""
+
+import json
+import os
+import sys
+import time
+import typing
+
+import data_util
+import state_util
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+RESULT_BYTES = 500
+GROUP_BYTES = 150
+DEFAULT_SERIALIZED_PATH = os.path.join('txt', 'serialized.txt')
+FILTER_NAMES = ['categories', 'countries', 'tags', 'keywords']
+
+STEP = typing.Dict[str, typing.Union[str, typing.List[str]]]
+SESSION = typing.Dict[str, typing.List[STEP]]
+
+
+def estimate_bytes(result: data_util.Result) -> int:
+    """Estimate the memory held by a result.
+
+    Args:
+        result: The result whose size should be estimated.
+
+    Returns:
+        Approximate number of bytes which grows with the number of groups in the result.
+    """
+    groups = [
+        result.get_categories(),
+        result.get_countries(),
+        result.get_country_totals(),
+        result.get_tags(),
+        result.get_keywords(),
+        result.get_buckets(),
+        result.get_bucket_totals()
+    ]
+    return RESULT_BYTES + GROUP_BYTES * sum(map(lambda x: len(x), groups))
+
+
+class HistoryEntry:
+    """Step in the history with the results of queries executed while it was current."""
+
+    def __init__(self, filters: state_util.FILTERS):
+        """Create a new entry without results.
+
+        Args:
+            filters: The selected categories, countries, tags, and keywords in that order.
+        """
+        self._filters = filters
+        self._results: typing.Dict[str, data_util.Result] = {}
+        self._bytes = 0
+        self._last_visit = 0
+
+    def get_filters(self) -> state_util.FILTERS:
+        """Get the values selected at this step.
+
+        Returns:
+            The selected categories, countries, tags, and keywords in that order.
+        """
+        return self._filters
+
+    def get_result(self, query: data_util.Query) -> typing.Optional[data_util.Result]:
+        """Get a result kept for a query.
+
+        Args:
+            query: The query whose result is requested.
+
+        Returns:
+            The result previously kept for a functionally equivalent query or None if not kept.
+        """
+        return self._results.get(query.get_id_str(), None)
+
+    def put_result(self, query: data_util.Query, result: data_util.Result) -> int:
+        """Keep the result of a query.
+
+        Args:
+            query: The query executed.
+            result: The result of the query.
+
+        Returns:
+            The number of bytes by which the estimated size of this entry grew.
+        """
+        id_str = query.get_id_str()
+        if id_str in self._results:
+            return 0
+
+        self._results[id_str] = result
+        new_bytes = estimate_bytes(result)
+        self._bytes += new_bytes
+        return new_bytes
+
+    def release(self) -> int:
+        """Release the results kept for this entry.
+
+        Returns:
+            The number of bytes released.
+        """
+        released = self._bytes
+        self._results = {}
+        self._bytes = 0
+        return released
+
+    def get_bytes(self) -> int:
+        """Get the estimated size of the results kept.
+
+        Returns:
+            Estimated bytes held by this entry's results.
+        """
+        return self._bytes
+
+    def get_last_visit(self) -> int:
+        """Get when this entry was last current.
+
+        Returns:
+            The step count at which this entry last became current.
+        """
+        return self._last_visit
+
+    def set_last_visit(self, step: int):
+        """Indicate that this entry became current.
+
+        Args:
+            step: The step count at which this entry became current.
+        """
+        self._last_visit = step
+
+
+class History:
+    """Undo / redo history of the values selected in a visualization state."""
+
+    def __init__(self, filters: state_util.FILTERS, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Create a new history.
+
+        Args:
+            filters: The values selected at the start of the session.
+            max_bytes: The estimated size in bytes of results which may be kept across all entries
+                before results of the least recently visited entries are released. Defaults to
+                DEFAULT_MAX_BYTES.
+        """
+        self._max_bytes = max_bytes
+        self._entries = [HistoryEntry(filters)]
+        self._position = 0
+        self._bytes = 0
+        self._steps: typing.List[STEP] = []
+        self._log('start')
+
+    def record(self, filters: state_util.FILTERS):
+        """Add a step to the history if the values selected changed.
+
+        Steps after the current step (those which could be redone) are discarded.
+
+        Args:
+            filters: The values now selected.
+        """
+        if filters == self.get_filters():
+            return
+
+        for entry in self._entries[self._position + 1:]:
+            self._bytes -= entry.release()
+
+        self._entries = self._entries[:self._position + 1] + [HistoryEntry(filters)]
+        self._position += 1
+        self._log('record')
+
+    def can_undo(self) -> bool:
+        """Determine if there is a step before the current step.
+
+        Returns:
+            True if undo would change the values selected and False otherwise.
+        """
+        return self._position > 0
+
+    def can_redo(self) -> bool:
+        """Determine if there is a step after the current step.
+
+        Returns:
+            True if redo would change the values selected and False otherwise.
+        """
+        return self._position < len(self._entries) - 1
+
+    def undo(self) -> typing.Optional[state_util.FILTERS]:
+        """Go back one step.
+
+        Returns:
+            The values selected at the prior step or None if there is no prior step.
+        """
+        if not self.can_undo():
+            return None
+
+        self._position -= 1
+        self._log('undo')
+        return self.get_filters()
+
+    def redo(self) -> typing.Optional[state_util.FILTERS]:
+        """Go forward one step.
+
+        Returns:
+            The values selected at the next step or None if there is no next step.
+        """
+        if not self.can_redo():
+            return None
+
+        self._position += 1
+        self._log('redo')
+        return self.get_filters()
+
+    def get_filters(self) -> state_util.FILTERS:
+        """Get the values selected at the current step.
+
+        Returns:
+            The selected categories, countries, tags, and keywords in that order.
+        """
+        return self._get_current().get_filters()
+
+    def get_result(self, query: data_util.Query) -> typing.Optional[data_util.Result]:
+        """Get a result kept by the current step.
+
+        Args:
+            query: The query whose result is requested.
+
+        Returns:
+            The result kept for the query or None if it needs to be executed.
+        """
+        return self._get_current().get_result(query)
+
+    def put_result(self, query: data_util.Query, result: data_util.Result):
+        """Keep a result with the current step, releasing others if over the memory budget.
+
+        Args:
+            query: The query executed.
+            result: The result of the query.
+        """
+        self._bytes += self._get_current().put_result(query, result)
+
+        current = self._get_current()
+        by_visit = sorted(self._entries, key=lambda x: x.get_last_visit())
+        candidates = filter(lambda x: x is not current and x.get_bytes() > 0, by_visit)
+        for entry in candidates:
+            if self._bytes <= self._max_bytes:
+                break
+
+            self._bytes -= entry.release()
+
+    def clear_results(self):
+        """Release all results kept like after the underlying data changed."""
+        for entry in self._entries:
+            entry.release()
+
+        self._bytes = 0
+
+    def get_bytes(self) -> int:
+        """Get the estimated size of all results kept.
+
+        Returns:
+            Estimated bytes held across all entries.
+        """
+        return self._bytes
+
+    def export(self) -> SESSION:
+        """Describe the steps taken in this history such that they can be replayed.
+
+        Returns:
+            JSON-serializable session whose steps each have an action (start, record, undo, or
+            redo) and the values selected after the action as sorted lists.
+        """
+        return {'steps': list(self._steps)}
+
+    def _get_current(self) -> HistoryEntry:
+        return self._entries[self._position]
+
+    def _log(self, action: str):
+        current = self._get_current()
+        current.set_last_visit(len(self._steps))
+
+        step: STEP = {'action': action}
+        for name, values in zip(FILTER_NAMES, current.get_filters()):
+            step[name] = sorted(values)
+
+        self._steps.append(step)
+
+
+class HistoryDataAccessor(data_util.DataAccessor):
+    """Data accessor which keeps results with the current step of a history."""
+
+    def __init__(self, inner: data_util.DataAccessor, history: History):
+        """Create a new accessor.
+
+        Args:
+            inner: The accessor which executes queries whose results are not kept.
+            history: The history whose current step keeps results.
+        """
+        self._inner = inner
+        self._history = history
+
+    def execute_query(self, query: data_util.Query) -> data_util.Result:
+        result = self._history.get_result(query)
+        if result is not None:
+            return result
+
+        result = self._inner.execute_query(query)
+        self._history.put_result(query, result)
+        return result
+
+    def get_offsets(self, query: data_util.Query) -> typing.Optional[typing.List[int]]:
+        return self._inner.get_offsets(query)
+
+
+def get_step_filters(step: STEP) -> state_util.FILTERS:
+    """Get the values selected after a step of an exported session.
+
+    Args:
+        step: The step as found in History.export.
+
+    Returns:
+        The selected categories, countries, tags, and keywords in that order.
+    """
+    categories, countries, tags, keywords = map(lambda x: frozenset(step[x]), FILTER_NAMES)
+    return (categories, countries, tags, keywords)
+
+
+def replay(accessor: data_util.DataAccessor, session: SESSION, use_history: bool = True,
+    max_bytes: int = DEFAULT_MAX_BYTES) -> typing.List[float]:
+    """Replay an exported session, executing the queries of the overview and grid at each step.
+
+    Args:
+        accessor: The accessor against which queries are executed.
+        session: The session as found in History.export.
+        use_history: Flag indicating if results should be kept by a history as in the visualization
+            (True) or every step should execute its queries again (False). Defaults to True.
+        max_bytes: The memory budget of the history if used. Defaults to DEFAULT_MAX_BYTES.
+
+    Returns:
+        Seconds taken by each step.
+    """
+    steps = session['steps']
+    if len(steps) == 0:
+        return []
+
+    history = History(get_step_filters(steps[0]), max_bytes)
+    target = HistoryDataAccessor(accessor, history) if use_history else accessor
+    categories = [None] + sorted(data_util.CATEGORIES)
+
+    timings = []
+    for step in steps:
+        start = time.perf_counter()
+
+        if step['action'] == 'undo':
+            history.undo()
+        elif step['action'] == 'redo':
+            history.redo()
+        else:
+            history.record(get_step_filters(step))
+
+        if history.get_filters() != get_step_filters(step):
+            raise RuntimeError('Session steps are not consistent.')
+
+        categories_selected, countries, tags, keywords = history.get_filters()
+        for category in categories:
+            query = data_util.Query(category, categories_selected, countries, tags, keywords)
+            target.execute_query(query)
+
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    """Entry point for replaying an exported session from the command line."""
+    if len(sys.argv) < 2:
+        print('Usage: python history_util.py session.json [serialized]')
+        sys.exit(1)
+
+    session_path = sys.argv[1]
+    serialized_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SERIALIZED_PATH
+
+    with open(session_path) as f:
+        session = json.load(f)
+
+    for use_history in [False, True]:
+        with open(serialized_path) as f:
+            accessor = data_util.CompressedDataAccessor(f.read().split('\n'))
+
+        timings = replay(accessor, session, use_history)
+        label = 'with history' if use_history else 'without history'
+        print('%s: %d steps, %.3f seconds' % (label, len(timings), sum(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,12 @@
 
 const EXPORT_URL = "https://6saet4fqci.execute-api.us-east-2.amazonaws.com/default/gafj-topic-explorer-export";
 const STATS_URL = "https://g69mcjf2re.execute-api.us-east-2.amazonaws.com/default/gafj-topic-explorer-stat";
+const STATIC_STATS_DIR = "/stats/";
+const STATIC_STATS_INDEX_URL = STATIC_STATS_DIR + "index.json";
+const EXPORT_PAGE_LIMIT = 5000;
+const VALUE_SEPARATOR = ";";
+
+let staticStatsIndex = null;
 
 
 /**
@@ -15,7 +21,21 @@ const STATS_URL = "https://g69mcjf2re.execute-api.us-east-2.amazonaws.com/defaul
  * @return True if interpreted as no filter and false otherwise.
  */
 function isAll(target) {
-    return target === "all" || target === "All" || target === "";
+    return target.toLowerCase() === "all" || target === "";
+}
+
+
+/**
+ * Normalize a filter value like canonicalize_params in article_getter.py.
+ * 
+ * @param target The string selected or provided by the user which may hold multiple values joined
+ *      by VALUE_SEPARATOR.
+ * @return The value with surrounding whitespace removed from each value and values deduplicated
+ *      and sorted.
+ */
+function canonicalizeValue(target) {
+    const values = target.split(VALUE_SEPARATOR).map((x) => x.trim()).filter((x) => x !== "");
+    return Array.from(new Set(values)).sort().join(VALUE_SEPARATOR);
 }
 
 
@@ -23,11 +43,11 @@ function isAll(target) {
  * Get a parameter for a user defined query.
  * 
  * @param elementId The ID of the input element from which to get a user defined query parameter.
- * @return Object with name of query parameter and query parameter value.
+ * @return Object with name of query parameter and canonical query parameter value.
  */
 function getQueryParam(elementId) {
     const name = elementId.split("-")[0];
-    const value = document.getElementById(elementId).value;
+    const value = canonicalizeValue(document.getElementById(elementId).value);
     return {"name": name, "value": value};
 }
 
@@ -54,15 +74,114 @@ function getQueryParamsStr() {
 
 
 /**
- * Request a CSV export by opening a new tab using a URL defined by the user's query.
+ * Get the filters (excluding dimension) defined by the user which are not all / no filter.
+ * 
+ * @return Array of objects with name of query parameter and query parameter value.
+ */
+function getActiveFilters() {
+    const elements = [
+        getQueryParam("country-select"),
+        getQueryParam("category-select"),
+        getQueryParam("tag-select"),
+        getQueryParam("keyword-input")
+    ];
+
+    return elements.filter((x) => !isAll(x["value"]));
+}
+
+
+/**
+ * Load the index of statistics files precomputed at deploy time.
+ * 
+ * @return Promise resolving to the index or null if unavailable. Requested only once per page.
+ */
+function loadStaticStatsIndex() {
+    if (staticStatsIndex === null) {
+        staticStatsIndex = d3.json(STATIC_STATS_INDEX_URL).catch(() => null);
+    }
+    return staticStatsIndex;
+}
+
+
+/**
+ * Find the precomputed statistics file for the user's query if one is available.
+ * 
+ * @param index The index of precomputed files (see static_stat_gen.py) or null if unavailable.
+ * @return URL of the precomputed file or null if the query must go to the stats service.
+ */
+function getStaticStatsUrl(index) {
+    if (index === null) {
+        return null;
+    }
+
+    const filters = getActiveFilters();
+    if (filters.length > 1) {
+        return null;
+    }
+
+    const dimension = getQueryParam("dimension-select")["value"];
+    const filterName = filters.length == 0 ? "all" : filters[0]["name"];
+    const filterValue = filters.length == 0 ? "all" : filters[0]["value"];
+
+    const byFilterName = index[dimension] || {};
+    const byFilterValue = byFilterName[filterName] || {};
+    const filename = byFilterValue[filterValue];
+
+    return filename === undefined ? null : STATIC_STATS_DIR + filename;
+}
+
+
+/**
+ * Fetch all pages of a paginated CSV export, following continuation cursors.
+ * 
+ * @param queryParamsStr URL appendable string describing the user defined query.
+ * @return Promise resolving to the CSV string of all pages with a single header row.
+ */
+function fetchExportPages(queryParamsStr) {
+    const pages = [];
+
+    const fetchPage = (cursor) => {
+        const cursorStr = cursor === null ? "" : "&cursor=" + encodeURIComponent(cursor);
+        const limitStr = "&limit=" + EXPORT_PAGE_LIMIT;
+        const targetUrl = EXPORT_URL + "?" + queryParamsStr + limitStr + cursorStr;
+
+        return fetch(targetUrl).then((response) => {
+            if (!response.ok) {
+                throw new Error("Export failed with status " + response.status);
+            }
+
+            const nextCursor = response.headers.get("X-Next-Cursor");
+            return response.text().then((body) => {
+                const isFirst = pages.length == 0;
+                pages.push(isFirst ? body : body.substring(body.indexOf("\n") + 1));
+                return nextCursor === null ? pages.join("") : fetchPage(nextCursor);
+            });
+        });
+    };
+
+    return fetchPage(null);
+}
+
+
+/**
+ * Request a CSV export using the user's query, downloading it in bounded pages if filtered.
  */
 function executeExport() {
     const queryParamsStr = getQueryParamsStr();
     if (queryParamsStr === "") {
         window.open("/csv/articles.csv", "_blank");
     } else {
-        const targetUrl = EXPORT_URL + "?" + queryParamsStr;
-        window.open(targetUrl, "_blank");
+        fetchExportPages(queryParamsStr).then(
+            (csvStr) => {
+                const blob = new Blob([csvStr], {"type": "text/csv"});
+                const link = document.createElement("a");
+                link.href = URL.createObjectURL(blob);
+                link.download = "articles_export.csv";
+                link.click();
+                URL.revokeObjectURL(link.href);
+            },
+            (x) => alert("Failed to pull data.")
+        );
     }
 }
 
@@ -119,17 +238,20 @@ function convertRow(rawRow) {
  * Execute a request for article aggregate stats using the user's currently defined query.
  */
 function executeStats() {
-    const targetUrl = STATS_URL + "?" + getQueryParamsStr();
-    
     // Show loading indicator
     document.getElementById("express-report").innerHTML = "";
     document.getElementById("execute-express-button").style.display = "none";
     document.getElementById("express-loading").style.display = "inline-block";
-    
-    d3.dsv(",", targetUrl, convertRow).then(
-        updateReport,
-        (x) => alert("Failed to pull data.")
-    );
+
+    loadStaticStatsIndex().then((index) => {
+        const staticUrl = getStaticStatsUrl(index);
+        const targetUrl = staticUrl === null ? STATS_URL + "?" + getQueryParamsStr() : staticUrl;
+
+        d3.dsv(",", targetUrl, convertRow).then(
+            updateReport,
+            (x) => alert("Failed to pull data.")
+        );
+    });
 }
 
 
@@ -4,11 +4,12 @@ License: BSD
 """
 
 import math
-import os
+import typing
 
 import sketchingpy
 
 import abstract
+import basemap_util
 import const
 import data_util
 import state_util
@@ -18,7 +19,8 @@ class MapViz(abstract.VizMovement):
     """Movement or component which shows country distribution of articles in a global map."""
 
     def __init__(self, sketch: sketchingpy.Sketch2D, accessor: data_util.DataAccessor,
-        state: state_util.VizState, center_x: float, center_y: float):
+        state: state_util.VizState, center_x: float, center_y: float,
+        simplify_tolerance: float = 0, source: typing.Optional[basemap_util.MapSource] = None):
         """Create a new map view.
 
         Args:
@@ -27,6 +29,11 @@ class MapViz(abstract.VizMovement):
             state: The global state object to reflect and change.
             center_x: The horizontal coordinate to center the map within the sketch.
             center_y: The vertical coordinate to center the map within the sketch.
+            simplify_tolerance: Tolerance in degrees by which to simplify geometry if the basemap
+                must be rendered live because no precomputed basemap is available. Defaults to 0
+                (no simplification).
+            source: Map assets already loaded for the same center or None to load them. Defaults
+                to None.
         """
         self._sketch = sketch
         self._accessor = accessor
@@ -36,36 +43,37 @@ class MapViz(abstract.VizMovement):
         self._center_y = center_y
 
         self._sketch.push_map()
-
-        self._sketch.set_map_pan(0, 0)
-        self._sketch.set_map_placement(self._center_x, self._center_y)
-        self._sketch.set_map_zoom(0.2)
-
-        data_layer = sketch.get_data_layer()
-        assert data_layer is not None
-
-        path = os.path.join('geojson', 'zoomed_out.geojson')
-        source = data_layer.get_json(path)
-        geo_polygons = sketch.parse_geojson(source)
-        self._geo_shapes = [x.to_shape() for x in geo_polygons]
+        basemap_util.configure_map(self._sketch, self._center_x, self._center_y)
+
+        if source is None:
+            data_layer = sketch.get_data_layer()
+            assert data_layer is not None
+            source = basemap_util.load_source(data_layer, self._center_x, self._center_y)
+
+        geopoints = source.get_geopoints()
+        if geopoints is None:
+            self._basemap_image = None
+            self._geo_shapes = basemap_util.build_geo_shapes(
+                self._sketch,
+                typing.cast(typing.Dict, source.get_geojson()),
+                simplify_tolerance
+            )
+            self._geopoints_dict = basemap_util.project_geopoints(
+                self._sketch,
+                source.get_centerpoints()
+            )
+        else:
+            self._basemap_image = self._sketch.get_image(source.get_image_path())
+            self._geopoints_dict = geopoints
+            self._geo_shapes = []
 
         query = self._state.get_query()
         self._results = self._accessor.execute_query(query)
 
-        path = os.path.join('csv', 'centerpoints.csv')
-        centerpoints_raw = data_layer.get_csv(path)
-        geopoints_flat = map(
-            lambda x: (
-                x['name'],
-                self._sketch.convert_geo_to_pixel(float(x['longitude']), float(x['latitude']))
-            ),
-            centerpoints_raw
-        )
-        self._geopoints_dict = dict(geopoints_flat)
-
         self._sketch.pop_map()
 
-        self._prepare_basemap()
+        if self._basemap_image is None:
+            self._prepare_basemap()
 
         self._locked = False
 
@@ -87,6 +95,9 @@ class MapViz(abstract.VizMovement):
             mouse_x: The x coordinate of the mouse or last touchscreen interaction.
             mouse_y: The y coordinate of the mouse or last touchscreen interaction.
         """
+        if self._basemap_image is not None and not self._basemap_image.get_is_loaded():
+            self._state.invalidate()
+
         if self._locked:
             return
 
@@ -114,12 +125,7 @@ class MapViz(abstract.VizMovement):
         self._sketch.create_buffer('basemap', const.WIDTH, const.HEIGHT)
         self._sketch.enter_buffer('basemap')
 
-        self._sketch.clear_fill()
-        self._sketch.set_stroke('#C0C0C0')
-        self._sketch.set_stroke_weight(2)
-
-        for shape in self._geo_shapes:
-            self._sketch.draw_shape(shape)
+        basemap_util.draw_geo_shapes(self._sketch, self._geo_shapes)
 
         self._sketch.exit_buffer()
 
@@ -131,7 +137,11 @@ class MapViz(abstract.VizMovement):
         self._sketch.push_transform()
         self._sketch.push_style()
 
-        self._sketch.draw_buffer(0, 0, 'basemap')
+        if self._basemap_image is None:
+            self._sketch.draw_buffer(0, 0, 'basemap')
+        else:
+            self._sketch.set_image_mode('corner')
+            self._sketch.draw_image(0, 0, self._basemap_image)
 
         self._sketch.set_ellipse_mode('radius')
 
@@ -143,7 +153,7 @@ class MapViz(abstract.VizMovement):
 
         for name, loc in self._geopoints_dict.items():
             if name in countries_indexed:
-                selected = self._state.get_country_selected() == name
+                selected = name in self._state.get_countries_selected()
                 hovering = self._state.get_country_hovering() == name
 
                 color = const.INACTIVE_COLOR_MAP
@@ -7,6 +7,7 @@ import typing
 import sketchingpy
 
 import abstract
+import basemap_util
 import const
 import data_util
 import map_viz
@@ -18,13 +19,15 @@ class OverviewViz(abstract.VizMovement):
     """Visualization movement where the user starts the application."""
 
     def __init__(self, sketch: sketchingpy.Sketch2D, accessor: data_util.DataAccessor,
-        state: state_util.VizState):
+        state: state_util.VizState, map_source: typing.Optional[basemap_util.MapSource] = None):
         """Create a new overview visualization movement instance.
 
         Args:
             sketch: The sketch in which the movement is to be drawn.
             accessor: Object offering access to article statistics.
             state: The global visualization state to represent and manipulate.
+            map_source: Map assets already loaded for the map center or None to load them. Defaults
+                to None.
         """
         self._sketch = sketch
         self._accessor = accessor
@@ -69,8 +72,9 @@ class OverviewViz(abstract.VizMovement):
             self._sketch,
             self._accessor,
             self._state,
-            const.WIDTH / 5 * 2,
-            const.HEIGHT / 7 * 5
+            const.MAP_CENTER_X,
+            const.MAP_CENTER_Y,
+            source=map_source
         )
 
         self._locked = False
@@ -201,6 +205,11 @@ class OverviewViz(abstract.VizMovement):
             countries_y_end + 50 + 12,
             'again to remove filter.'
         )
+        self._sketch.draw_text(
+            const.WIDTH - const.COLUMN_WIDTH - 25,
+            countries_y_end + 50 + 24,
+            'Shift click to select multiple.'
+        )
 
         self._sketch.pop_style()
         self._sketch.pop_transform()
@@ -0,0 +1,357 @@
+"""Long-lived local HTTP server for the express version's export and statistics queries.
+
+Long-lived local HTTP server which answers the same queries as the article_getter and
+article_stat_gen lambdas but loads the article dataset and aggregated statistics only once. Queries
+run concurrently up to a limit and identical in-flight queries share a single execution. When the
+data files change, new datasets are loaded in the background and swapped in between requests while
+in-flight queries finish against the prior datasets. Files which only grew have their new rows
+added to the datasets in memory instead once no queries are in flight. If used from the command
+line, takes an optional port and an optional maximum number of concurrent queries.
+
+Endpoints are /export (same as article_getter.lambda_handler) and /stats (same as
+article_stat_gen.lambda_handler) with query parameters keyword, tag, category, country, start,
+end, and dimension where start and end are inclusive publication months like 2024-01. Exports may
+be paginated with limit and cursor as in article_getter. Statistics include an error column if
+approximate is true which is zero as they come from exact pre-aggregated counts.
+
+License: BSD
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import sys
+import typing
+import urllib.parse
+
+import accessor_stat_gen
+import article_getter
+import article_stat_gen
+import data_util
+import reload_util
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 8080
+DEFAULT_CONCURRENCY = 4
+SERIALIZED_PATH = os.path.join('txt', 'serialized.txt')
+PARAM_KEYS = (
+    'keyword',
+    'tag',
+    'category',
+    'country',
+    'start',
+    'end',
+    'dimension',
+    'limit',
+    'cursor',
+    'approximate'
+)
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error'
+}
+
+RESPONSE = typing.Dict[str, typing.Any]
+SNAPSHOT = typing.Tuple[article_getter.ArticleGetter, accessor_stat_gen.AccessorStatGenerator]
+
+
+class QueryServer:
+    """Server which answers export and statistics queries from preloaded data."""
+
+    def __init__(self, getter: article_getter.ArticleGetter,
+        stat_generator: accessor_stat_gen.AccessorStatGenerator,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        reloader: typing.Optional[reload_util.Reloader[SNAPSHOT]] = None):
+        """Create a new server.
+
+        Args:
+            getter: Getter used to find articles for exports which should hold articles in memory.
+            stat_generator: Generator used to answer statistics queries.
+            concurrency: The maximum number of queries to execute at the same time.
+            reloader: Optional reloader providing a new getter and generator when data files change.
+        """
+        self._getter = getter
+        self._stat_generator = stat_generator
+        self._reloader = reloader
+        self._generation = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+        self._concurrency = concurrency
+        self._in_flight: typing.Dict[typing.Tuple, asyncio.Future] = {}
+
+    async def execute_export(self, params: typing.Dict[str, str]) -> RESPONSE:
+        """Find matching articles and build an export response.
+
+        Args:
+            params: The query parameters.
+
+        Returns:
+            Lambda compatible HTTP response.
+        """
+        getter = self._getter
+
+        def execute():
+            return getter.execute_to_export(params)
+
+        key = ('export', self._generation) + get_params_key(params)
+        return await self._execute_coalesced(key, execute)
+
+    async def execute_stats(self, params: typing.Dict[str, str]) -> RESPONSE:
+        """Generate statistics and build a response.
+
+        Args:
+            params: The query parameters including dimension.
+
+        Returns:
+            Lambda compatible HTTP response.
+        """
+        stat_generator = self._stat_generator
+
+        def execute():
+            if article_stat_gen.get_is_approximate(params):
+                estimates = stat_generator.execute_approximate(params)
+                return article_stat_gen.make_response(
+                    dict(map(lambda x: (x[0], x[1].get_value()), estimates.items())),
+                    dict(map(lambda x: (x[0], x[1].get_error()), estimates.items()))
+                )
+            else:
+                matching = stat_generator.execute(params)
+                return article_stat_gen.make_response(matching)
+
+        key = ('stats', self._generation) + get_params_key(params)
+        return await self._execute_coalesced(key, execute)
+
+    async def route(self, path: str) -> RESPONSE:
+        """Execute the request described by a request path.
+
+        Args:
+            path: The path including query string like /stats?keyword=security&dimension=country.
+
+        Returns:
+            Lambda compatible HTTP response.
+        """
+        self._check_reload()
+
+        url = urllib.parse.urlsplit(path)
+        params_all = article_getter.canonicalize_params(dict(urllib.parse.parse_qsl(url.query)))
+        params = dict(filter(lambda x: x[0] in PARAM_KEYS, params_all.items()))
+
+        if url.path == '/export':
+            return await self.execute_export(params)
+        elif url.path == '/stats':
+            return await self.execute_stats(params)
+        else:
+            return make_error_response(404)
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """Serve requests until cancelled.
+
+        Args:
+            host: The interface on which to listen.
+            port: The port on which to listen.
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def _check_reload(self):
+        if self._reloader is None:
+            return
+
+        self._reloader.check()
+        snapshot = self._reloader.take()
+        if snapshot is not None:
+            self._getter, self._stat_generator = snapshot
+            self._generation += 1
+
+        # Rows are only appended between requests, leaving the delta pending until then.
+        if len(self._in_flight) > 0:
+            return
+
+        delta = self._reloader.take_delta()
+        if delta is None:
+            return
+
+        article_lines = delta.get(article_getter.LOCAL_PATH, [])
+        if len(article_lines) > 0:
+            if isinstance(self._getter, article_getter.PreloadedArticleGetter):
+                self._getter.apply_delta(article_lines)
+            else:
+                self._getter = article_getter.PreloadedArticleGetter()
+
+        serialized_lines = delta.get(SERIALIZED_PATH, [])
+        if len(serialized_lines) > 0:
+            accessor = self._stat_generator.get_accessor()
+            if isinstance(accessor, data_util.CompressedDataAccessor):
+                accessor.apply_delta(serialized_lines)
+            else:
+                self._getter, self._stat_generator = load_snapshot()
+
+        self._generation += 1
+
+    async def _execute_coalesced(self, key: typing.Tuple,
+        target: typing.Callable[[], RESPONSE]) -> RESPONSE:
+        task = self._in_flight.get(key, None)
+
+        if task is None:
+            task = asyncio.ensure_future(self._execute_bounded(target))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda x: self._in_flight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _execute_bounded(self, target: typing.Callable[[], RESPONSE]) -> RESPONSE:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, target)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = await self._read_headers(reader)
+                pieces = request_line.decode('latin-1').split(' ')
+                if len(pieces) < 2:
+                    break
+
+                method, path = pieces[0], pieces[1]
+                keep_alive = headers.get('connection', 'keep-alive').lower() != 'close'
+
+                if method != 'GET':
+                    response = make_error_response(405)
+                else:
+                    try:
+                        response = await self.route(path)
+                    except Exception:
+                        response = make_error_response(500)
+
+                writer.write(serialize_response(response, keep_alive))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_headers(self, reader: asyncio.StreamReader) -> typing.Dict[str, str]:
+        headers: typing.Dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if line == '':
+                return headers
+
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+
+def get_params_key(params: typing.Dict[str, str]) -> typing.Tuple:
+    """Get a hashable key describing query parameters.
+
+    Args:
+        params: The query parameters.
+
+    Returns:
+        Tuple which is the same for parameters which describe the same query regardless of order.
+    """
+    return tuple(sorted(params.items()))
+
+
+def make_error_response(status_code: int) -> RESPONSE:
+    """Make a plain text error response.
+
+    Args:
+        status_code: The HTTP status code.
+
+    Returns:
+        Lambda compatible HTTP response.
+    """
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'text/plain',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': STATUS_TEXT.get(status_code, 'Error')
+    }
+
+
+def serialize_response(response: RESPONSE, keep_alive: bool) -> bytes:
+    """Convert a Lambda compatible response to raw HTTP/1.1.
+
+    Args:
+        response: The Lambda compatible response to serialize.
+        keep_alive: Flag indicating if the connection stays open after this response.
+
+    Returns:
+        Bytes to write to the client including status line, headers, and body.
+    """
+    status_code = response['statusCode']
+    body = response['body'].encode('utf-8')
+
+    headers = dict(response['headers'])
+    headers['Content-Length'] = str(len(body))
+    headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+
+    lines = ['HTTP/1.1 %d %s' % (status_code, STATUS_TEXT.get(status_code, 'Unknown'))]
+    lines += ['%s: %s' % (name, value) for name, value in headers.items()]
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    return head + body
+
+
+def load_snapshot() -> SNAPSHOT:
+    """Load the local datasets.
+
+    Returns:
+        Tuple of getter holding articles in memory and statistics generator.
+    """
+    getter = article_getter.PreloadedArticleGetter()
+
+    with open(SERIALIZED_PATH) as f:
+        accessor = data_util.CompressedDataAccessor(f.read().split('\n'))
+
+    stat_generator = accessor_stat_gen.AccessorStatGenerator(accessor)
+    return (getter, stat_generator)
+
+
+def build_server(concurrency: int = DEFAULT_CONCURRENCY) -> QueryServer:
+    """Load the local datasets and create a server around them which reloads them on change.
+
+    Args:
+        concurrency: The maximum number of queries to execute at the same time.
+
+    Returns:
+        Server ready to serve.
+    """
+    reloader = reload_util.Reloader(
+        [SERIALIZED_PATH, article_getter.LOCAL_PATH],
+        load_snapshot,
+        appendable=[SERIALIZED_PATH, article_getter.LOCAL_PATH]
+    )
+    getter, stat_generator = load_snapshot()
+    return QueryServer(getter, stat_generator, concurrency, reloader)
+
+
+def main():
+    """Entry point for running the server from the command line."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CONCURRENCY
+
+    server = build_server(concurrency)
+    print('Serving on port %d' % port)
+    asyncio.run(server.serve(port=port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Utilities to pick up changed data files in long-running processes without a restart.
+
+Utilities which watch data files by modification time and size and, when they change, build a
+replacement value (like a DataAccessor) on a background thread. The caller swaps the new value in at
+a safe point (between frames or requests) so that a partially loaded value is never used. Not
+available in the browser where data files are fetched once and threads are not supported.
+
+Files which are only appended to (like those updated by serialized_gen delta) may be marked as
+appendable. If every changed file is appendable and only grew (the bytes before its prior end are
+unchanged), the appended lines are read instead of rebuilding the value such that the caller can
+apply them to the value in use (like through data_util.CompressedDataAccessor.apply_delta).
+
+License: BSD
+"""
+
+import os
+import sys
+import threading
+import time
+import typing
+
+DEFAULT_INTERVAL = 2.0
+TAIL_BYTES = 4096
+
+reload_available = sys.platform != 'emscripten'
+
+SIGNATURE = typing.Tuple[typing.Optional[typing.Tuple[int, int]], ...]
+DELTA = typing.Dict[str, typing.List[str]]
+T = typing.TypeVar('T')
+
+
+def get_files_signature(paths: typing.Iterable[str]) -> SIGNATURE:
+    """Get a value which changes when any of a set of files changes.
+
+    Args:
+        paths: The paths of the files to describe.
+
+    Returns:
+        Tuple with modification time (nanoseconds) and size per file or None for missing files.
+    """
+    def describe(path: str) -> typing.Optional[typing.Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    return tuple(map(describe, paths))
+
+
+class Reloader(typing.Generic[T]):
+    """Watcher which rebuilds a value in the background when its source files change."""
+
+    def __init__(self, paths: typing.List[str], factory: typing.Callable[[], T],
+        interval: float = DEFAULT_INTERVAL, appendable: typing.Optional[typing.List[str]] = None):
+        """Create a new reloader, treating the files as they are now as already loaded.
+
+        Args:
+            paths: The files from which the value is built.
+            factory: Function which builds a new value from the files.
+            interval: The minimum number of seconds between checks of the files.
+            appendable: The paths whose appended lines should be given through take_delta instead
+                of rebuilding the value or None if all changes rebuild. Defaults to None.
+        """
+        self._paths = paths
+        self._factory = factory
+        self._interval = interval
+        self._appendable = set(appendable if appendable is not None else [])
+        self._signature = get_files_signature(paths)
+        self._tails = self._read_tails(self._signature)
+        self._last_check = time.monotonic()
+        self._building = False
+        self._ready: typing.Optional[T] = None
+        self._ready_delta: typing.Optional[DELTA] = None
+        self._lock = threading.Lock()
+
+    def check(self) -> bool:
+        """Check for changed files if the interval elapsed, starting a rebuild if needed.
+
+        Cheap enough to call every frame or request.
+
+        Returns:
+            True if a rebuild was started and false otherwise.
+        """
+        now = time.monotonic()
+        if self._building or now - self._last_check < self._interval:
+            return False
+
+        self._last_check = now
+        signature = get_files_signature(self._paths)
+        if signature == self._signature or None in signature:
+            return False
+
+        self._building = True
+        threading.Thread(target=self._build, args=(signature,), daemon=True).start()
+        return True
+
+    def take(self) -> typing.Optional[T]:
+        """Get the rebuilt value if one finished since the last call.
+
+        Should be called before take_delta as any delta describes lines appended after the files
+        from which this value was built.
+
+        Returns:
+            The new value which should be swapped in or None if no new value is ready.
+        """
+        with self._lock:
+            ready = self._ready
+            self._ready = None
+
+        return ready
+
+    def take_delta(self) -> typing.Optional[DELTA]:
+        """Get the lines appended to appendable files since the last call if any were read.
+
+        Deltas not yet taken accumulate such that a caller may wait for a safe point (like no
+        queries in flight) before taking one.
+
+        Returns:
+            Mapping from path to the lines appended to it (without line endings and skipping blank
+            lines) or None if no lines were appended.
+        """
+        with self._lock:
+            ready = self._ready_delta
+            self._ready_delta = None
+
+        return ready
+
+    def get_is_building(self) -> bool:
+        """Determine if a rebuild is in progress.
+
+        Returns:
+            True if a new value is being built in the background and false otherwise.
+        """
+        return self._building
+
+    def _build(self, signature: SIGNATURE):
+        try:
+            delta = self._read_delta(signature)
+        except Exception:
+            delta = None
+
+        value = None
+        if delta is None:
+            try:
+                value = self._factory()
+            except Exception:
+                value = None
+
+        # Files still being written change again during the build so keep the old value and retry.
+        unchanged = get_files_signature(self._paths) == signature
+        tails = self._read_tails(signature) if unchanged else {}
+
+        with self._lock:
+            if delta is not None and unchanged:
+                self._ready_delta = self._merge_delta(self._ready_delta, delta)
+                self._signature = signature
+                self._tails = tails
+            elif value is not None and unchanged:
+                # The rebuilt value already includes lines of deltas not yet taken.
+                self._ready = value
+                self._ready_delta = None
+                self._signature = signature
+                self._tails = tails
+
+        self._building = False
+
+    def _read_delta(self, signature: SIGNATURE) -> typing.Optional[DELTA]:
+        delta: DELTA = {}
+        for path, prior, current in zip(self._paths, self._signature, signature):
+            if prior == current:
+                continue
+
+            if path not in self._appendable or prior is None or current is None:
+                return None
+
+            prior_size = prior[1]
+            current_size = current[1]
+            if current_size <= prior_size:
+                return None
+
+            tail = self._tails.get(path, b'')
+            with open(path, 'rb') as f:
+                f.seek(prior_size - len(tail))
+                if f.read(len(tail)) != tail:
+                    return None
+
+                appended = f.read(current_size - prior_size).decode('utf-8')
+
+            # A last line without its line ending may still be being written.
+            if not appended.endswith('\n'):
+                return None
+
+            lines = map(lambda x: x.rstrip('\r'), appended.split('\n'))
+            delta[path] = list(filter(lambda x: x.strip() != '', lines))
+
+        return delta
+
+    def _read_tails(self, signature: SIGNATURE) -> typing.Dict[str, bytes]:
+        tails = {}
+        for path, described in zip(self._paths, signature):
+            if path not in self._appendable or described is None:
+                continue
+
+            size = described[1]
+            start = max(0, size - TAIL_BYTES)
+            with open(path, 'rb') as f:
+                f.seek(start)
+                tails[path] = f.read(size - start)
+
+        return tails
+
+    def _merge_delta(self, prior: typing.Optional[DELTA], new: DELTA) -> DELTA:
+        if prior is None:
+            return new
+
+        merged = dict(prior)
+        for path, lines in new.items():
+            merged[path] = merged.get(path, []) + lines
+
+        return merged
@@ -0,0 +1,591 @@
+"""Offline builder for the compressed article format read by CompressedDataAccessor.
+
+Offline builder which reads the article table (see article_getter) and writes the compressed n / c /
+t / k / a format parsed by data_util.CompressedDataAccessor. Articles with identical country,
+categories, tags, and keywords are collapsed into a single counted article set whose a line ends
+with the number of its articles published in each month (like 2024-01:3;2024-02:1) followed by the
+byte offsets at which its articles' rows start in the article file (see data_util.encode_offsets)
+so that matching articles can be read without a scan. A table line (o signature) records the size
+and modification time of the article file such that offsets are ignored if read against a different
+file. Parsing and grouping run in parallel over line-aligned chunks of the article file and are
+merged deterministically.
+
+Names are given ids through a single shared namespace as in the existing file and, if a prior
+compressed file is available, its ids and its taxonomy (which category a tag belongs to and which
+tags a keyword belongs to) are reused so that ids stay stable across rebuilds. Tags and keywords not
+found in the prior taxonomy are placed under the category or tag with which they most often
+co-occur. If used from the command line, takes optional paths to the articles file, output file, and
+prior compressed file followed by an optional number of workers.
+
+New articles may also be added without a full rebuild through an append-only delta holding only
+new dictionary entries and a lines for the new articles (see apply_delta). The new rows are appended
+to the article table first such that the delta records their offsets in that table. From the command
+line, use delta as the first argument followed by the path to a table of the new rows and optional
+paths to the compressed file and article table (both appended in place) and an optional number of
+workers.
+
+License: BSD
+"""
+
+import collections
+import multiprocessing
+import os
+import sys
+import typing
+
+import chunk_util
+import data_util
+
+DEFAULT_ARTICLES_PATH = os.path.join('csv', 'articles.csv')
+DEFAULT_OUTPUT_PATH = os.path.join('txt', 'serialized.txt')
+NO_IDS = '-1'
+DICTIONARY_COMMANDS = {'n', 'c', 't', 'k'}
+
+NAMES = typing.Tuple[str, ...]
+SIGNATURE = typing.Tuple[str, NAMES, NAMES, NAMES]
+PAIR = typing.Tuple[str, str]
+SIGNATURE_BUCKET = typing.Tuple[SIGNATURE, str]
+
+
+class ChunkSummary:
+    """Counts of article signatures and co-occurrences found in part of the article table."""
+
+    def __init__(self):
+        """Create an empty summary."""
+        self._signatures: typing.Counter[SIGNATURE] = collections.Counter()
+        self._tag_categories: typing.Counter[PAIR] = collections.Counter()
+        self._keyword_tags: typing.Counter[PAIR] = collections.Counter()
+        self._signature_buckets: typing.Counter[SIGNATURE_BUCKET] = collections.Counter()
+        self._signature_offsets: typing.Dict[SIGNATURE, typing.List[int]] = {}
+
+    def add_row(self, country: str, categories: typing.List[str], tags: typing.List[str],
+        keywords: typing.List[str], published: str = '', offset: typing.Optional[int] = None):
+        """Record a single article.
+
+        Args:
+            country: The country in which the article was published.
+            categories: The categories of the article.
+            tags: The tags of the article.
+            keywords: The keywords of the article.
+            published: The ISO8601 publication date of the article or empty string if not known.
+                Defaults to empty string.
+            offset: The byte offset at which the article's row starts in the article table or None
+                if not known. Rows must be added in file order. Defaults to None.
+        """
+        categories_unique = tuple(sorted(set(categories)))
+        tags_unique = tuple(sorted(set(tags)))
+        keywords_unique = tuple(sorted(set(keywords)))
+
+        signature = (country, categories_unique, tags_unique, keywords_unique)
+        self._signatures[signature] += 1
+
+        bucket = data_util.get_bucket(published)
+        if bucket is not None:
+            self._signature_buckets[(signature, bucket)] += 1
+
+        if offset is not None:
+            self._signature_offsets.setdefault(signature, []).append(offset)
+
+        for tag in tags_unique:
+            for category in categories_unique:
+                self._tag_categories[(tag, category)] += 1
+
+        for keyword in keywords_unique:
+            for tag in tags_unique:
+                self._keyword_tags[(keyword, tag)] += 1
+
+    def merge(self, other: 'ChunkSummary'):
+        """Add the counts from another summary into this one.
+
+        Args:
+            other: The summary to merge into this one which covers rows after those of this one.
+        """
+        self._signatures.update(other.get_signatures())
+        self._tag_categories.update(other.get_tag_categories())
+        self._keyword_tags.update(other.get_keyword_tags())
+        self._signature_buckets.update(other.get_signature_buckets())
+
+        for signature, offsets in other.get_signature_offsets().items():
+            self._signature_offsets.setdefault(signature, []).extend(offsets)
+
+    def get_signatures(self) -> typing.Counter[SIGNATURE]:
+        """Get the number of articles per signature.
+
+        Returns:
+            Counter from (country, categories, tags, keywords) to number of articles.
+        """
+        return self._signatures
+
+    def get_signature_buckets(self) -> typing.Counter[SIGNATURE_BUCKET]:
+        """Get the number of articles per signature and time bucket.
+
+        Returns:
+            Counter from signature and bucket (month like 2024-01) to number of articles. Articles
+            without a publication date are not included.
+        """
+        return self._signature_buckets
+
+    def get_signature_offsets(self) -> typing.Dict[SIGNATURE, typing.List[int]]:
+        """Get where the rows of the articles with each signature start in the article table.
+
+        Returns:
+            Mapping from signature to ascending byte offsets. Articles added without an offset are
+            not included.
+        """
+        return self._signature_offsets
+
+    def get_tag_categories(self) -> typing.Counter[PAIR]:
+        """Get the number of articles in which a tag and category co-occur.
+
+        Returns:
+            Counter from (tag, category) to number of articles.
+        """
+        return self._tag_categories
+
+    def get_keyword_tags(self) -> typing.Counter[PAIR]:
+        """Get the number of articles in which a keyword and tag co-occur.
+
+        Returns:
+            Counter from (keyword, tag) to number of articles.
+        """
+        return self._keyword_tags
+
+
+class Taxonomy:
+    """Ids and hierarchy for countries, categories, tags, and keywords."""
+
+    def __init__(self):
+        """Create an empty taxonomy."""
+        self._ids: typing.Dict[str, int] = {}
+        self._names: typing.Dict[int, str] = {}
+        self._countries: typing.Set[str] = set()
+        self._categories: typing.Set[str] = set()
+        self._tag_categories: typing.Dict[str, str] = {}
+        self._keyword_tags: typing.Dict[str, typing.List[str]] = {}
+
+    def load_prior(self, lines: typing.Iterable[str]):
+        """Load ids and hierarchy from a prior compressed file.
+
+        Args:
+            lines: The lines of the prior compressed file.
+        """
+        for line in lines:
+            line = line.rstrip('\n')
+            if line == '' or line[0] not in DICTIONARY_COMMANDS:
+                continue
+
+            pieces = line.split(' ')
+            command = pieces[0]
+            num_ids = {'n': 1, 'c': 1, 't': 2, 'k': 3}[command]
+            ids = [int(x) for x in pieces[1:num_ids + 1]]
+            name = (' '.join(pieces[num_ids + 1:]))[1:-1]
+
+            self._ids[name] = ids[-1]
+            self._names[ids[-1]] = name
+            if command == 'n':
+                self._countries.add(name)
+            elif command == 'c':
+                self._categories.add(name)
+            elif command == 't':
+                self._tag_categories[name] = self._names[ids[0]]
+            elif command == 'k':
+                self._add_keyword_tag(name, self._names[ids[1]])
+
+    def update(self, summary: ChunkSummary):
+        """Add names found in articles which are not yet part of the taxonomy.
+
+        Args:
+            summary: Summary of all articles.
+        """
+        signatures = summary.get_signatures().keys()
+        new_countries = set(map(lambda x: x[0], signatures)) - self._countries
+        new_categories = set(self._flatten(map(lambda x: x[1], signatures))) - self._categories
+        new_tags = set(self._flatten(map(lambda x: x[2], signatures))) - self._tag_categories.keys()
+        new_keywords = set(self._flatten(map(lambda x: x[3], signatures)))
+        new_keywords = new_keywords - self._keyword_tags.keys()
+
+        self._countries.update(new_countries)
+        self._categories.update(new_categories)
+
+        tag_categories = self._index_pairs(summary.get_tag_categories())
+        for tag in sorted(new_tags):
+            self._tag_categories[tag] = self._get_most_common(tag, tag_categories)
+
+        keyword_tags = self._index_pairs(summary.get_keyword_tags())
+        for keyword in sorted(new_keywords):
+            self._add_keyword_tag(keyword, self._get_most_common(keyword, keyword_tags))
+
+        new_names = sorted(new_countries) + sorted(new_categories) + sorted(new_tags)
+        new_names += sorted(new_keywords)
+        next_id = self.get_max_id() + 1
+        for name in new_names:
+            if name not in self._ids:
+                self._ids[name] = next_id
+                self._names[next_id] = name
+                next_id += 1
+
+    def get_max_id(self) -> int:
+        """Get the largest id assigned so far.
+
+        Returns:
+            The largest id or -1 if no ids are assigned.
+        """
+        return max(self._ids.values(), default=-1)
+
+    def get_id(self, name: str) -> int:
+        """Get the id for a name.
+
+        Args:
+            name: The name of a country, category, tag, or keyword.
+
+        Returns:
+            The integer id shared by all uses of the name.
+        """
+        return self._ids[name]
+
+    def serialize_dictionary(self, min_id: int = 0) -> typing.List[str]:
+        """Serialize the n, c, t, and k lines.
+
+        Args:
+            min_id: Only lines defining names with at least this id are included such that a delta
+                with only new names may be written. Defaults to zero to include all names.
+
+        Returns:
+            Lines in an order where each category precedes its tags and each tag its keywords.
+        """
+        lines: typing.List[typing.Tuple[int, str]] = []
+
+        for country in sorted(self._countries, key=lambda x: self._ids[x]):
+            lines.append((self._ids[country], 'n %d "%s"' % (self._ids[country], country)))
+
+        tags_by_category: typing.Dict[str, typing.List[str]] = {}
+        for tag, category in self._tag_categories.items():
+            tags_by_category.setdefault(category, []).append(tag)
+
+        keywords_by_tag: typing.Dict[str, typing.List[str]] = {}
+        for keyword, tags in self._keyword_tags.items():
+            for tag in tags:
+                keywords_by_tag.setdefault(tag, []).append(keyword)
+
+        for category in sorted(self._categories, key=lambda x: self._ids[x]):
+            category_id = self._ids[category]
+            lines.append((category_id, 'c %d "%s"' % (category_id, category)))
+
+            tags = sorted(tags_by_category.get(category, []), key=lambda x: self._ids[x])
+            for tag in tags:
+                tag_id = self._ids[tag]
+                lines.append((tag_id, 't %d %d "%s"' % (category_id, tag_id, tag)))
+
+                keywords = sorted(keywords_by_tag.get(tag, []), key=lambda x: self._ids[x])
+                for keyword in keywords:
+                    lines.append((self._ids[keyword], 'k %d %d %d "%s"' % (
+                        category_id,
+                        tag_id,
+                        self._ids[keyword],
+                        keyword
+                    )))
+
+        return [line for line_id, line in lines if line_id >= min_id]
+
+    def _add_keyword_tag(self, keyword: str, tag: str):
+        tags = self._keyword_tags.setdefault(keyword, [])
+        if tag not in tags:
+            tags.append(tag)
+
+    def _flatten(self, target: typing.Iterable[typing.Tuple[str, ...]]) -> typing.Iterable[str]:
+        for values in target:
+            for value in values:
+                yield value
+
+    def _index_pairs(self, pairs: typing.Counter[PAIR]) -> typing.Dict[str, typing.Dict[str, int]]:
+        indexed: typing.Dict[str, typing.Dict[str, int]] = {}
+        for (name, other), count in pairs.items():
+            indexed.setdefault(name, {})[other] = count
+        return indexed
+
+    def _get_most_common(self, name: str,
+        indexed: typing.Dict[str, typing.Dict[str, int]]) -> str:
+        candidates = indexed.get(name, {})
+        if len(candidates) == 0:
+            raise RuntimeError('Could not place %s in taxonomy.' % name)
+
+        ranked = sorted(candidates.items(), key=lambda x: (-x[1], x[0]))
+        return ranked[0][0]
+
+
+def parse_article_line(line: str) -> typing.Optional[typing.Tuple]:
+    """Parse the fields needed for aggregation from a row of the article table.
+
+    Args:
+        line: The raw tab-separated row.
+
+    Returns:
+        Tuple of country, categories, tags, keywords, and publication date or None if the row is
+        invalid or the header.
+    """
+    pieces = line.rstrip('\r\n').split('\t')
+    if len(pieces) != 8 or pieces[0] == 'url':
+        return None
+
+    def split_list(target: str) -> typing.List[str]:
+        return [x for x in target.split(';') if x != '']
+
+    return (
+        pieces[4],
+        split_list(pieces[7]),
+        split_list(pieces[6]),
+        split_list(pieces[5]),
+        pieces[3]
+    )
+
+
+def summarize_range(path: str, start: int, end: int) -> ChunkSummary:
+    """Summarize the articles within a byte range of the article table.
+
+    Args:
+        path: Path to the article table.
+        start: The byte offset at which the range starts.
+        end: The byte offset at which the range ends (exclusive).
+
+    Returns:
+        Summary of the articles in the range.
+    """
+    summary = ChunkSummary()
+
+    for offset, line in chunk_util.read_lines_with_offsets(path, start, end):
+        parsed = parse_article_line(line)
+        if parsed is not None:
+            country, categories, tags, keywords, published = parsed
+            summary.add_row(country, categories, tags, keywords, published, offset)
+
+    return summary
+
+
+def summarize_file(path: str, workers: typing.Optional[int] = None,
+    start: int = 0) -> ChunkSummary:
+    """Summarize all articles in the article table in parallel.
+
+    Args:
+        path: Path to the article table.
+        workers: The number of worker processes or None to use one per core.
+        start: The byte offset of the first row to summarize. Defaults to zero for all rows.
+
+    Returns:
+        Summary of all articles where chunk summaries are merged in file order.
+    """
+    num_workers = workers if workers is not None else multiprocessing.cpu_count()
+    ranges = chunk_util.get_line_aligned_ranges(path, num_workers * 4, start)
+    tasks = [(path, start, end) for start, end in ranges]
+
+    if num_workers <= 1:
+        summaries = [summarize_range(*task) for task in tasks]
+    else:
+        with multiprocessing.Pool(num_workers) as pool:
+            summaries = pool.starmap(summarize_range, tasks)
+
+    total = ChunkSummary()
+    for summary in summaries:
+        total.merge(summary)
+
+    return total
+
+
+def serialize(summary: ChunkSummary, taxonomy: Taxonomy, min_dictionary_id: int = 0,
+    table_signature: typing.Optional[str] = None) -> typing.List[str]:
+    """Serialize articles to the compressed format.
+
+    Args:
+        summary: Summary of all articles.
+        taxonomy: Taxonomy which includes all names found in the summary.
+        min_dictionary_id: Only dictionary lines for names with at least this id are included.
+            Defaults to zero to include all names.
+        table_signature: Signature of the article table into which offsets point (see
+            data_util.get_table_signature) or None if not known. Defaults to None.
+
+    Returns:
+        Lines of the compressed format.
+    """
+    def serialize_ids(names: typing.Tuple[str, ...]) -> str:
+        if len(names) == 0:
+            return NO_IDS
+
+        ids = sorted(map(lambda x: taxonomy.get_id(x), names))
+        return ';'.join(map(lambda x: str(x), ids))
+
+    buckets_by_signature: typing.Dict[SIGNATURE, typing.List[str]] = {}
+    for (signature, bucket), count in summary.get_signature_buckets().items():
+        buckets_by_signature.setdefault(signature, []).append('%s:%d' % (bucket, count))
+
+    def serialize_buckets(signature: SIGNATURE) -> str:
+        buckets = buckets_by_signature.get(signature, [])
+        if len(buckets) == 0:
+            return NO_IDS
+
+        return ';'.join(sorted(buckets))
+
+    signature_offsets = summary.get_signature_offsets()
+
+    article_lines = []
+    for signature, count in summary.get_signatures().items():
+        country, categories, tags, keywords = signature
+        article_lines.append((
+            taxonomy.get_id(country),
+            serialize_ids(categories),
+            serialize_ids(tags),
+            serialize_ids(keywords),
+            count,
+            serialize_buckets(signature),
+            data_util.encode_offsets(signature_offsets.get(signature, []))
+        ))
+
+    article_lines.sort()
+    article_strs = map(lambda x: 'a %d %s %s %s %d %s %s' % x, article_lines)
+
+    table_lines = [] if table_signature is None else ['o ' + table_signature]
+    dictionary_lines = taxonomy.serialize_dictionary(min_dictionary_id)
+    return dictionary_lines + table_lines + list(article_strs)
+
+
+def build(articles_path: str, prior_path: typing.Optional[str],
+    workers: typing.Optional[int] = None) -> typing.List[str]:
+    """Build the compressed format from the article table.
+
+    Args:
+        articles_path: Path to the article table.
+        prior_path: Path to a prior compressed file whose ids and taxonomy should be reused or None
+            if not available.
+        workers: The number of worker processes or None to use one per core.
+
+    Returns:
+        Lines of the compressed format.
+    """
+    taxonomy = Taxonomy()
+    if prior_path is not None and os.path.exists(prior_path):
+        with open(prior_path) as f:
+            taxonomy.load_prior(f)
+
+    summary = summarize_file(articles_path, workers)
+    taxonomy.update(summary)
+    table_signature = data_util.get_table_signature(articles_path)
+    return serialize(summary, taxonomy, table_signature=table_signature)
+
+
+def build_delta(articles_path: str, prior_path: str, workers: typing.Optional[int] = None,
+    start: int = 0) -> typing.List[str]:
+    """Build lines which may be appended to an existing compressed file to add new articles.
+
+    Args:
+        articles_path: Path to a table holding the new article rows in the article table format.
+            Offsets in the delta refer to this table so, to read articles through them, this should
+            be the article table after new rows are appended (see append_rows).
+        prior_path: Path to the current compressed file.
+        workers: The number of worker processes or None to use one per core.
+        start: The byte offset at which the new rows start. Defaults to zero for a table of only
+            new rows.
+
+    Returns:
+        Dictionary lines for names not yet in the prior file followed by a table line with the
+        signature of the article table (replacing the prior one) and a lines for the new
+        articles. Names already in the prior file keep their ids and place in the taxonomy.
+    """
+    taxonomy = Taxonomy()
+    with open(prior_path) as f:
+        taxonomy.load_prior(f)
+
+    min_dictionary_id = taxonomy.get_max_id() + 1
+
+    summary = summarize_file(articles_path, workers, start)
+    taxonomy.update(summary)
+    table_signature = data_util.get_table_signature(articles_path)
+    return serialize(summary, taxonomy, min_dictionary_id, table_signature)
+
+
+def append_rows(rows_path: str, articles_path: str) -> int:
+    """Append new article rows (less header and invalid rows) to the article table.
+
+    Args:
+        rows_path: Path to the table of new article rows.
+        articles_path: Path to the article table to which the new rows are appended.
+
+    Returns:
+        The byte offset in the article table at which the new rows start.
+    """
+    with open(rows_path) as f:
+        rows = [x.rstrip('\r\n') for x in f if parse_article_line(x) is not None]
+
+    return _append_lines(articles_path, rows)
+
+
+def apply_delta(rows_path: str, serialized_path: str, articles_path: str,
+    workers: typing.Optional[int] = None) -> typing.List[str]:
+    """Append new article rows to the article table and a delta for them to the compressed file.
+
+    Args:
+        rows_path: Path to the table of new article rows.
+        serialized_path: Path to the compressed file to which the delta is appended.
+        articles_path: Path to the article table to which the new rows (less header) are appended.
+        workers: The number of worker processes or None to use one per core.
+
+    Returns:
+        The delta lines which were appended such that they may also be applied to loaded data.
+    """
+    start = append_rows(rows_path, articles_path)
+    delta_lines = build_delta(articles_path, serialized_path, workers, start)
+    _append_lines(serialized_path, delta_lines)
+    return delta_lines
+
+
+def _append_lines(path: str, lines: typing.List[str]) -> int:
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        needs_newline = size > 0
+        if needs_newline:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+
+    if len(lines) == 0:
+        return size
+
+    with open(path, 'a') as f:
+        if needs_newline:
+            f.write('\n')
+        f.write('\n'.join(lines) + '\n')
+
+    # Offset at which the first new line starts.
+    return size + 1 if needs_newline else size
+
+
+def main():
+    """Entry point for building the compressed format from the command line."""
+    if len(sys.argv) > 1 and sys.argv[1] == 'delta':
+        main_delta()
+        return
+
+    articles_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ARTICLES_PATH
+    output_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT_PATH
+    prior_path = sys.argv[3] if len(sys.argv) > 3 else output_path
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    lines = build(articles_path, prior_path, workers)
+
+    with open(output_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    print('Wrote %d lines to %s' % (len(lines), output_path))
+
+
+def main_delta():
+    """Entry point for appending new article rows to the current files from the command line."""
+    rows_path = sys.argv[2]
+    serialized_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_OUTPUT_PATH
+    articles_path = sys.argv[4] if len(sys.argv) > 4 else DEFAULT_ARTICLES_PATH
+    workers = int(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    delta_lines = apply_delta(rows_path, serialized_path, articles_path, workers)
+
+    print('Appended %d lines to %s' % (len(delta_lines), serialized_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Utilities for splitting the compressed article format into shards loaded on demand.
+
+Utilities which split txt/serialized.txt into a small global file and one shard per country such
+that the browser only fetches what the first frame needs. The global file holds the dictionaries
+(n / c / t / k lines), the signature of the article table into which offsets point (o line),
+per-country population totals (p lines), and precomputed results for the
+default views (s lines for the query without filters, alone and grouped by each category). Its
+size grows with the vocabulary rather than the number of articles. Each shard holds the a lines of
+one country and is fetched by data_util.ShardedDataAccessor the first time a filter needs it. If run
+from the command line, takes optional paths to the compressed file and output directory.
+
+License: BSD
+"""
+
+import itertools
+import os
+import sys
+import typing
+
+import data_util
+
+DEFAULT_SERIALIZED_PATH = os.path.join('txt', 'serialized.txt')
+SHARD_DIR = os.path.join('txt', 'shards')
+GLOBAL_FILENAME = 'global.txt'
+DICTIONARY_COMMANDS = {'n', 'c', 't', 'k'}
+TABLE_COMMAND = 'o'
+NO_VALUES = '-1'
+
+# The desktop version reads the full local file quickly and hot reloads it.
+sharded_preferred = sys.platform == 'emscripten'
+
+
+def get_global_path(directory: str = SHARD_DIR) -> str:
+    """Get the path at which the global file is stored.
+
+    Args:
+        directory: The directory holding the shards. Defaults to SHARD_DIR.
+
+    Returns:
+        Path to the global file.
+    """
+    return os.path.join(directory, GLOBAL_FILENAME)
+
+
+def get_shard_path(country_id: int, directory: str = SHARD_DIR) -> str:
+    """Get the path at which the shard for a country is stored.
+
+    Args:
+        country_id: The id of the country in the compressed file.
+        directory: The directory holding the shards. Defaults to SHARD_DIR.
+
+    Returns:
+        Path to the file with the country's a lines.
+    """
+    return os.path.join(directory, 'country_%d.txt' % country_id)
+
+
+def make_global(lines: typing.List[str]) -> typing.List[str]:
+    """Build the global file from the lines of a full compressed file.
+
+    Args:
+        lines: The non-empty lines of the full compressed file.
+
+    Returns:
+        Dictionary and table lines followed by population and summary lines.
+    """
+    dictionary = list(filter(lambda x: x[0] in DICTIONARY_COMMANDS, lines))
+    table_lines = list(filter(lambda x: x[0] == TABLE_COMMAND, lines))[-1:]
+    ids_by_type: typing.Dict[str, typing.Dict[str, int]] = {}
+    for line in dictionary:
+        pieces = line.split(' ')
+        num_ids = {'n': 1, 'c': 1, 't': 2, 'k': 3}[pieces[0]]
+        name = (' '.join(pieces[num_ids + 1:]))[1:-1]
+        ids_by_type.setdefault(pieces[0], {})[name] = int(pieces[num_ids])
+
+    accessor = data_util.CompressedDataAccessor(lines)
+    categories = [None] + sorted(ids_by_type.get('c', {}).keys())
+    summary_lines = itertools.chain(*map(
+        lambda x: _make_summary_lines(accessor, x, ids_by_type),
+        categories
+    ))
+
+    population_lines = _make_population_lines(lines)
+    return dictionary + table_lines + population_lines + list(summary_lines)
+
+
+def make_shards(lines: typing.List[str]) -> typing.Dict[int, typing.List[str]]:
+    """Split the article sets of a full compressed file by country.
+
+    Args:
+        lines: The non-empty lines of the full compressed file.
+
+    Returns:
+        Mapping from country id to the a lines for that country.
+    """
+    shards: typing.Dict[int, typing.List[str]] = {}
+    for line in filter(lambda x: x[0] == 'a', lines):
+        shards.setdefault(int(line.split(' ')[1]), []).append(line)
+
+    return shards
+
+
+def build_shards(serialized_path: str = DEFAULT_SERIALIZED_PATH,
+    directory: str = SHARD_DIR) -> int:
+    """Write the global file and per-country shards for a full compressed file.
+
+    Args:
+        serialized_path: Path to the full compressed file. Defaults to DEFAULT_SERIALIZED_PATH.
+        directory: The directory into which files are written. Defaults to SHARD_DIR.
+
+    Returns:
+        The number of shards written not including the global file.
+    """
+    with open(serialized_path) as f:
+        lines = list(filter(lambda x: x.strip() != '', f.read().split('\n')))
+
+    os.makedirs(directory, exist_ok=True)
+
+    with open(get_global_path(directory), 'w') as f:
+        f.write('\n'.join(make_global(lines)))
+
+    shards = make_shards(lines)
+    for country_id, shard_lines in shards.items():
+        with open(get_shard_path(country_id, directory), 'w') as f:
+            f.write('\n'.join(shard_lines))
+
+    return len(shards)
+
+
+def load_sharded(get_text: typing.Callable[[str], str],
+    directory: str = SHARD_DIR) -> typing.Optional[data_util.ShardedDataAccessor]:
+    """Try loading an accessor which fetches shards as needed.
+
+    Args:
+        get_text: Function which returns the contents of a file at a path like the sketch's data
+            layer get_text.
+        directory: The directory holding the shards. Defaults to SHARD_DIR.
+
+    Returns:
+        Accessor around the global file or None if shards are not available.
+    """
+    try:
+        global_contents = get_text(get_global_path(directory))
+    except:
+        return None
+
+    def load_shard(country_id: int) -> typing.List[str]:
+        return get_text(get_shard_path(country_id, directory)).split('\n')
+
+    return data_util.ShardedDataAccessor(global_contents.split('\n'), load_shard)
+
+
+def _make_population_lines(lines: typing.List[str]) -> typing.List[str]:
+    counts: typing.Dict[int, int] = {}
+    buckets_by_country: typing.Dict[int, data_util.BUCKETS] = {}
+    for line in filter(lambda x: x[0] == 'a', lines):
+        pieces = line.split(' ')
+        country_id = int(pieces[1])
+        counts[country_id] = counts.get(country_id, 0) + int(pieces[5])
+        country_buckets = buckets_by_country.setdefault(country_id, {})
+        if len(pieces) > 6 and pieces[6] != NO_VALUES:
+            for bucket, count in map(lambda x: x.split(':'), pieces[6].split(';')):
+                country_buckets[bucket] = country_buckets.get(bucket, 0) + int(count)
+
+    def serialize(country_id: int) -> str:
+        buckets = sorted(buckets_by_country[country_id].items())
+        buckets_str = ';'.join(map(lambda x: '%s:%d' % x, buckets)) if buckets else NO_VALUES
+        return 'p %d %d %s' % (country_id, counts[country_id], buckets_str)
+
+    return list(map(serialize, sorted(counts.keys())))
+
+
+def _make_summary_lines(accessor: data_util.CompressedDataAccessor,
+    category: typing.Optional[str],
+    ids_by_type: typing.Dict[str, typing.Dict[str, int]]) -> typing.List[str]:
+    result = accessor.execute_query(data_util.Query(category, None, None, None, None))
+    category_id = -1 if category is None else ids_by_type['c'][category]
+
+    def serialize(groups: data_util.COUNTED_GROUPS, ids: typing.Optional[typing.Dict[str, int]]):
+        if len(groups) == 0:
+            return NO_VALUES
+
+        keys = map(lambda x: x.get_name() if ids is None else str(ids[x.get_name()]), groups)
+        return ';'.join(map(lambda x: '%s:%d' % (x[0], x[1].get_count()), zip(keys, groups)))
+
+    fields = [
+        ('total', str(result.get_total_count())),
+        ('group', str(result.get_group_count())),
+        ('categories', serialize(result.get_categories(), ids_by_type['c'])),
+        ('countries', serialize(result.get_countries(), ids_by_type['n'])),
+        ('tags', serialize(result.get_tags(), ids_by_type['t'])),
+        ('keywords', serialize(result.get_keywords(), ids_by_type['k'])),
+        ('buckets', serialize(result.get_buckets(), None))
+    ]
+
+    return list(map(lambda x: 's %d %s %s' % (category_id, x[0], x[1]), fields))
+
+
+def main():
+    """Entry point for building shards from the command line."""
+    serialized_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SERIALIZED_PATH
+    directory = sys.argv[2] if len(sys.argv) > 2 else SHARD_DIR
+
+    num_shards = build_shards(serialized_path, directory)
+
+    print('Wrote %d shards to %s' % (num_shards, directory))
+
+
+if __name__ == '__main__':
+    main()
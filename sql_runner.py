@@ -0,0 +1,667 @@
+"""Local SQL execution of the reference queries in sql/ against an embedded database.
+
+Local execution of the reference queries in sql/ (total, countries, categories, tags, and keywords)
+using an in-memory SQLite database built from the article table. The query files are loaded and
+filled in with filters bound as parameters rather than substituted as strings. Matching articles are
+found once per query into a temporary table from which each reference query computes its output
+(tokens are looked up only for those articles). Totals across all articles (by country and by month)
+come from a table aggregated once when the database is built. The month outputs have no reference
+query so use SQL kept here. The runner implements DataAccessor so its results may be checked against
+CompressedDataAccessor. Queries may instead be run in an approximate mode where distinct counts use
+HyperLogLog and token counts use Space-Saving (see approx_util) along with error bounds. If used
+from the command line, takes optional paths to the articles file and compressed file (built from the
+articles file if not given) and then prints any mismatches between the two for the same single
+filter queries generated by static_stat_gen, both over all time and within a range of publication
+months. If followed by approximate, instead prints any approximate results outside their bounds.
+
+License: BSD
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import typing
+
+import accessor_stat_gen
+import approx_util
+import data_util
+import serialized_gen
+import static_stat_gen
+
+DEFAULT_ARTICLES_PATH = serialized_gen.DEFAULT_ARTICLES_PATH
+CHECK_RANGE = {'start': '2024-03', 'end': '2024-08'}
+
+TEMPLATE_DIR = 'sql'
+TEMPLATE_NAMES = ['total', 'countries', 'categories', 'tags', 'keywords']
+TARGET_FRAME_PLACEHOLDER = 'TARGET_FRAME'
+WHERE_CLAUSE_PLACEHOLDER = 'WHERE_CLAUSE'
+LIMIT_PATTERN = re.compile(r'LIMIT \d+')
+NO_LIMIT = -1
+
+SCHEMA = [
+    'CREATE TABLE articles (url TEXT, country TEXT, month TEXT)',
+    'CREATE TABLE output_frame (url TEXT, country TEXT, token TEXT, tokenType TEXT)',
+    '''CREATE TABLE taxonomy (
+        token TEXT,
+        tokenType TEXT,
+        category TEXT,
+        PRIMARY KEY (tokenType, token)
+    )''',
+    'CREATE TABLE article_totals (country TEXT, month TEXT, cnt INTEGER)',
+    'CREATE INDEX output_frame_token ON output_frame (tokenType, token)',
+    'CREATE INDEX output_frame_url ON output_frame (url, tokenType)'
+]
+
+ARTICLE_TOTALS_SQL = '''
+INSERT INTO article_totals
+SELECT
+    country,
+    month,
+    count(DISTINCT url) AS cnt
+FROM
+    articles
+GROUP BY
+    country,
+    month
+'''
+
+TOKEN_FRAME = '''(
+    SELECT
+        output_frame.url AS url,
+        output_frame.country AS country,
+        output_frame.token AS token,
+        output_frame.tokenType AS tokenType,
+        taxonomy.category AS category
+    FROM
+        output_frame
+    LEFT JOIN
+        taxonomy
+    ON
+        output_frame.tokenType = taxonomy.tokenType
+        AND output_frame.token = taxonomy.token
+) target_frame'''
+
+MATCH_URL_FRAME = 'temp.match_url target_frame'
+ALL_WHERE_SQL = 'WHERE 1 = 1'
+IN_GROUP_WHERE_SQL = 'WHERE target_frame.in_group = 1'
+MATCH_URL_WHERE_SQL = 'WHERE url IN (SELECT url FROM temp.match_url WHERE in_group = 1)'
+GROUP_CATEGORY_WHERE_SQL = 'WHERE (? IS NULL OR target_frame.category = ?)'
+
+APPROXIMATE_TOKEN_COUNTS_SQL = '''
+SELECT
+    approx_top_tokens(target_frame.tokenType, target_frame.token, ?)
+FROM
+    temp.match_url match_url
+CROSS JOIN
+    %s
+ON
+    target_frame.url = match_url.url
+WHERE
+    match_url.in_group = 1
+    AND (
+        ? IS NULL
+        OR target_frame.tokenType = 'category'
+        OR target_frame.category = ?
+    )
+''' % TOKEN_FRAME
+
+BUCKET_COUNTS_SQL = '''
+SELECT
+    month,
+    count(DISTINCT url) AS cnt
+FROM
+    temp.match_url
+WHERE
+    in_group = 1
+    AND month IS NOT NULL
+GROUP BY
+    month
+'''
+
+COUNTRY_TOTALS_SQL = '''
+SELECT
+    country,
+    sum(cnt) AS cnt
+FROM
+    article_totals
+WHERE
+    %s
+GROUP BY
+    country
+'''
+
+BUCKET_TOTALS_SQL = '''
+SELECT
+    month,
+    sum(cnt) AS cnt
+FROM
+    article_totals
+WHERE
+    month IS NOT NULL
+    AND %s
+GROUP BY
+    month
+'''
+
+HAS_TOKEN_SQL = 'url IN (SELECT url FROM output_frame WHERE tokenType = ? AND token = ?)'
+HAS_ANY_TOKEN_SQL = 'url IN (SELECT url FROM output_frame WHERE tokenType = ? AND token IN (%s))'
+EXACT_DISTINCT_SQL = 'count(DISTINCT '
+APPROXIMATE_DISTINCT_SQL = 'approx_count_distinct('
+TOKEN_OUTPUTS = {'category': 'categories', 'tag': 'tags', 'keyword': 'keywords'}
+
+ERRORS = typing.Dict[str, float]
+
+
+class HyperLogLogAggregate:
+    """SQLite aggregate function estimating count(DISTINCT value) with approx_util.HyperLogLog."""
+
+    def __init__(self):
+        """Create a new aggregate for a single group."""
+        self._sketch = approx_util.HyperLogLog()
+
+    def step(self, value):
+        """Add a value from a row where NULL is ignored as in count(DISTINCT value).
+
+        Args:
+            value: The value like a URL.
+        """
+        if value is not None:
+            self._sketch.add(str(value))
+
+    def finalize(self) -> int:
+        """Get the estimated count.
+
+        Returns:
+            Estimated number of distinct values rounded to an integer.
+        """
+        return round(self._sketch.get_estimate().get_value())
+
+
+class SpaceSavingAggregate:
+    """SQLite aggregate function finding the most common tokens of each type with Space-Saving."""
+
+    def __init__(self):
+        """Create a new aggregate for a single group."""
+        self._sketches: typing.Dict[str, approx_util.SpaceSaving] = {}
+
+    def step(self, token_type: str, token: str, capacity: int):
+        """Add a token from a row.
+
+        Args:
+            token_type: The type of token (category, tag, or keyword) each tracked separately.
+            token: The token itself.
+            capacity: The maximum number of tokens to track per type.
+        """
+        if token_type not in self._sketches:
+            self._sketches[token_type] = approx_util.SpaceSaving(capacity)
+
+        self._sketches[token_type].add(token)
+
+    def finalize(self) -> str:
+        """Get the tracked tokens.
+
+        Returns:
+            JSON object mapping token type to an object with rows (list of token and estimated
+            count) and error (bound on the count of any token including those not in rows).
+        """
+        def describe(sketch: approx_util.SpaceSaving) -> typing.Dict:
+            top = sketch.get_top()
+            errors = map(lambda x: x[1].get_error(), top)
+            return {
+                'rows': list(map(lambda x: (x[0], x[1].get_value()), top)),
+                'error': max(max(errors, default=0), sketch.get_untracked_bound())
+            }
+
+        return json.dumps(dict(map(lambda x: (x[0], describe(x[1])), self._sketches.items())))
+
+
+class SqlDataAccessor(data_util.DataAccessor):
+    """Data accessor which runs the reference queries against an embedded SQLite database."""
+
+    def __init__(self, connection: sqlite3.Connection, template_dir: str = TEMPLATE_DIR):
+        """Create a new accessor around a database built by build_database.
+
+        Args:
+            connection: Connection to the database holding the articles, output_frame, taxonomy,
+                and article_totals tables. The aggregate functions used by the approximate mode are
+                registered on it.
+            template_dir: Directory holding the reference queries. Defaults to TEMPLATE_DIR.
+        """
+        self._connection = connection
+        self._templates = load_templates(template_dir)
+        self._connection.create_aggregate('approx_count_distinct', 1, HyperLogLogAggregate)
+        self._connection.create_aggregate(
+            'approx_top_tokens',
+            3,
+            SpaceSavingAggregate  # type: ignore
+        )
+
+    def execute_query(self, query: data_util.Query) -> data_util.Result:
+        return self._execute(query, None)[0]
+
+    def execute_approximate(self, query: data_util.Query,
+        capacity: int = approx_util.DEFAULT_CAPACITY) -> typing.Tuple[data_util.Result, ERRORS]:
+        """Execute a query estimating counts in bounded memory.
+
+        Distinct URL counts (totals, countries, and months) use HyperLogLog. Category, tag, and
+        keyword counts use Space-Saving over matching rows such that only the (up to) capacity most
+        common tokens of each type are reported.
+
+        Args:
+            query: The query to execute.
+            capacity: The maximum number of tokens to track per token type.
+
+        Returns:
+            Tuple of the estimated result and the bound on the absolute error of any count in each
+            output (total, group, countries, country_totals, categories, tags, keywords, buckets,
+            bucket_totals). Tokens missing from the result have counts within the error bound of
+            zero. Distinct count bounds are at approx_util.ERROR_SIGMAS standard errors.
+        """
+        result, errors = self._execute(query, capacity)
+
+        sketch = approx_util.HyperLogLog()
+        relative_error = sketch.get_relative_error() * approx_util.ERROR_SIGMAS
+
+        def get_distinct_error(counts: typing.Iterable[int]) -> float:
+            # Estimates are rounded so allow an extra half count.
+            return max(map(lambda x: (x + 0.5) * relative_error + 0.5, counts), default=0)
+
+        def get_counts(groups: data_util.COUNTED_GROUPS) -> typing.Iterable[int]:
+            return map(lambda x: x.get_count(), groups)
+
+        errors['total'] = get_distinct_error([result.get_total_count()])
+        errors['group'] = get_distinct_error([result.get_group_count()])
+        errors['countries'] = get_distinct_error(get_counts(result.get_countries()))
+        errors['country_totals'] = get_distinct_error(get_counts(result.get_country_totals()))
+        errors['buckets'] = get_distinct_error(get_counts(result.get_buckets()))
+        errors['bucket_totals'] = get_distinct_error(get_counts(result.get_bucket_totals()))
+        return (result, errors)
+
+    def _execute(self, query: data_util.Query,
+        capacity: typing.Optional[int]) -> typing.Tuple[data_util.Result, ERRORS]:
+        approximate = capacity is not None
+
+        def prepare(sql: str) -> str:
+            if approximate:
+                return sql.replace(EXACT_DISTINCT_SQL, APPROXIMATE_DISTINCT_SQL)
+            else:
+                return sql
+
+        def run_template(name: str, target_frame: str, where_clauses: typing.List[str],
+            params: typing.List[typing.Optional[str]]) -> typing.List[typing.Tuple]:
+            sql = fill_template(self._templates[name], target_frame, where_clauses)
+            params_all: typing.List = list(params)
+            if LIMIT_PATTERN.search(self._templates[name]) is not None:
+                params_all.append(NO_LIMIT)
+
+            return self._connection.execute(prepare(sql), params_all).fetchall()
+
+        self._create_match_table(query)
+
+        range_clause, range_params = self._get_range_clause(query)
+        by_country = self._make_counted_groups(self._connection.execute(
+            COUNTRY_TOTALS_SQL % range_clause,
+            range_params
+        ))
+        bucket_totals = self._make_bucket_groups(self._connection.execute(
+            BUCKET_TOTALS_SQL % range_clause,
+            range_params
+        ))
+
+        # Aggregate functions defined in Python give NULL rather than zero if there are no rows.
+        def get_count(where_clause: str) -> int:
+            count = run_template('total', MATCH_URL_FRAME, [where_clause], [])[0][0]
+            return 0 if count is None else count
+
+        total_count = get_count(ALL_WHERE_SQL)
+        group_count = get_count(IN_GROUP_WHERE_SQL)
+        countries = self._make_counted_groups(
+            run_template('countries', MATCH_URL_FRAME, [IN_GROUP_WHERE_SQL], [])
+        )
+        buckets = self._make_bucket_groups(self._connection.execute(prepare(BUCKET_COUNTS_SQL)))
+
+        category = query.get_category() if query.has_category() else None
+        errors: ERRORS = {}
+        token_rows: typing.Dict[str, typing.List[typing.Tuple]] = {}
+        if capacity is None:
+            token_rows['category'] = run_template(
+                'categories',
+                TOKEN_FRAME,
+                [MATCH_URL_WHERE_SQL],
+                []
+            )
+            for token_type, name in [('tag', 'tags'), ('keyword', 'keywords')]:
+                token_rows[token_type] = run_template(
+                    name,
+                    TOKEN_FRAME,
+                    [MATCH_URL_WHERE_SQL, GROUP_CATEGORY_WHERE_SQL],
+                    [category, category]
+                )
+        else:
+            summary_str = self._connection.execute(
+                APPROXIMATE_TOKEN_COUNTS_SQL,
+                (capacity, category, category)
+            ).fetchone()[0]
+            summary = {} if summary_str is None else json.loads(summary_str)
+            for token_type, output in TOKEN_OUTPUTS.items():
+                type_summary = summary.get(token_type, {'rows': [], 'error': 0})
+                token_rows[token_type] = type_summary['rows']
+                errors[output] = type_summary['error']
+
+        def get_token_counts(token_type: str) -> data_util.COUNTED_GROUPS:
+            return self._make_counted_groups(token_rows[token_type])
+
+        result = data_util.Result(
+            total_count,
+            group_count,
+            get_token_counts('category'),
+            countries,
+            by_country,
+            get_token_counts('tag'),
+            get_token_counts('keyword'),
+            query.get_has_filters(),
+            buckets,
+            bucket_totals
+        )
+        return (result, errors)
+
+    def _get_range_clause(self, query: data_util.Query) -> typing.Tuple[str, typing.List[str]]:
+        clauses = ['1 = 1']
+        params = []
+
+        start = query.get_start()
+        if start is not None:
+            clauses.append('month >= ?')
+            params.append(start)
+
+        end = query.get_end()
+        if end is not None:
+            clauses.append('month <= ?')
+            params.append(end)
+
+        return (' AND '.join(clauses), params)
+
+    def _create_match_table(self, query: data_util.Query):
+        range_clause, range_params = self._get_range_clause(query)
+        clauses = [range_clause]
+        params: typing.List[typing.Optional[str]] = list(range_params)
+
+        def make_placeholders(values: typing.FrozenSet[str]) -> str:
+            return ', '.join(map(lambda x: '?', values))
+
+        if query.has_country():
+            countries = query.get_countries()
+            clauses.append('country IN (%s)' % make_placeholders(countries))
+            params += sorted(countries)
+
+        for token_type, tokens in [
+            ('category', query.get_pre_categories()),
+            ('tag', query.get_tags()),
+            ('keyword', query.get_keywords())
+        ]:
+            if len(tokens) > 0:
+                clauses.append(HAS_ANY_TOKEN_SQL % make_placeholders(tokens))
+                params += [token_type] + sorted(tokens)
+
+        if query.has_category():
+            in_group = 'CASE WHEN %s THEN 1 ELSE 0 END' % HAS_TOKEN_SQL
+            in_group_params: typing.List[typing.Optional[str]] = ['category', query.get_category()]
+        else:
+            in_group = '1'
+            in_group_params = []
+
+        self._connection.execute('DROP TABLE IF EXISTS temp.match_url')
+        self._connection.execute(
+            'CREATE TEMP TABLE match_url AS SELECT url, country, month, %s AS in_group '
+            'FROM articles WHERE %s' % (in_group, ' AND '.join(clauses)),
+            in_group_params + params
+        )
+
+    def _make_counted_groups(self, rows: typing.Iterable) -> data_util.COUNTED_GROUPS:
+        objs = map(lambda x: data_util.CountedGroup(x[0], x[1]), rows)
+        return sorted(objs, key=lambda x: x.get_count(), reverse=True)
+
+    def _make_bucket_groups(self, rows: typing.Iterable) -> data_util.COUNTED_GROUPS:
+        objs = map(lambda x: data_util.CountedGroup(x[0], x[1]), rows)
+        return sorted(objs, key=lambda x: x.get_name())
+
+
+def build_database(articles_path: str, serialized_lines: typing.Iterable[str],
+    path: str = ':memory:') -> sqlite3.Connection:
+    """Build the embedded database from the article table.
+
+    Args:
+        articles_path: Path to the article table.
+        serialized_lines: Lines of the compressed format from which the taxonomy (which category
+            each tag and keyword belongs to) is read.
+        path: Path at which to write the database or :memory: to keep it in memory.
+
+    Returns:
+        Connection to the new database.
+    """
+    connection = sqlite3.connect(path)
+    for statement in SCHEMA:
+        connection.execute(statement)
+
+    def get_token_rows(url: str, parsed: typing.Tuple) -> typing.Iterable[typing.Tuple]:
+        country, categories, tags, keywords, published = parsed
+        for token_type, tokens in [('category', categories), ('tag', tags), ('keyword', keywords)]:
+            for token in sorted(set(tokens)):
+                yield (url, country, token, token_type)
+
+    with open(articles_path) as f:
+        for line in f:
+            parsed = serialized_gen.parse_article_line(line)
+            if parsed is None:
+                continue
+
+            url = line.split('\t', 1)[0]
+            month = data_util.get_bucket(parsed[4])
+            connection.execute('INSERT INTO articles VALUES (?, ?, ?)', (url, parsed[0], month))
+            connection.executemany(
+                'INSERT INTO output_frame VALUES (?, ?, ?, ?)',
+                get_token_rows(url, parsed)
+            )
+
+    connection.executemany(
+        'INSERT OR REPLACE INTO taxonomy VALUES (?, ?, ?)',
+        get_taxonomy_rows(serialized_lines)
+    )
+    connection.execute(ARTICLE_TOTALS_SQL)
+    connection.commit()
+
+    # Statistics let the planner look up tokens by URL for matching articles instead of by type.
+    connection.execute('ANALYZE')
+
+    return connection
+
+
+def get_taxonomy_rows(serialized_lines: typing.Iterable[str]) -> typing.Iterable[typing.Tuple]:
+    """Get the category of each tag and keyword from the compressed format.
+
+    Args:
+        serialized_lines: Lines of the compressed format.
+
+    Returns:
+        Iterable over tuples of token, token type (tag or keyword), and category name. Later
+        definitions of the same token take precedence as in CompressedDataAccessor.
+    """
+    categories = {}
+    tag_categories = {}
+
+    for line in serialized_lines:
+        pieces = line.split(' ')
+        command = pieces[0]
+        if command == 'c':
+            categories[pieces[1]] = ' '.join(pieces[2:])[1:-1]
+        elif command == 't':
+            tag_categories[pieces[2]] = categories[pieces[1]]
+            yield (' '.join(pieces[3:])[1:-1], 'tag', categories[pieces[1]])
+        elif command == 'k':
+            yield (' '.join(pieces[4:])[1:-1], 'keyword', tag_categories[pieces[2]])
+
+
+def load_templates(template_dir: str = TEMPLATE_DIR) -> typing.Dict[str, str]:
+    """Load the reference queries.
+
+    Args:
+        template_dir: Directory holding the reference queries. Defaults to TEMPLATE_DIR.
+
+    Returns:
+        Mapping from name (like tags) to the unfilled SQL of that reference query.
+    """
+    def load(name: str) -> str:
+        with open(os.path.join(template_dir, name + '.sql')) as f:
+            return f.read()
+
+    return dict(map(lambda x: (x, load(x)), TEMPLATE_NAMES))
+
+
+def fill_template(template: str, target_frame: str, where_clauses: typing.List[str]) -> str:
+    """Fill in a reference query such that it may be run with parameters bound.
+
+    Args:
+        template: The unfilled SQL of the reference query.
+        target_frame: The table (with alias target_frame) to use for TARGET_FRAME.
+        where_clauses: The clause to use for each occurrence of WHERE_CLAUSE in order. These may
+            hold placeholders whose parameters are bound in the same order.
+
+    Returns:
+        SQL where any LIMIT is replaced by a placeholder whose parameter should be bound last. Bind
+        NO_LIMIT to get all groups.
+    """
+    pieces = template.split(WHERE_CLAUSE_PLACEHOLDER)
+    if len(pieces) != len(where_clauses) + 1:
+        raise RuntimeError('Expected %d where clauses.' % (len(pieces) - 1))
+
+    filled = pieces[0] + ''.join(map(lambda x: x[0] + x[1], zip(where_clauses, pieces[1:])))
+    filled = filled.replace(TARGET_FRAME_PLACEHOLDER, target_frame)
+    return LIMIT_PATTERN.sub('LIMIT ?', filled)
+
+
+def get_mismatches(expected: data_util.DataAccessor, actual: data_util.DataAccessor,
+    queries: typing.Iterable[data_util.Query]) -> typing.List[str]:
+    """Compare the results of two accessors.
+
+    Args:
+        expected: The accessor treated as correct like CompressedDataAccessor.
+        actual: The accessor being checked like SqlDataAccessor.
+        queries: The queries to run against both.
+
+    Returns:
+        Descriptions of each query and output which differ. Empty if the accessors agree.
+    """
+    mismatches = []
+    for query in queries:
+        expected_result = expected.execute_query(query)
+        actual_result = actual.execute_query(query)
+
+        for name, getter in get_outputs().items():
+            if getter(expected_result) != getter(actual_result):
+                mismatches.append('%s: %s' % (query.get_id_str(), name))
+
+    return mismatches
+
+
+def get_bound_violations(expected: data_util.DataAccessor, actual: SqlDataAccessor,
+    queries: typing.Iterable[data_util.Query],
+    capacity: int = approx_util.DEFAULT_CAPACITY) -> typing.List[str]:
+    """Check that approximate results fall within their error bounds of exact results.
+
+    Args:
+        expected: The accessor treated as correct like CompressedDataAccessor.
+        actual: The SQL accessor whose approximate mode is being checked.
+        queries: The queries to run against both.
+        capacity: The maximum number of tokens to track per token type in the approximate mode.
+
+    Returns:
+        Descriptions of each query and output with a count further from the exact count than its
+        reported bound. Empty if all estimates are within bounds.
+    """
+    violations = []
+    for query in queries:
+        expected_result = expected.execute_query(query)
+        actual_result, errors = actual.execute_approximate(query, capacity)
+
+        for name, getter in get_outputs().items():
+            expected_counts = getter(expected_result)
+            actual_counts = getter(actual_result)
+            if not isinstance(expected_counts, dict):
+                expected_counts = {'': expected_counts}
+                actual_counts = {'': actual_counts}
+
+            names = set(expected_counts.keys()) | set(actual_counts.keys())
+            differences = map(
+                lambda x: abs(expected_counts.get(x, 0) - actual_counts.get(x, 0)),
+                names
+            )
+            if max(differences, default=0) > errors[name]:
+                violations.append('%s: %s' % (query.get_id_str(), name))
+
+    return violations
+
+
+def get_outputs() -> typing.Dict[str, typing.Callable[[data_util.Result], typing.Any]]:
+    """Get the outputs of a result compared between accessors.
+
+    Returns:
+        Mapping from output name to a function getting either a count or a mapping from group name
+        to count from a result.
+    """
+    def to_dict(groups: data_util.COUNTED_GROUPS) -> typing.Dict[str, int]:
+        return dict(map(lambda x: (x.get_name(), x.get_count()), groups))
+
+    return {
+        'total': lambda x: x.get_total_count(),
+        'group': lambda x: x.get_group_count(),
+        'countries': lambda x: to_dict(x.get_countries()),
+        'country_totals': lambda x: to_dict(x.get_country_totals()),
+        'categories': lambda x: to_dict(x.get_categories()),
+        'tags': lambda x: to_dict(x.get_tags()),
+        'keywords': lambda x: to_dict(x.get_keywords()),
+        'buckets': lambda x: to_dict(x.get_buckets()),
+        'bucket_totals': lambda x: to_dict(x.get_bucket_totals())
+    }
+
+
+def main():
+    """Entry point for checking the SQL runner against the compressed format."""
+    articles_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ARTICLES_PATH
+    serialized_path = sys.argv[2] if len(sys.argv) > 2 else None
+    approximate = len(sys.argv) > 3 and sys.argv[3] == 'approximate'
+
+    if serialized_path is None:
+        serialized_lines = serialized_gen.build(articles_path, None)
+    else:
+        with open(serialized_path) as f:
+            serialized_lines = f.read().split('\n')
+
+    compressed_accessor = data_util.CompressedDataAccessor(serialized_lines)
+    sql_accessor = SqlDataAccessor(build_database(articles_path, serialized_lines))
+
+    tasks = static_stat_gen.get_filter_tasks(compressed_accessor)
+    params = [
+        {} if name == static_stat_gen.NO_FILTER else {name: value}
+        for name, value in tasks
+    ]
+    params_in_range = [dict(x, **CHECK_RANGE) for x in params]
+    queries = [accessor_stat_gen.make_query(x) for x in params + params_in_range]
+
+    if approximate:
+        violations = get_bound_violations(compressed_accessor, sql_accessor, queries)
+        for violation in violations:
+            print(violation)
+
+        print('Checked %d queries with %d out of bounds' % (len(queries), len(violations)))
+    else:
+        mismatches = get_mismatches(compressed_accessor, sql_accessor, queries)
+        for mismatch in mismatches:
+            print(mismatch)
+
+        print('Checked %d queries with %d mismatches' % (len(queries), len(mismatches)))
+
+
+if __name__ == '__main__':
+    main()
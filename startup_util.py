@@ -0,0 +1,150 @@
+"""Utilities to read and parse startup assets concurrently.
+
+Utilities which run the functions that read and parse each startup asset (like the compressed
+article file and the geojson) at the same time such that cold start takes about as long as the
+slowest asset rather than the sum of all of them. Uses a thread pool where threads are available.
+In the browser, where threads are not supported, assets run one after another but those listed in
+the py-config files are already fetched concurrently by pyscript before Python starts.
+
+Deployed assets may have content-hashed names (see deploy_bundle) in which case a manifest maps each
+path used by the code (like txt/serialized.txt) to the name from which it should be fetched.
+
+License: BSD
+"""
+
+import concurrent.futures
+import os
+import sys
+import time
+import typing
+
+import sketchingpy.data_struct
+
+MANIFEST_PATH = 'manifest.json'
+
+RESOLVER = typing.Callable[[str], str]
+
+threads_available = sys.platform != 'emscripten'
+
+
+class Manifest:
+    """Mapping from paths of assets used by the code to the paths from which they are fetched."""
+
+    def __init__(self, entries: typing.Dict[str, str]):
+        """Create a new manifest.
+
+        Args:
+            entries: Mapping from path used by the code to deployed path like
+                txt/serialized.txt to txt/serialized.0123456789abcdef0123.txt.
+        """
+        self._entries = entries
+
+    def resolve(self, path: str) -> str:
+        """Get the path from which an asset should be fetched.
+
+        Args:
+            path: The path used by the code.
+
+        Returns:
+            The deployed path or the given path if the asset is not in the manifest.
+        """
+        return self._entries.get(path, path)
+
+
+def load_manifest(data_layer: sketchingpy.data_struct.DataLayer) -> Manifest:
+    """Load the manifest written by the deploy bundler if available.
+
+    Args:
+        data_layer: The data layer through which the manifest is read.
+
+    Returns:
+        The manifest or an empty manifest, which leaves paths unchanged, if not deployed.
+    """
+    try:
+        entries = data_layer.get_json(MANIFEST_PATH)
+    except:
+        return Manifest({})
+
+    return Manifest(entries)
+
+
+def read_text(data_layer: sketchingpy.data_struct.DataLayer, path: str,
+    resolve: typing.Optional[RESOLVER] = None) -> str:
+    """Read a text asset, preferring a copy already on the local file system.
+
+    Args:
+        data_layer: The data layer through which the asset is read if not on the file system.
+        path: The path to the asset.
+        resolve: Function which maps the path to the path from which it should be fetched if not on
+            the file system (like Manifest.resolve) or None to fetch the path as given. Defaults to
+            None.
+
+    Returns:
+        The contents of the asset. In the browser, files listed in the py-config are on the file
+        system such that they are not fetched again.
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            return f.read()
+
+    return data_layer.get_text(path if resolve is None else resolve(path))
+
+
+class AssetLoader:
+    """Loader which runs named functions that read and parse assets, concurrently if possible."""
+
+    def __init__(self, tasks: typing.Dict[str, typing.Callable[[], typing.Any]]):
+        """Create a new loader without starting it.
+
+        Args:
+            tasks: Mapping from name of asset to function which loads it. Functions run on other
+                threads if available and must not use the sketch.
+        """
+        self._tasks = tasks
+        self._futures: typing.Dict[str, concurrent.futures.Future] = {}
+        self._timings: typing.Dict[str, float] = {}
+
+    def start(self):
+        """Start loading all assets, returning immediately if threads are available."""
+        def run(name: str) -> typing.Any:
+            start = time.perf_counter()
+            value = self._tasks[name]()
+            self._timings[name] = time.perf_counter() - start
+            return value
+
+        if threads_available:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(self._tasks))
+            for name in self._tasks:
+                self._futures[name] = executor.submit(run, name)
+            executor.shutdown(wait=False)
+        else:
+            for name in self._tasks:
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                try:
+                    future.set_result(run(name))
+                except Exception as e:
+                    future.set_exception(e)
+                self._futures[name] = future
+
+    def get(self, name: str) -> typing.Any:
+        """Get a loaded asset, waiting for it to finish loading if needed.
+
+        Args:
+            name: The name of the asset.
+
+        Returns:
+            The value returned by the function which loads the asset. Raises any exception raised
+            while loading it.
+        """
+        if name not in self._futures:
+            raise RuntimeError('Asset not started: %s' % name)
+
+        return self._futures[name].result()
+
+    def get_timings(self) -> typing.Dict[str, float]:
+        """Get how long each asset took to load.
+
+        Returns:
+            Mapping from name of asset to seconds spent loading it for assets finished so far.
+        """
+        return dict(self._timings)
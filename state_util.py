@@ -1,5 +1,12 @@
 """Structure to represent global visualization state.
 
+Structure to represent global visualization state where each filter may have multiple selected
+values. Articles matching any selected value in a dimension are included for that dimension.
+
+Movements depend only on the selected values so the state offers immutable, versioned snapshots of
+them. Each movement subscribes to the state and, when shown, refreshes only if the snapshot changed
+since it last took one. Hidden movements therefore do no work while the user changes filters.
+
 License: BSD
 """
 
@@ -7,52 +14,160 @@ import typing
 
 import data_util
 
+FILTERS = typing.Tuple[
+    typing.FrozenSet[str],
+    typing.FrozenSet[str],
+    typing.FrozenSet[str],
+    typing.FrozenSet[str]
+]
+
+
+class QuerySnapshot:
+    """Immutable record of the selected values of a state at a version."""
+
+    def __init__(self, version: int, filters: FILTERS):
+        """Create a new snapshot.
+
+        Args:
+            version: Number which increases each time the selected values of the state change.
+            filters: The selected categories, countries, tags, and keywords in that order.
+        """
+        self._version = version
+        self._filters = filters
+
+    def get_version(self) -> int:
+        """Get the version of the state at which this snapshot was taken.
+
+        Returns:
+            Version which differs between snapshots with different selected values.
+        """
+        return self._version
+
+    def get_filters(self) -> FILTERS:
+        """Get the selected values captured in this snapshot.
+
+        Returns:
+            The selected categories, countries, tags, and keywords in that order.
+        """
+        return self._filters
+
+    def get_query(self, category: typing.Optional[str] = None) -> data_util.Query:
+        """Create a query with the filters captured in this snapshot.
+
+        Args:
+            category: The second category on which to filter or None if no second category filter
+                should be applied. Defaults to None.
+
+        Returns:
+            Newly created Query.
+        """
+        categories, countries, tags, keywords = self._filters
+        return data_util.Query(category, categories, countries, tags, keywords)
+
+
+class Subscription:
+    """Subscriber to the snapshots of a state which reports changes since it last took one."""
+
+    def __init__(self, state: 'VizState'):
+        """Create a new subscription which has not yet taken a snapshot.
+
+        Args:
+            state: The state whose selected values are followed.
+        """
+        self._state = state
+        self._version: typing.Optional[int] = None
+
+    def get_is_stale(self) -> bool:
+        """Determine if the selected values changed since the last snapshot taken.
+
+        Returns:
+            True if a snapshot has not been taken since the selected values last changed or since
+            reset and False otherwise.
+        """
+        return self._version != self._state.get_snapshot().get_version()
+
+    def take(self) -> typing.Optional[QuerySnapshot]:
+        """Take the current snapshot if the selected values changed since the last one taken.
+
+        Returns:
+            The current snapshot if stale or None if the subscriber is already up to date.
+        """
+        snapshot = self._state.get_snapshot()
+        if snapshot.get_version() == self._version:
+            return None
+
+        self._version = snapshot.get_version()
+        return snapshot
+
+    def reset(self):
+        """Treat the subscriber as stale like after the underlying data changed."""
+        self._version = None
+
 
 class VizState:
     """Global visualization state object tracking selected and hovering values."""
 
     def __init__(self):
         """Create a new state with nothing hovering or selected."""
-        self._category_selected = None
+        self._category_selected = frozenset()
         self._category_hovering = None
-        self._country_selected = None
+        self._country_selected = frozenset()
         self._country_hovering = None
-        self._tag_selected = None
+        self._tag_selected = frozenset()
         self._tag_hovering = None
-        self._keyword_selected = None
+        self._keyword_selected = frozenset()
         self._keyword_hovering = None
         self._invalidation_id = 1
+        self._snapshot = QuerySnapshot(1, self._get_filters())
 
-    def set_category_selected(self, new_val: str):
-        """Set the filter value for category.
+    def set_category_selected(self, new_val: typing.Optional[str]):
+        """Set the filter value(s) for category.
 
         Args:
-            new_val: The value for which to filter.
+            new_val: The value for which to filter, multiple values joined by
+                data_util.VALUE_SEPARATOR, or None to clear the filter.
         """
-        self._category_selected = new_val
+        self._category_selected = data_util.make_values(new_val)
 
     def toggle_category_selected(self, new_val: str):
-        """Set the filter value for category or, if new val equals current, it will be set to None.
+        """Set the filter value for category or, if new val is the only value selected, clear it.
 
         Args:
             new_val: The value for which to filter.
         """
-        if self._category_selected == new_val:
-            self._category_selected = None
+        if self._category_selected == frozenset([new_val]):
+            self._category_selected = frozenset()
         else:
-            self._category_selected = new_val
+            self._category_selected = frozenset([new_val])
+
+    def toggle_category_included(self, new_val: str):
+        """Add a value to the category filter or, if already included, remove it.
+
+        Args:
+            new_val: The value to add to or remove from the values for which to filter.
+        """
+        self._category_selected = self._category_selected ^ frozenset([new_val])
 
     def get_category_selected(self) -> typing.Optional[str]:
         """Get the value of the current category filter.
 
         Returns:
-            The category value for which the viz should filter or None if no filter is applied.
+            The category value for which the viz should filter (multiple values joined by
+            data_util.VALUE_SEPARATOR) or None if no filter is applied.
+        """
+        return data_util.join_values(self._category_selected)
+
+    def get_categories_selected(self) -> typing.FrozenSet[str]:
+        """Get the individual values of the current category filter.
+
+        Returns:
+            The categories for which the viz should filter which is empty if no filter is applied.
         """
         return self._category_selected
 
     def clear_category_selected(self):
         """Clear the category filter so that all categories are included in results."""
-        self._category_selected = None
+        self._category_selected = frozenset()
 
     def set_category_hovering(self, new_val: str):
         """Indicate which category over which the cursor is hovering.
@@ -74,36 +189,54 @@ class VizState:
         """Indicate that the cursor it not hovering over any category."""
         self._category_hovering = None
 
-    def set_country_selected(self, new_val: str):
-        """Set the filter value for coountry.
+    def set_country_selected(self, new_val: typing.Optional[str]):
+        """Set the filter value(s) for country.
 
         Args:
-            new_val: The value for which to filter.
+            new_val: The value for which to filter, multiple values joined by
+                data_util.VALUE_SEPARATOR, or None to clear the filter.
         """
-        self._country_selected = new_val
+        self._country_selected = data_util.make_values(new_val)
 
     def toggle_country_selected(self, new_val: str):
-        """Set the filter value for country or, if new val equals current, it will be set to None.
+        """Set the filter value for country or, if new val is the only value selected, clear it.
 
         Args:
             new_val: The value for which to filter.
         """
-        if self._country_selected == new_val:
-            self._country_selected = None
+        if self._country_selected == frozenset([new_val]):
+            self._country_selected = frozenset()
         else:
-            self._country_selected = new_val
+            self._country_selected = frozenset([new_val])
+
+    def toggle_country_included(self, new_val: str):
+        """Add a value to the country filter or, if already included, remove it.
+
+        Args:
+            new_val: The value to add to or remove from the values for which to filter.
+        """
+        self._country_selected = self._country_selected ^ frozenset([new_val])
 
     def get_country_selected(self) -> typing.Optional[str]:
         """Get the value of the current country filter.
 
         Returns:
-            The country value for which the viz should filter or None if no filter is applied.
+            The country value for which the viz should filter (multiple values joined by
+            data_util.VALUE_SEPARATOR) or None if no filter is applied.
+        """
+        return data_util.join_values(self._country_selected)
+
+    def get_countries_selected(self) -> typing.FrozenSet[str]:
+        """Get the individual values of the current country filter.
+
+        Returns:
+            The countries for which the viz should filter which is empty if no filter is applied.
         """
         return self._country_selected
 
     def clear_country_selected(self):
         """Clear the country filter so that all countries are included in results."""
-        self._country_selected = None
+        self._country_selected = frozenset()
 
     def set_country_hovering(self, new_val: str):
         """Indicate which country over which the cursor is hovering.
@@ -125,36 +258,54 @@ class VizState:
         """Indicate that the cursor it not hovering over any country."""
         self._country_hovering = None
 
-    def set_tag_selected(self, new_val: str):
-        """Set the filter value for tag.
+    def set_tag_selected(self, new_val: typing.Optional[str]):
+        """Set the filter value(s) for tag.
 
         Args:
-            new_val: The value for which to filter.
+            new_val: The value for which to filter, multiple values joined by
+                data_util.VALUE_SEPARATOR, or None to clear the filter.
         """
-        self._tag_selected = new_val
+        self._tag_selected = data_util.make_values(new_val)
 
     def toggle_tag_selected(self, new_val: str):
-        """Set the filter value for tag or, if new val equals current, it will be set to None.
+        """Set the filter value for tag or, if new val is the only value selected, clear it.
 
         Args:
             new_val: The value for which to filter.
         """
-        if self._tag_selected == new_val:
-            self._tag_selected = None
+        if self._tag_selected == frozenset([new_val]):
+            self._tag_selected = frozenset()
         else:
-            self._tag_selected = new_val
+            self._tag_selected = frozenset([new_val])
+
+    def toggle_tag_included(self, new_val: str):
+        """Add a value to the tag filter or, if already included, remove it.
+
+        Args:
+            new_val: The value to add to or remove from the values for which to filter.
+        """
+        self._tag_selected = self._tag_selected ^ frozenset([new_val])
 
     def get_tag_selected(self) -> typing.Optional[str]:
         """Get the value of the current tag filter.
 
         Returns:
-            The tag value for which the viz should filter or None if no filter is applied.
+            The tag value for which the viz should filter (multiple values joined by
+            data_util.VALUE_SEPARATOR) or None if no filter is applied.
+        """
+        return data_util.join_values(self._tag_selected)
+
+    def get_tags_selected(self) -> typing.FrozenSet[str]:
+        """Get the individual values of the current tag filter.
+
+        Returns:
+            The tags for which the viz should filter which is empty if no filter is applied.
         """
         return self._tag_selected
 
     def clear_tag_selected(self):
         """Clear the tag filter so that all tags are included in results."""
-        self._tag_selected = None
+        self._tag_selected = frozenset()
 
     def set_tag_hovering(self, new_val: str):
         """Indicate which tag over which the cursor is hovering.
@@ -176,36 +327,54 @@ class VizState:
         """Indicate that the cursor it not hovering over any tag."""
         self._tag_hovering = None
 
-    def set_keyword_selected(self, new_val: str):
-        """Set the filter value for keyword.
+    def set_keyword_selected(self, new_val: typing.Optional[str]):
+        """Set the filter value(s) for keyword.
 
         Args:
-            new_val: The value for which to filter.
+            new_val: The value for which to filter, multiple values joined by
+                data_util.VALUE_SEPARATOR, or None to clear the filter.
         """
-        self._keyword_selected = new_val
+        self._keyword_selected = data_util.make_values(new_val)
 
     def toggle_keyword_selected(self, new_val: str):
-        """Set the filter value for keyword or, if new val equals current, it will be set to None.
+        """Set the filter value for keyword or, if new val is the only value selected, clear it.
 
         Args:
             new_val: The value for which to filter.
         """
-        if self._keyword_selected == new_val:
-            self._keyword_selected = None
+        if self._keyword_selected == frozenset([new_val]):
+            self._keyword_selected = frozenset()
         else:
-            self._keyword_selected = new_val
+            self._keyword_selected = frozenset([new_val])
+
+    def toggle_keyword_included(self, new_val: str):
+        """Add a value to the keyword filter or, if already included, remove it.
+
+        Args:
+            new_val: The value to add to or remove from the values for which to filter.
+        """
+        self._keyword_selected = self._keyword_selected ^ frozenset([new_val])
 
     def get_keyword_selected(self) -> typing.Optional[str]:
         """Get the value of the current keyword filter.
 
         Returns:
-            The keyword value for which the viz should filter or None if no filter is applied.
+            The keyword value for which the viz should filter (multiple values joined by
+            data_util.VALUE_SEPARATOR) or None if no filter is applied.
+        """
+        return data_util.join_values(self._keyword_selected)
+
+    def get_keywords_selected(self) -> typing.FrozenSet[str]:
+        """Get the individual values of the current keyword filter.
+
+        Returns:
+            The keywords for which the viz should filter which is empty if no filter is applied.
         """
         return self._keyword_selected
 
     def clear_keyword_selected(self):
         """Clear the keyword filter so that all keywords are included in results."""
-        self._keyword_selected = None
+        self._keyword_selected = frozenset()
 
     def set_keyword_hovering(self, new_val: str):
         """Indicate which keyword over which the cursor is hovering.
@@ -231,6 +400,40 @@ class VizState:
         """Increment the validation ID such taht the serialization is different."""
         self._invalidation_id += 1
 
+    def get_snapshot(self) -> QuerySnapshot:
+        """Get an immutable snapshot of the values currently selected.
+
+        Returns:
+            Snapshot which is the same object until the selected values change at which point a
+            snapshot with a higher version is returned. Hovering does not change the snapshot.
+        """
+        filters = self._get_filters()
+        if filters != self._snapshot.get_filters():
+            self._snapshot = QuerySnapshot(self._snapshot.get_version() + 1, filters)
+
+        return self._snapshot
+
+    def restore(self, filters: FILTERS):
+        """Select the values of a prior snapshot like when going back in history.
+
+        Args:
+            filters: The selected categories, countries, tags, and keywords in that order as given
+                by QuerySnapshot.get_filters.
+        """
+        categories, countries, tags, keywords = filters
+        self._category_selected = categories
+        self._country_selected = countries
+        self._tag_selected = tags
+        self._keyword_selected = keywords
+
+    def subscribe(self) -> Subscription:
+        """Start following changes to the values selected.
+
+        Returns:
+            New subscription which is stale until its first snapshot is taken.
+        """
+        return Subscription(self)
+
     def get_query(self, category: typing.Optional[str] = None) -> data_util.Query:
         """Create a query with the same filters as those currently active in this state.
 
@@ -241,13 +444,7 @@ class VizState:
         Returns:
             Newly created Query.
         """
-        return data_util.Query(
-            category,
-            self._category_selected,
-            self._country_selected,
-            self._tag_selected,
-            self._keyword_selected
-        )
+        return self.get_snapshot().get_query(category)
 
     def serialize(self) -> str:
         """Create a string identifying this state.
@@ -259,14 +456,22 @@ class VizState:
             invalidation counts are not treated as the same state.
         """
         pieces = [
-            self._category_selected,
+            self.get_category_selected(),
             self._category_hovering,
-            self._country_selected,
+            self.get_country_selected(),
             self._country_hovering,
-            self._tag_selected,
+            self.get_tag_selected(),
             self._tag_hovering,
-            self._keyword_selected,
+            self.get_keyword_selected(),
             self._keyword_hovering,
             str(self._invalidation_id)
         ]
         return '\t'.join(map(lambda x: str(x), pieces))
+
+    def _get_filters(self) -> FILTERS:
+        return (
+            self._category_selected,
+            self._country_selected,
+            self._tag_selected,
+            self._keyword_selected
+        )
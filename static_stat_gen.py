@@ -0,0 +1,165 @@
+"""Deploy-time generation of static statistics files for the express version.
+
+Deploy-time generation of the same {name, percent} CSV files returned by the statistics lambda
+for every dimension crossed with every single filter value (and no filter at all). Files are
+written under content-addressed names so that they may be cached indefinitely by a static host or
+CDN alongside an index which maps queries to files. The express version only needs the lambda for
+queries with multiple filters. If used from the command line, takes an optional output directory
+and an optional number of workers.
+
+License: BSD
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import typing
+
+import accessor_stat_gen
+import article_stat_gen
+import data_util
+
+DEFAULT_OUTPUT_DIR = 'stats'
+INDEX_FILENAME = 'index.json'
+DIMENSIONS = ['country', 'category', 'tag', 'keyword']
+NO_FILTER = 'all'
+
+FILTER_TASK = typing.Tuple[str, str]
+INDEX = typing.Dict[str, typing.Dict[str, typing.Dict[str, str]]]
+
+_worker_generator: typing.Optional[accessor_stat_gen.AccessorStatGenerator] = None
+
+
+def load_accessor() -> data_util.CompressedDataAccessor:
+    """Load the accessor from the serialized dataset.
+
+    Returns:
+        Accessor around txt/serialized.txt.
+    """
+    with open(os.path.join('txt', 'serialized.txt')) as f:
+        return data_util.CompressedDataAccessor(f.read().split('\n'))
+
+
+def get_filter_tasks(accessor: data_util.DataAccessor) -> typing.List[FILTER_TASK]:
+    """Get all single filters for which statistics should be generated.
+
+    Args:
+        accessor: The accessor from which all values of each dimension are found.
+
+    Returns:
+        List of tuples of filter name and value including (all, all) for no filter.
+    """
+    all_results = accessor.execute_query(data_util.Query(None, None, None, None, None))
+    values_by_dimension = {
+        'country': all_results.get_countries(),
+        'category': all_results.get_categories(),
+        'tag': all_results.get_tags(),
+        'keyword': all_results.get_keywords()
+    }
+
+    tasks = [(NO_FILTER, NO_FILTER)]
+    for dimension in DIMENSIONS:
+        values = sorted(map(lambda x: x.get_name(), values_by_dimension[dimension]))
+        tasks += [(dimension, value) for value in values]
+
+    return tasks
+
+
+def generate_for_filter(generator: accessor_stat_gen.AccessorStatGenerator,
+    task: FILTER_TASK) -> typing.Dict[str, str]:
+    """Generate the CSV contents for every dimension given a single filter.
+
+    Args:
+        generator: The generator with which to calculate statistics.
+        task: Tuple of filter name and value or (all, all) if no filter.
+
+    Returns:
+        Mapping from dimension to CSV string contents.
+    """
+    filter_name, filter_value = task
+
+    ret_csvs = {}
+    for dimension in DIMENSIONS:
+        params = {'dimension': dimension}
+        if filter_name != NO_FILTER:
+            params[filter_name] = filter_value
+
+        matching = generator.execute(params)
+        ret_csvs[dimension] = article_stat_gen.make_csv_str(matching)
+
+    return ret_csvs
+
+
+def get_content_filename(contents: str) -> str:
+    """Get the content-addressed filename for a CSV file.
+
+    Args:
+        contents: The string contents of the file.
+
+    Returns:
+        Filename which changes only if the contents change.
+    """
+    return hashlib.sha256(contents.encode('utf-8')).hexdigest()[:20] + '.csv'
+
+
+def generate_all(output_dir: str, workers: typing.Optional[int] = None) -> INDEX:
+    """Generate all static statistics files and their index.
+
+    Args:
+        output_dir: The directory in which to write the files.
+        workers: The number of worker processes or None to use one per core.
+
+    Returns:
+        Index mapping dimension to filter name to filter value to filename.
+    """
+    tasks = get_filter_tasks(load_accessor())
+
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        results = pool.map(_generate_for_filter_in_worker, tasks, chunksize=16)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    index: INDEX = dict(map(lambda x: (x, {}), DIMENSIONS))
+    written = set()
+
+    for (filter_name, filter_value), csvs in zip(tasks, results):
+        for dimension, contents in csvs.items():
+            filename = get_content_filename(contents)
+
+            if filename not in written:
+                with open(os.path.join(output_dir, filename), 'w') as f:
+                    f.write(contents)
+                written.add(filename)
+
+            index[dimension].setdefault(filter_name, {})[filter_value] = filename
+
+    with open(os.path.join(output_dir, INDEX_FILENAME), 'w') as f:
+        json.dump(index, f, separators=(',', ':'), sort_keys=True)
+
+    return index
+
+
+def _init_worker():
+    global _worker_generator
+    _worker_generator = accessor_stat_gen.AccessorStatGenerator(load_accessor())
+
+
+def _generate_for_filter_in_worker(task: FILTER_TASK) -> typing.Dict[str, str]:
+    assert _worker_generator is not None
+    return generate_for_filter(_worker_generator, task)
+
+
+def main():
+    """Entry point for generating static statistics from the command line."""
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_OUTPUT_DIR
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    index = generate_all(output_dir, workers)
+    count = sum(map(lambda x: sum(map(len, x.values())), index.values()))
+    print('Wrote statistics for %d queries to %s' % (count, output_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,23 @@
 [ -e deploy ] && rm -r deploy
+python3 basemap_util.py
+
+# Month buckets and row offsets are only written when rebuilding from the article table.
+if [ -e csv/articles.csv ]; then
+    python3 serialized_gen.py csv/articles.csv txt/serialized.txt
+fi
+
+python3 static_stat_gen.py
+python3 shard_util.py
+
 mkdir deploy
 cp *.py deploy
 cp *.html deploy
+cp -r basemap deploy/basemap
 cp -r css deploy/css
 cp -r csv deploy/csv
 cp -r geojson deploy/geojson
 cp -r img deploy/img
+cp -r stats deploy/stats
 cp -r js deploy/js
 cp -r third_party deploy/third_party
 cp -r third_party_web deploy/third_party_web
@@ -17,3 +29,6 @@ cd deploy
 for name in *.py; do
     mv -- "$name" "${name%.py}.pyscript"
 done
+
+cd ..
+python3 deploy_bundle.py deploy
@@ -5,13 +5,16 @@ cd lambda_deploy
 mkdir exporter
 cd exporter
 cp ../../article_getter.py article_getter.py
+cp ../../chunk_util.py chunk_util.py
 mv article_getter.py lambda_function.py
-zip exporter.zip lambda_function.py
+zip exporter.zip chunk_util.py lambda_function.py
 cd ..
 
 mkdir statgen
 cd statgen
+cp ../../approx_util.py approx_util.py
 cp ../../article_getter.py article_getter.py
 cp ../../article_stat_gen.py article_stat_gen.py
+cp ../../chunk_util.py chunk_util.py
 mv article_stat_gen.py lambda_function.py
-zip statgen.zip article_getter.py lambda_function.py
+zip statgen.zip approx_util.py article_getter.py chunk_util.py lambda_function.py
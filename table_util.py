@@ -59,8 +59,8 @@ class BarTable:
             x: The horizontal coordinate at which the left of the table should be drawn.
             y: The vertical coordinate at which the top of the table should be drawn.
             groups: The groups to draw in the body of the table.
-            selected_name: The name of the group currently selected by the user or None if no group
-                selected.
+            selected_name: The name of the group currently selected by the user (multiple names
+                joined by data_util.VALUE_SEPARATOR) or None if no group selected.
             hovering_name: The name of the group currently hovering by the user or None if no group
                 hovering.
             total_getter: Function taking the name of a group and returning the total against which
@@ -106,13 +106,14 @@ class BarTable:
         self._sketch.draw_text(0, y - 5, label)
 
         groups_interpreted = self._interpret_groups(groups, total_getter, count)
+        selected_names = data_util.make_values(selected_name)
 
         for group in groups_interpreted:
             percent = group['percent']
             name = group['name']
             prefix_name = prefix + '_' + name
 
-            is_selected = selected_name == name
+            is_selected = name in selected_names
             is_hovering = hovering_name == name
             color = const.get_color(is_selected, is_hovering)
 
@@ -0,0 +1,62 @@
+"""Tests for generating express statistics from pre-aggregated article sets.
+
+License: BSD
+"""
+
+import os
+import unittest
+
+import accessor_stat_gen
+import data_util
+import serialized_gen
+
+
+class AccessorStatGeneratorTests(unittest.TestCase):
+
+    def setUp(self):
+        path = os.path.join('txt', 'serialized.txt')
+        with open(path) as f:
+            lines = f.read().split('\n')
+        accessor = data_util.CompressedDataAccessor(lines)
+        self._generator = accessor_stat_gen.AccessorStatGenerator(accessor)
+
+    def test_stat_generator(self):
+        result = self._generator.execute({
+            'keyword': 'security',
+            'dimension': 'keyword'
+        })
+        self.assertAlmostEqual(result['security'], 1)
+
+    def test_country_percent(self):
+        result = self._generator.execute({
+            'queryStringParameters': {
+                'keyword': 'security',
+                'dimension': 'country'
+            }
+        })
+        self.assertTrue(result['Australia'] > 0)
+        self.assertTrue(result['Australia'] <= 1)
+
+    def test_month_percent(self):
+        # Month buckets are only written when rebuilding from the article table.
+        lines = serialized_gen.build(serialized_gen.DEFAULT_ARTICLES_PATH, None, 1)
+        generator = accessor_stat_gen.AccessorStatGenerator(data_util.CompressedDataAccessor(lines))
+        result = generator.execute({
+            'keyword': 'security',
+            'dimension': 'month',
+            'start': '2024-03',
+            'end': '2024-05'
+        })
+        self.assertEqual(sorted(result.keys()), ['2024-03', '2024-04', '2024-05'])
+        self.assertTrue(result['2024-03'] > 0)
+        self.assertTrue(result['2024-03'] <= 1)
+
+    def test_unknown_dimension(self):
+        result = self._generator.execute({'dimension': 'other'})
+        self.assertEqual(result, {})
+
+    def test_approximate(self):
+        params = {'keyword': 'security', 'dimension': 'keyword', 'approximate': 'true'}
+        estimates = self._generator.execute_approximate(params)
+        self.assertAlmostEqual(estimates['security'].get_value(), 1)
+        self.assertEqual(estimates['security'].get_error(), 0)
@@ -0,0 +1,103 @@
+"""Tests for sketches which approximate aggregate statistics.
+
+License: BSD
+"""
+
+import collections
+import random
+import unittest
+
+import approx_util
+
+
+class HyperLogLogTests(unittest.TestCase):
+
+    def test_small_exact(self):
+        sketch = approx_util.HyperLogLog()
+        for value in ['a', 'b', 'c', 'a', 'b']:
+            sketch.add(value)
+
+        self.assertEqual(round(sketch.get_estimate().get_value()), 3)
+
+    def test_large_within_bounds(self):
+        sketch = approx_util.HyperLogLog()
+        for i in range(0, 50000):
+            sketch.add('https://example.com/%d' % (i % 40000))
+
+        estimate = sketch.get_estimate()
+        self.assertTrue(estimate.get_low() <= 40000 <= estimate.get_high())
+        self.assertTrue(estimate.get_error() < 40000 * 0.1)
+
+    def test_merge(self):
+        first = approx_util.HyperLogLog()
+        second = approx_util.HyperLogLog()
+        for i in range(0, 1000):
+            first.add(str(i))
+            second.add(str(i + 500))
+
+        first.merge(second)
+        estimate = first.get_estimate()
+        self.assertTrue(estimate.get_low() <= 1500 <= estimate.get_high())
+
+
+class SpaceSavingTests(unittest.TestCase):
+
+    def test_exact_under_capacity(self):
+        sketch = approx_util.SpaceSaving(10)
+        for value in ['a', 'b', 'a', 'c', 'a', 'b']:
+            sketch.add(value)
+
+        top = sketch.get_top()
+        self.assertEqual(list(map(lambda x: (x[0], x[1].get_value()), top)), [
+            ('a', 3),
+            ('b', 2),
+            ('c', 1)
+        ])
+        self.assertEqual(max(map(lambda x: x[1].get_error(), top)), 0)
+        self.assertEqual(sketch.get_untracked_bound(), 0)
+
+    def test_heavy_hitters_within_bounds(self):
+        randomizer = random.Random(1)
+        values = ['common'] * 3000 + ['frequent'] * 1000
+        values += ['rare%d' % randomizer.randint(0, 5000) for i in range(0, 6000)]
+        randomizer.shuffle(values)
+
+        sketch = approx_util.SpaceSaving(50)
+        for value in values:
+            sketch.add(value)
+
+        exact = collections.Counter(values)
+        estimates = dict(sketch.get_top())
+        self.assertEqual(list(estimates.keys())[:2], ['common', 'frequent'])
+        self.assertEqual(sketch.get_total(), len(values))
+
+        for value, estimate in estimates.items():
+            self.assertTrue(estimate.get_low() <= exact[value] <= estimate.get_high())
+
+        untracked = filter(lambda x: x[0] not in estimates, exact.items())
+        self.assertTrue(max(map(lambda x: x[1], untracked)) <= sketch.get_untracked_bound())
+
+
+class DivideTests(unittest.TestCase):
+
+    def test_divide(self):
+        ratio = approx_util.divide(
+            approx_util.Estimate(10, 8, 10),
+            approx_util.Estimate(100, 90, 110)
+        )
+        self.assertAlmostEqual(ratio.get_value(), 0.1)
+        self.assertAlmostEqual(ratio.get_low(), 8 / 110)
+        self.assertAlmostEqual(ratio.get_high(), 10 / 90)
+
+    def test_divide_exact_zero(self):
+        ratio = approx_util.divide(approx_util.make_exact(0), approx_util.make_exact(0))
+        self.assertEqual(ratio.get_value(), 0)
+
+    def test_divide_unbounded_denominator(self):
+        ratio = approx_util.divide(
+            approx_util.Estimate(1, 0, 2),
+            approx_util.Estimate(2, 0, 4)
+        )
+        self.assertAlmostEqual(ratio.get_value(), 0.5)
+        self.assertEqual(ratio.get_high(), approx_util.MAX_RATIO)
+        self.assertEqual(ratio.get_error(), 0.5)
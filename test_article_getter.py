@@ -5,7 +5,10 @@ License: BSD
 
 import unittest
 
+import accessor_stat_gen
 import article_getter
+import data_util
+import serialized_gen
 
 
 class ArticleGetterTests(unittest.TestCase):
@@ -24,6 +27,19 @@ class ArticleGetterTests(unittest.TestCase):
         target_dict = article.to_dict()
         self.assertEqual(target_dict['url'], 'test url')
 
+    def test_lazy_article(self):
+        article = article_getter.LazyArticle(
+            ['test url', 'original', 'english', '2024-01-17', 'us', 'a;b', 'c', 'd;e']
+        )
+        self.assertEqual(article.get_keywords(), ['a', 'b'])
+        self.assertEqual(article.to_dict()['categoryList'], 'd;e')
+        self.assertFalse(hasattr(article, '__dict__'))
+
+    def test_parse_row_strips_newline(self):
+        getter = article_getter.LocalArticleGetter()
+        article = getter._parse_row('u\to\te\t2024-01-17\tus\ta\tb\tc;d\n')
+        self.assertEqual(article.get_categories(), ['c', 'd'])
+
     def test_local_handler_all(self):
         results = article_getter.local_handler({})
         self.assertTrue(len(results) > 0)
@@ -33,3 +49,208 @@ class ArticleGetterTests(unittest.TestCase):
         results = article_getter.local_handler({'keyword': 'security'})
         self.assertTrue(len(results) > 0)
         self.assertTrue(results[0].get_url() != '')
+
+    def test_local_handler_multiple_values(self):
+        def get_urls(params):
+            return set(map(lambda x: x.get_url(), article_getter.local_handler(params)))
+
+        kenya = get_urls({'country': 'Kenya'})
+        nigeria = get_urls({'country': 'Nigeria'})
+        self.assertTrue(len(kenya) > 0)
+        self.assertEqual(get_urls({'country': 'Kenya;Nigeria'}), kenya | nigeria)
+
+    def test_local_handler_date_range(self):
+        results = article_getter.local_handler({'start': '2024-03', 'end': '2024-04-30'})
+        months = set(map(lambda x: x.get_published()[:7], results))
+        self.assertEqual(months, {'2024-03', '2024-04'})
+
+    def test_local_page_handler(self):
+        results = article_getter.local_handler({'keyword': 'security'})
+        page = article_getter.local_page_handler({'keyword': 'security'}, 5, offset=2)
+        self.assertEqual(
+            list(map(lambda x: x.get_url(), page)),
+            list(map(lambda x: x.get_url(), results[2:7]))
+        )
+
+    def test_select_page_sampled(self):
+        articles = [
+            article_getter.Article(str(i), '', '', '', 'us', [], [], []) for i in range(0, 100)
+        ]
+        page_1 = article_getter.select_page(iter(articles), 10, seed='test')
+        page_2 = article_getter.select_page(iter(articles), 10, offset=10, seed='test')
+        page_1_again = article_getter.select_page(iter(articles), 10, seed='test')
+
+        urls_1 = set(map(lambda x: x.get_url(), page_1))
+        urls_2 = set(map(lambda x: x.get_url(), page_2))
+        self.assertEqual(len(urls_1), 10)
+        self.assertEqual(len(urls_1 & urls_2), 0)
+        self.assertEqual(page_1, page_1_again)
+
+    def test_cursor_pages(self):
+        getter = article_getter.LocalArticleGetter()
+        expected = list(map(lambda x: x.get_url(), getter.execute_to_obj({'keyword': 'security'})))
+
+        found = []
+        cursor = None
+        while True:
+            page, cursor = getter.execute_to_cursor_page({'keyword': 'security'}, 7, cursor)
+            found += list(map(lambda x: x.get_url(), page))
+            if cursor is None:
+                break
+
+        self.assertEqual(found, expected)
+
+    def test_decode_cursor_stale(self):
+        cursor = article_getter.encode_cursor(10, 'a')
+        self.assertEqual(article_getter.decode_cursor(cursor, 'a'), 10)
+
+        with self.assertRaises(ValueError):
+            article_getter.decode_cursor(cursor, 'b')
+
+        with self.assertRaises(ValueError):
+            article_getter.decode_cursor('not a cursor', 'a')
+
+    def test_export_paginated(self):
+        getter = article_getter.LocalArticleGetter()
+        response = getter.execute_to_export({'keyword': 'security', 'limit': '1'})
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(len(response['body'].strip().split('\n')), 2)
+        self.assertTrue(article_getter.CURSOR_HEADER in response['headers'])
+
+        response = getter.execute_to_export({'keyword': 'security', 'limit': 'a'})
+        self.assertEqual(response['statusCode'], 400)
+
+    def test_split_lines(self):
+        lines = list(article_getter.split_lines([b'a\nb', b'c\n', b'd']))
+        self.assertEqual(lines, [b'a\n', b'bc\n', b'd'])
+
+    def test_parallel_getter(self):
+        expected = article_getter.LocalArticleGetter().execute_to_obj({'keyword': 'security'})
+        getter = article_getter.ParallelArticleGetter(workers=2, chunk_bytes=100000)
+        found = getter.execute_to_obj({'keyword': 'security'})
+        self.assertEqual(
+            list(map(lambda x: x.get_url(), found)),
+            list(map(lambda x: x.get_url(), expected))
+        )
+
+    def test_query_rows(self):
+        lines = [
+            'a\tx\tx\t2024-01-01\tKenya\tsecurity\tfood\thealth\n',
+            'b\tx\tx\t2024-01-02\tPeru\tprices\tprice\teconomy\n'
+        ]
+        getter = article_getter.LocalArticleGetter()
+        rows = list(getter._execute_query_rows({'country': 'Peru'}, lines))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][0], lines[1])
+        self.assertEqual(rows[0][1].get_url(), 'b')
+
+    def test_offset_getter(self):
+        lines = serialized_gen.build(serialized_gen.DEFAULT_ARTICLES_PATH, None, 1)
+        accessor = data_util.CompressedDataAccessor(lines)
+
+        params = {'keyword': 'security', 'start': '2024-03'}
+        offsets = accessor.get_offsets(accessor_stat_gen.make_query(params))
+        assert offsets is not None
+
+        expected = article_getter.LocalArticleGetter().execute_to_obj(params)
+        found = list(article_getter.OffsetArticleGetter(offsets).execute_to_obj(params))
+        self.assertTrue(len(found) > 0)
+        self.assertEqual(
+            list(map(lambda x: x.get_url(), found)),
+            list(map(lambda x: x.get_url(), expected))
+        )
+
+    def test_execute_query_prefilter(self):
+        lines = [
+            'url\ttitle_original\ttitle_english\tpublished\tcountry\tkeywords\ttags\tcategories\n',
+            'a\tfood\tfood\t2024-01-17\tus\tfood security\tb\tc\n',
+            'b\tx\tx\t2024-01-17\tus\tfood;security\tb\tc\n'
+        ]
+        getter = article_getter.LocalArticleGetter()
+        matching = getter._execute_query({'keyword': 'food', 'country': 'us'}, lines)
+        self.assertEqual(list(map(lambda x: x.get_url(), matching)), ['b'])
+
+    def test_preloaded_apply_delta(self):
+        getter = article_getter.PreloadedArticleGetter()
+        prior = len(list(getter.execute_to_obj({'country': 'Atlantis'})))
+        getter.apply_delta(['new\tx\tx\t2024-01-17\tAtlantis\ta\tb\tc\n'])
+        found = list(getter.execute_to_obj({'country': 'Atlantis'}))
+        self.assertEqual(len(found), prior + 1)
+
+    def test_preloaded_cursor_pages(self):
+        getter = article_getter.PreloadedArticleGetter()
+        version = getter.get_dataset_version()
+        params = {'keyword': 'security'}
+
+        page, cursor = getter.execute_to_cursor_page(params, 3, None)
+        local_page, local_cursor = article_getter.LocalArticleGetter().execute_to_cursor_page(
+            params,
+            3,
+            None
+        )
+        self.assertEqual(
+            list(map(lambda x: x.get_url(), page)),
+            list(map(lambda x: x.get_url(), local_page))
+        )
+        assert cursor is not None
+
+        getter.apply_delta(['new\tx\tx\t2024-01-17\tAtlantis\ta\tb\tc'])
+        self.assertNotEqual(getter.get_dataset_version(), version)
+        with self.assertRaises(ValueError):
+            getter.execute_to_cursor_page(params, 3, cursor)
+
+        urls = []
+        cursor = None
+        while True:
+            page, cursor = getter.execute_to_cursor_page({'country': 'Atlantis'}, 2, cursor)
+            urls.extend(map(lambda x: x.get_url(), page))
+            if cursor is None:
+                break
+
+        self.assertEqual(urls[-1], 'new')
+
+        page, cursor = getter.execute_to_cursor_page({'country': 'Atlantis'}, len(urls), None)
+        self.assertEqual(list(map(lambda x: x.get_url(), page)), urls)
+        self.assertIsNone(cursor)
+
+    def test_canonicalize_params(self):
+        params = article_getter.canonicalize_params({
+            'Keyword': 'security ',
+            'country': 'All',
+            'tag': ''
+        })
+        self.assertEqual(params, {'keyword': 'security'})
+        self.assertEqual(article_getter.canonicalize_params(None), {})
+
+        params = article_getter.canonicalize_params({'country': 'b; a;;b'})
+        self.assertEqual(params, {'country': 'a;b'})
+
+    def test_etag(self):
+        etag_1 = article_getter.make_etag(
+            'export',
+            article_getter.canonicalize_params({'tag': 'diet', 'country': 'all', 'KEYWORD': 'a'}),
+            'v1'
+        )
+        etag_2 = article_getter.make_etag(
+            'export',
+            article_getter.canonicalize_params({'keyword': 'a', 'tag': 'diet'}),
+            'v1'
+        )
+        etag_3 = article_getter.make_etag('export', {'keyword': 'a', 'tag': 'diet'}, 'v2')
+        self.assertEqual(etag_1, etag_2)
+        self.assertNotEqual(etag_1, etag_3)
+
+    def test_etag_match(self):
+        etag = article_getter.make_etag('stats', {}, 'v1')
+        event = {'headers': {'If-None-Match': etag}}
+        self.assertTrue(article_getter.get_has_etag_match(event, etag))
+        self.assertTrue(article_getter.get_has_etag_match(
+            {'headers': {'if-none-match': '"other", W/' + etag}},
+            etag
+        ))
+        self.assertFalse(article_getter.get_has_etag_match({'headers': None}, etag))
+        self.assertFalse(article_getter.get_has_etag_match({}, etag))
+
+        response = article_getter.make_not_modified_response(etag)
+        self.assertEqual(response['statusCode'], 304)
+        self.assertEqual(response['headers']['ETag'], etag)
@@ -0,0 +1,96 @@
+"""Tests for background sampling of articles for the preview movement.
+
+License: BSD
+"""
+
+import time
+import unittest
+
+import article_getter
+import article_preview_viz
+import data_util
+import serialized_gen
+
+
+class PreviewLoaderTests(unittest.TestCase):
+
+    def test_matches_select_page(self):
+        params = {'keyword': 'security'}
+        loader = article_preview_viz.PreviewLoader(params, 5)
+        loader.start()
+
+        deadline = time.time() + 30
+        while not loader.get_is_done() and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertTrue(loader.get_is_done())
+        self.assertTrue(loader.get_rows_scanned() > loader.get_matching_count())
+
+        expected = article_getter.local_page_handler(
+            params,
+            5,
+            seed=article_getter.get_preview_seed(params)
+        )
+        self.assertEqual(
+            list(map(lambda x: x.get_url(), loader.get_articles())),
+            list(map(lambda x: x.get_url(), expected))
+        )
+
+    def test_offsets(self):
+        lines = serialized_gen.build(serialized_gen.DEFAULT_ARTICLES_PATH, None, 1)
+        accessor = data_util.CompressedDataAccessor(lines)
+
+        params = {'keyword': 'security'}
+        query = data_util.Query(None, None, None, None, 'security')
+        loader = article_preview_viz.PreviewLoader(params, 5, accessor, query)
+        loader._run()
+
+        self.assertTrue(loader.get_is_done())
+        self.assertEqual(loader.get_rows_scanned(), loader.get_matching_count())
+
+        full_loader = article_preview_viz.PreviewLoader(params, 5)
+        full_loader._run()
+        self.assertEqual(
+            list(map(lambda x: x.get_url(), loader.get_articles())),
+            list(map(lambda x: x.get_url(), full_loader.get_articles()))
+        )
+
+    def test_cancel(self):
+        loader = article_preview_viz.PreviewLoader({}, 5)
+        loader.cancel()
+        loader._run()
+        self.assertFalse(loader.get_is_done())
+        self.assertEqual(loader.get_rows_scanned(), 0)
+        self.assertEqual(len(loader.get_articles()), 0)
+
+    def test_stale_offsets(self):
+        params = {'keyword': 'security'}
+        accessor = data_util.CompressedDataAccessor([
+            'n 0 "us"',
+            'o %s' % data_util.get_table_signature(),
+            'a 0 -1 -1 -1 1 -1 1'
+        ])
+        query = data_util.Query(None, None, None, None, None)
+        self.assertEqual(accessor.get_offsets(query), [1])
+
+        loader = article_preview_viz.PreviewLoader(params, 5, accessor, query)
+        loader._run()
+
+        full_loader = article_preview_viz.PreviewLoader(params, 5)
+        full_loader._run()
+
+        self.assertTrue(loader.get_is_done())
+        self.assertIsNone(loader.get_error())
+        self.assertEqual(loader.get_matching_count(), full_loader.get_matching_count())
+
+    def test_error(self):
+        loader = FailingPreviewLoader({}, 5)
+        loader._run()
+        self.assertFalse(loader.get_is_done())
+        self.assertEqual(loader.get_error(), 'unreadable')
+
+
+class FailingPreviewLoader(article_preview_viz.PreviewLoader):
+
+    def _scan(self, offsets):
+        raise RuntimeError('unreadable')
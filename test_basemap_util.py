@@ -0,0 +1,29 @@
+"""Tests for utilities which precompute the map basemap.
+
+License: BSD
+"""
+
+import unittest
+
+import basemap_util
+
+
+class BasemapUtilTests(unittest.TestCase):
+
+    def test_cache_key_changes(self):
+        key_1 = basemap_util.get_cache_key('{}', 100, 100, 0.2, 50, 50)
+        key_2 = basemap_util.get_cache_key('{}', 100, 100, 0.2, 50, 51)
+        key_3 = basemap_util.get_cache_key('{"a": 1}', 100, 100, 0.2, 50, 50)
+        self.assertEqual(key_1, basemap_util.get_cache_key('{}', 100, 100, 0.2, 50, 50))
+        self.assertNotEqual(key_1, key_2)
+        self.assertNotEqual(key_1, key_3)
+
+    def test_simplify_points(self):
+        points = [(0, 0), (1, 0.001), (2, 0), (2, 2), (0, 2), (0, 0)]
+        simplified = basemap_util.simplify_points(points, 0.1)
+        self.assertEqual(simplified, [(0, 0), (2, 0), (2, 2), (0, 2), (0, 0)])
+
+    def test_simplify_points_collapse(self):
+        points = [(0, 0), (0.01, 0), (0.01, 0.01), (0, 0)]
+        simplified = basemap_util.simplify_points(points, 1)
+        self.assertEqual(simplified, points)
@@ -0,0 +1,32 @@
+"""Tests for headless batch rendering.
+
+License: BSD
+"""
+
+import os
+import unittest
+
+import batch_render
+import data_util
+
+
+class BatchRenderTests(unittest.TestCase):
+
+    def setUp(self):
+        path = os.path.join('txt', 'serialized.txt')
+        with open(path) as f:
+            lines = f.read().split('\n')
+        self._accessor = data_util.CompressedDataAccessor(lines)
+
+    def test_expand_jobs_single(self):
+        jobs = batch_render.expand_jobs([{'movement': 'grid', 'tag': 'diet'}], self._accessor)
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0].get_movement(), 'grid')
+        self.assertEqual(jobs[0].get_filters()['tag'], 'diet')
+        self.assertEqual(jobs[0].get_filename(), '00000_grid_diet.png')
+
+    def test_expand_jobs_each(self):
+        jobs = batch_render.expand_jobs([{'each': 'category'}], self._accessor)
+        self.assertEqual(len(jobs), len(data_util.CATEGORIES))
+        categories = set(map(lambda x: x.get_filters()['category'], jobs))
+        self.assertEqual(categories, data_util.CATEGORIES)
@@ -0,0 +1,42 @@
+"""Tests for splitting files into line-aligned chunks.
+
+License: BSD
+"""
+
+import os
+import tempfile
+import unittest
+
+import chunk_util
+
+
+class ChunkUtilTests(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._temp_dir.name, 'lines.txt')
+        self._lines = ['line %d\n' % i for i in range(0, 100)]
+        with open(self._path, 'w') as f:
+            f.write(''.join(self._lines))
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_ranges_cover_file(self):
+        ranges = chunk_util.get_line_aligned_ranges(self._path, 7)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self._path))
+
+        for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+            self.assertEqual(end, start)
+
+    def test_read_lines(self):
+        ranges = chunk_util.get_line_aligned_ranges(self._path, 7)
+        lines = []
+        for start, end in ranges:
+            lines += list(chunk_util.read_lines(self._path, start, end))
+        self.assertEqual(lines, self._lines)
+
+    def test_read_lines_with_offsets(self):
+        found = list(chunk_util.read_lines_with_offsets(self._path, 0, 16))
+        self.assertEqual(found, [(0, 'line 0\n'), (7, 'line 1\n'), (14, 'line 2\n')])
@@ -4,6 +4,7 @@ License: BSD
 """
 
 import os
+import tempfile
 import unittest
 
 import data_util
@@ -48,3 +49,199 @@ class DataUtilTests(unittest.TestCase):
         query = data_util.Query(None, None, None, None, 'security')
         result = accessor.execute_query(query)
         self.assertTrue(result.get_group_count() > 0)
+
+    def test_apply_delta(self):
+        accessor = data_util.CompressedDataAccessor([
+            'n 0 "us"',
+            'c 1 "a"',
+            't 1 2 "b"',
+            'k 1 2 3 "c"',
+            'a 0 1 2 3 2'
+        ])
+        query = data_util.Query(None, None, None, None, None)
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_total_count(), 2)
+
+        accessor.apply_delta(['n 4 "mx"', ''])
+        self.assertTrue(accessor.execute_query(query) is result)
+
+        query_mx = data_util.Query(None, None, 'mx', None, None)
+        self.assertEqual(accessor.execute_query(query_mx).get_total_count(), 0)
+
+        accessor.apply_delta(['a 4 1 -1 -1 3'])
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_total_count(), 5)
+        self.assertEqual(len(result.get_country_totals()), 2)
+        self.assertEqual(accessor.execute_query(query_mx).get_total_count(), 3)
+
+    def test_apply_delta_population(self):
+        accessor = data_util.CompressedDataAccessor(['n 0 "us"', 'c 1 "a"', 'a 0 1 -1 -1 2'])
+        query = data_util.Query(None, None, None, None, None)
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_country_totals()[0].get_count(), 2)
+
+        accessor.apply_delta(['p 0 7 -1'])
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_country_totals()[0].get_count(), 7)
+
+    def test_apply_delta_summary(self):
+        accessor = data_util.CompressedDataAccessor([
+            'n 0 "us"',
+            'c 1 "a"',
+            'a 0 1 -1 -1 2',
+            'p 0 9 -1',
+            's -1 total 9',
+            's -1 group 9',
+            's -1 categories 1:9',
+            's -1 countries 0:9',
+            's -1 tags -1',
+            's -1 keywords -1',
+            's -1 buckets -1'
+        ])
+        query = data_util.Query(None, None, None, None, None)
+        self.assertTrue(accessor.has_summary(query))
+        self.assertEqual(accessor.execute_query(query).get_total_count(), 9)
+
+        accessor.apply_delta(['a 0 1 -1 -1 3'])
+        self.assertFalse(accessor.has_summary(query))
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_total_count(), 5)
+        self.assertEqual(result.get_country_totals()[0].get_count(), 5)
+
+    def test_swappable_data_accessor(self):
+        first = data_util.CompressedDataAccessor(['n 0 "us"', 'c 1 "a"', 'a 0 1 -1 -1 2'])
+        second = data_util.CompressedDataAccessor(['n 0 "us"', 'c 1 "a"', 'a 0 1 -1 -1 5'])
+        accessor = data_util.SwappableDataAccessor(first)
+        query = data_util.Query(None, None, None, None, None)
+        self.assertEqual(accessor.execute_query(query).get_total_count(), 2)
+
+        accessor.swap(second)
+        self.assertEqual(accessor.execute_query(query).get_total_count(), 5)
+
+    def test_query_multiple_values(self):
+        query_1 = data_util.Query(None, None, ['b', 'a'], None, None)
+        query_2 = data_util.Query(None, None, 'a;b', None, None)
+        self.assertEqual(query_1.get_countries(), frozenset(['a', 'b']))
+        self.assertEqual(query_1.get_country(), 'a;b')
+        self.assertEqual(query_1.get_id_str(), query_2.get_id_str())
+        self.assertFalse(data_util.Query(None, None, [], None, None).has_country())
+
+    def test_compressed_data_accessor_multiple_values(self):
+        accessor = data_util.CompressedDataAccessor([
+            'n 0 "us"',
+            'n 1 "mx"',
+            'n 2 "ca"',
+            'c 3 "a"',
+            't 3 4 "b"',
+            'k 3 4 5 "c"',
+            'k 3 4 6 "d"',
+            'a 0 3 4 5 2',
+            'a 1 3 4 6 3',
+            'a 2 3 4 5;6 7',
+            'a 2 -1 -1 -1 11'
+        ])
+
+        def get_count(country, keyword):
+            query = data_util.Query(None, None, country, None, keyword)
+            return accessor.execute_query(query).get_total_count()
+
+        self.assertEqual(get_count(['us', 'mx'], None), 5)
+        self.assertEqual(get_count(None, ['c', 'd']), 12)
+        self.assertEqual(get_count(['mx', 'ca'], ['c']), 7)
+        self.assertEqual(get_count(['mx', 'ca'], None), 21)
+
+    def test_article_set_in_range(self):
+        article_set = data_util.ArticleSet(
+            data_util.Country('us'),
+            [],
+            [],
+            [],
+            6,
+            {'2024-03': 2, '2024-01': 1, '2024-05': 3}
+        )
+        self.assertEqual(article_set.get_count_in_range('2024-02', '2024-05'), 5)
+        self.assertEqual(article_set.get_count_in_range(None, '2024-03'), 3)
+        self.assertEqual(article_set.get_count_in_range('2024-06', None), 0)
+        self.assertEqual(article_set.get_count_in_range('2024-05', '2024-01'), 0)
+
+        in_range = article_set.get_in_range('2024-02', None)
+        self.assertEqual(in_range.get_count(), 5)
+        self.assertEqual(in_range.get_buckets(), {'2024-03': 2, '2024-05': 3})
+
+    def test_compressed_data_accessor_date_range(self):
+        accessor = data_util.CompressedDataAccessor([
+            'n 0 "us"',
+            'n 1 "mx"',
+            'c 2 "a"',
+            'a 0 2 -1 -1 3 2024-01:1;2024-02:2',
+            'a 1 -1 -1 -1 4 2024-02:1;2024-04:3',
+            'a 1 2 -1 -1 5'
+        ])
+
+        query = data_util.Query(None, None, None, None, None, '2024-02-15', '2024-03')
+        self.assertTrue(query.get_has_filters())
+        self.assertEqual(query.get_start(), '2024-02')
+
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_total_count(), 3)
+        self.assertEqual(
+            list(map(lambda x: (x.get_name(), x.get_count()), result.get_buckets())),
+            [('2024-02', 3)]
+        )
+
+        query = data_util.Query(None, None, 'mx', None, None, None, '2024-12')
+        result = accessor.execute_query(query)
+        self.assertEqual(result.get_total_count(), 4)
+        self.assertEqual(
+            list(map(lambda x: (x.get_name(), x.get_count()), result.get_bucket_totals())),
+            [('2024-01', 1), ('2024-02', 3), ('2024-04', 3)]
+        )
+        self.assertEqual(len(result.get_country_totals()), 2)
+
+    def test_offsets_round_trip(self):
+        encoded = data_util.encode_offsets([10, 25, 40])
+        self.assertEqual(encoded, '10;15;15')
+        self.assertEqual(data_util.decode_offsets(encoded), [10, 25, 40])
+        self.assertEqual(data_util.decode_offsets(data_util.encode_offsets([])), [])
+
+    def test_compressed_data_accessor_offsets(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            table_path = os.path.join(temp_dir, 'articles.csv')
+            with open(table_path, 'w') as f:
+                f.write('header\nrow\n')
+
+            signature = data_util.get_table_signature(table_path)
+            assert signature is not None
+            self._check_offsets(table_path, signature)
+
+            stat = os.stat(table_path)
+            os.utime(table_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertNotEqual(data_util.get_table_signature(table_path), signature)
+
+            accessor = data_util.CompressedDataAccessor(['o ' + signature], table_path)
+            with open(table_path, 'a') as f:
+                f.write('new row\n')
+
+            query = data_util.Query(None, None, None, None, None)
+            self.assertIsNone(accessor.get_offsets(query))
+
+        unsigned = data_util.CompressedDataAccessor(['n 0 "us"', 'a 0 -1 -1 -1 1 -1 0'])
+        self.assertIsNone(unsigned.get_offsets(data_util.Query(None, None, None, None, None)))
+
+    def _check_offsets(self, table_path: str, signature: str):
+        accessor = data_util.CompressedDataAccessor([
+            'n 0 "us"',
+            'n 1 "mx"',
+            'c 2 "a"',
+            'o ' + signature,
+            'a 0 2 -1 -1 2 2024-01:1;2024-02:1 0;30',
+            'a 1 -1 -1 -1 1 2024-04:1 10'
+        ], table_path)
+        query = data_util.Query(None, None, None, None, None)
+        self.assertEqual(accessor.get_offsets(query), [0, 10, 30])
+
+        query = data_util.Query(None, None, 'us', None, None)
+        self.assertEqual(accessor.get_offsets(query), [0, 30])
+
+        accessor.apply_delta(['a 1 2 -1 -1 1'])
+        self.assertIsNone(accessor.get_offsets(data_util.Query(None, None, 'mx', None, None)))
@@ -0,0 +1,86 @@
+"""Tests for the deploy-time bundler of the web version.
+
+License: BSD
+"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import deploy_bundle
+
+INDEX = '''<html>
+    <py-config>
+    {
+        "files": {
+            "/helper.pyscript?v=1": "helper.py",
+            "/csv/centerpoints.csv": "csv/centerpoints.csv"
+        }
+    }
+    </py-config>
+</html>
+'''
+MAIN_SCRIPT = 'scriptTag.src = "viz.pyscript?v=1";\n'
+
+
+class DeployBundleTests(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._write('index.html', INDEX)
+        self._write(os.path.join('js', 'main.js'), MAIN_SCRIPT)
+        self._write('helper.pyscript', 'VALUE = 5\n')
+        self._write('viz.pyscript', 'import helper\n\n\ndef main():\n    print(helper.VALUE)\n')
+        self._write(os.path.join('csv', 'centerpoints.csv'), 'name,longitude,latitude\n')
+        self._write(os.path.join('txt', 'serialized.txt'), 'n 0 "Kenya"')
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_hashed_path(self):
+        path = deploy_bundle.get_hashed_path('txt/serialized.txt', b'a')
+        self.assertTrue(path.startswith('txt/serialized.'))
+        self.assertTrue(path.endswith('.txt'))
+        self.assertNotEqual(path, deploy_bundle.get_hashed_path('txt/serialized.txt', b'b'))
+
+    def test_bundle(self):
+        report = deploy_bundle.bundle(self._temp_dir.name)
+        self.assertEqual(report['before']['files'], 4)
+        self.assertEqual(report['after']['files'], 4)
+        self.assertLessEqual(report['precompressed']['bytes'], report['after']['bytes'])
+
+        manifest = json.loads(self._read('manifest.json'))
+        hashed = manifest['txt/serialized.txt']
+        self.assertEqual(self._read(hashed), 'n 0 "Kenya"')
+        with open(os.path.join(self._temp_dir.name, hashed + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), b'n 0 "Kenya"')
+
+        config = deploy_bundle.read_py_config(self._read('index.html'))
+        self.assertEqual(config['files'], {
+            '/' + manifest['csv/centerpoints.csv']: 'csv/centerpoints.csv',
+            '/manifest.json': 'manifest.json'
+        })
+
+        main_script = self._read(os.path.join('js', 'main.js'))
+        bundle_path = main_script.split('"')[1]
+        output = subprocess.run(
+            [sys.executable, os.path.join(self._temp_dir.name, bundle_path)],
+            capture_output=True,
+            text=True,
+            cwd=tempfile.gettempdir()
+        )
+        self.assertEqual(output.stdout.strip(), '5')
+
+    def _write(self, relative: str, contents: str):
+        path = os.path.join(self._temp_dir.name, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(contents)
+
+    def _read(self, relative: str) -> str:
+        with open(os.path.join(self._temp_dir.name, relative)) as f:
+            return f.read()
@@ -0,0 +1,110 @@
+"""Tests for the undo / redo history of filters.
+
+License: BSD
+"""
+
+import json
+import unittest
+
+import data_util
+import history_util
+import state_util
+
+NO_FILTERS: state_util.FILTERS = (frozenset(), frozenset(), frozenset(), frozenset())
+KENYA: state_util.FILTERS = (frozenset(), frozenset(['Kenya']), frozenset(), frozenset())
+INDIA: state_util.FILTERS = (frozenset(), frozenset(['India']), frozenset(), frozenset())
+
+
+def make_result(num_tags: int) -> data_util.Result:
+    tags = [data_util.CountedGroup('tag%d' % i, 1) for i in range(0, num_tags)]
+    return data_util.Result(10, 5, [], [], [], tags, [], True)
+
+
+class CountingAccessor(data_util.DataAccessor):
+
+    def __init__(self):
+        self._count = 0
+
+    def execute_query(self, query: data_util.Query) -> data_util.Result:
+        self._count += 1
+        return make_result(1)
+
+    def get_count(self) -> int:
+        return self._count
+
+
+def make_query(filters: state_util.FILTERS) -> data_util.Query:
+    return data_util.Query(None, *filters)
+
+
+class HistoryUtilTests(unittest.TestCase):
+
+    def test_undo_redo(self):
+        history = history_util.History(NO_FILTERS)
+        self.assertFalse(history.can_undo())
+        self.assertIsNone(history.undo())
+
+        history.record(KENYA)
+        history.record(KENYA)
+        history.record(INDIA)
+        self.assertEqual(history.undo(), KENYA)
+        self.assertEqual(history.undo(), NO_FILTERS)
+        self.assertEqual(history.redo(), KENYA)
+
+        history.record(NO_FILTERS)
+        self.assertFalse(history.can_redo())
+        self.assertEqual(history.undo(), KENYA)
+
+    def test_results_kept(self):
+        inner = CountingAccessor()
+        history = history_util.History(NO_FILTERS)
+        accessor = history_util.HistoryDataAccessor(inner, history)
+
+        accessor.execute_query(make_query(NO_FILTERS))
+        history.record(KENYA)
+        accessor.execute_query(make_query(KENYA))
+        self.assertEqual(inner.get_count(), 2)
+
+        history.undo()
+        accessor.execute_query(make_query(NO_FILTERS))
+        history.redo()
+        accessor.execute_query(make_query(KENYA))
+        self.assertEqual(inner.get_count(), 2)
+
+        history.clear_results()
+        self.assertEqual(history.get_bytes(), 0)
+        accessor.execute_query(make_query(KENYA))
+        self.assertEqual(inner.get_count(), 3)
+
+    def test_budget(self):
+        result_bytes = history_util.estimate_bytes(make_result(10))
+        history = history_util.History(NO_FILTERS, result_bytes * 2)
+
+        history.put_result(make_query(NO_FILTERS), make_result(10))
+        history.record(KENYA)
+        history.put_result(make_query(KENYA), make_result(10))
+        history.record(INDIA)
+        history.put_result(make_query(INDIA), make_result(10))
+        self.assertLessEqual(history.get_bytes(), result_bytes * 2)
+        self.assertIsNotNone(history.get_result(make_query(INDIA)))
+
+        history.undo()
+        self.assertIsNotNone(history.get_result(make_query(KENYA)))
+        history.undo()
+        self.assertIsNone(history.get_result(make_query(NO_FILTERS)))
+
+    def test_export_replay(self):
+        history = history_util.History(NO_FILTERS)
+        history.record(KENYA)
+        history.undo()
+        history.redo()
+
+        session = json.loads(json.dumps(history.export()))
+        actions = list(map(lambda x: x['action'], session['steps']))
+        self.assertEqual(actions, ['start', 'record', 'undo', 'redo'])
+        self.assertEqual(history_util.get_step_filters(session['steps'][1]), KENYA)
+
+        inner = CountingAccessor()
+        timings = history_util.replay(inner, session)
+        self.assertEqual(len(timings), 4)
+        self.assertEqual(inner.get_count(), (len(data_util.CATEGORIES) + 1) * 2)
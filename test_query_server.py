@@ -0,0 +1,111 @@
+"""Tests for the local export and statistics query server.
+
+License: BSD
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+import accessor_stat_gen
+import data_util
+import query_server
+
+
+class FakeStatGenerator:
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def execute(self, params):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.05)
+        return {'test': 0.5}
+
+
+class FakeReloader:
+
+    def __init__(self, value, delta=None):
+        self._value = value
+        self._delta = delta
+
+    def check(self):
+        return False
+
+    def take(self):
+        value = self._value
+        self._value = None
+        return value
+
+    def take_delta(self):
+        delta = self._delta
+        self._delta = None
+        return delta
+
+
+class QueryServerTests(unittest.TestCase):
+
+    def test_params_key(self):
+        key_1 = query_server.get_params_key({'tag': 'a', 'country': 'b'})
+        key_2 = query_server.get_params_key({'country': 'b', 'tag': 'a'})
+        self.assertEqual(key_1, key_2)
+
+    def test_coalesce(self):
+        generator = FakeStatGenerator()
+        server = query_server.QueryServer(None, generator, 2)  # type: ignore
+
+        async def run():
+            requests = [
+                server.route('/stats?tag=a&dimension=country'),
+                server.route('/stats?dimension=country&tag=a'),
+                server.route('/stats?tag=b&dimension=country')
+            ]
+            return await asyncio.gather(*requests)
+
+        responses = asyncio.run(run())
+        self.assertEqual(generator.calls, 2)
+        self.assertEqual(responses[0]['statusCode'], 200)
+        self.assertTrue('test' in responses[0]['body'])
+
+    def test_reload(self):
+        first = FakeStatGenerator()
+        second = FakeStatGenerator()
+        server = query_server.QueryServer(None, first)  # type: ignore
+        server._reloader = FakeReloader((None, second))  # type: ignore
+
+        asyncio.run(server.route('/stats?tag=a&dimension=country'))
+        self.assertEqual(first.calls, 0)
+        self.assertEqual(second.calls, 1)
+
+    def test_delta(self):
+        accessor = data_util.CompressedDataAccessor(['n 0 "us"', 'c 1 "a"', 'a 0 1 -1 -1 2'])
+        generator = accessor_stat_gen.AccessorStatGenerator(accessor)
+        server = query_server.QueryServer(None, generator)  # type: ignore
+        delta = {query_server.SERIALIZED_PATH: ['a 0 1 -1 -1 3']}
+        server._reloader = FakeReloader(None, delta)  # type: ignore
+
+        asyncio.run(server.route('/other'))
+        query = data_util.Query(None, None, None, None, None)
+        self.assertEqual(accessor.execute_query(query).get_total_count(), 5)
+
+    def test_approximate(self):
+        accessor = data_util.CompressedDataAccessor(['n 0 "us"', 'c 1 "a"', 'a 0 1 -1 -1 2'])
+        generator = accessor_stat_gen.AccessorStatGenerator(accessor)
+        server = query_server.QueryServer(None, generator)  # type: ignore
+
+        response = asyncio.run(server.route('/stats?dimension=category&approximate=true'))
+        self.assertEqual(response['body'].split('\r\n')[:2], ['name,percent,error', 'a,1.0,0.0'])
+
+    def test_not_found(self):
+        server = query_server.QueryServer(None, FakeStatGenerator())  # type: ignore
+        response = asyncio.run(server.route('/other'))
+        self.assertEqual(response['statusCode'], 404)
+
+    def test_serialize_response(self):
+        response = query_server.make_error_response(404)
+        serialized = query_server.serialize_response(response, False)
+        self.assertTrue(serialized.startswith(b'HTTP/1.1 404 Not Found\r\n'))
+        self.assertTrue(serialized.endswith(b'\r\n\r\nNot Found'))
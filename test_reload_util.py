@@ -0,0 +1,88 @@
+"""Tests for utilities to pick up changed data files.
+
+License: BSD
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+import reload_util
+
+
+class ReloadUtilTests(unittest.TestCase):
+
+    def test_signature(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'data.txt')
+            self.assertEqual(reload_util.get_files_signature([path]), (None,))
+
+            with open(path, 'w') as f:
+                f.write('a')
+
+            signature = reload_util.get_files_signature([path])
+            self.assertEqual(signature[0][1], 1)  # type: ignore
+
+    def test_reload(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'data.txt')
+            with open(path, 'w') as f:
+                f.write('a')
+
+            def factory():
+                with open(path) as f:
+                    return f.read()
+
+            reloader = reload_util.Reloader([path], factory, 0)
+            self.assertFalse(reloader.check())
+            self.assertIsNone(reloader.take())
+
+            with open(path, 'w') as f:
+                f.write('bc')
+
+            self.assertTrue(reloader.check())
+            while reloader.get_is_building():
+                time.sleep(0.01)
+
+            self.assertEqual(reloader.take(), 'bc')
+            self.assertIsNone(reloader.take())
+            self.assertFalse(reloader.check())
+
+    def test_delta(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'data.txt')
+            with open(path, 'w') as f:
+                f.write('a\n')
+
+            built = []
+
+            def factory():
+                built.append(path)
+                with open(path) as f:
+                    return f.read()
+
+            reloader = reload_util.Reloader([path], factory, 0, appendable=[path])
+
+            with open(path, 'a') as f:
+                f.write('b\n\nc\n')
+
+            self.assertTrue(reloader.check())
+            while reloader.get_is_building():
+                time.sleep(0.01)
+
+            self.assertIsNone(reloader.take())
+            self.assertEqual(reloader.take_delta(), {path: ['b', 'c']})
+            self.assertIsNone(reloader.take_delta())
+            self.assertEqual(len(built), 0)
+
+            with open(path, 'w') as f:
+                f.write('x\ny\nz\nw\n')
+
+            self.assertTrue(reloader.check())
+            while reloader.get_is_building():
+                time.sleep(0.01)
+
+            self.assertEqual(reloader.take(), 'x\ny\nz\nw\n')
+            self.assertIsNone(reloader.take_delta())
+            self.assertEqual(len(built), 1)
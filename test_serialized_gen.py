@@ -0,0 +1,139 @@
+"""Tests for building the compressed article format from the article table.
+
+License: BSD
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+import data_util
+import reload_util
+import serialized_gen
+
+HEADER = 'url\ttitle_original\ttitle_english\tpublished\tcountry\tkeywords\ttags\tcategories\n'
+ROWS = [
+    'a\tx\tx\t2024-01-01\tKenya\tsecurity;hunger\tfood security;hunger\thealth and body\n',
+    'b\tx\tx\t2024-01-02\tKenya\thunger;security\thunger;food security\thealth and body\n',
+    'c\tx\tx\t2024-01-03\tPeru\tprices\tprice\teconomy and industry\n',
+    'd\tx\tx\t2024-01-04\tPeru\t\t\teconomy and industry\n'
+]
+
+
+class SerializedGenTests(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._temp_dir.name, 'articles.csv')
+        with open(self._path, 'w') as f:
+            f.write(HEADER + ''.join(ROWS))
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_parse_article_line(self):
+        self.assertIsNone(serialized_gen.parse_article_line(HEADER))
+        parsed = serialized_gen.parse_article_line(ROWS[3])
+        self.assertEqual(parsed, ('Peru', ['economy and industry'], [], [], '2024-01-04'))
+
+    def test_round_trip(self):
+        lines = serialized_gen.build(self._path, None, 1)
+        article_lines = list(filter(lambda x: x.startswith('a '), lines))
+        self.assertEqual(len(article_lines), 3)
+
+        self.assertTrue(article_lines[0].endswith(' 2 2024-01:2 %d;%d' % (
+            len(HEADER),
+            len(ROWS[0])
+        )))
+
+        accessor = data_util.CompressedDataAccessor(lines)
+        result = accessor.execute_query(data_util.Query(None, None, None, None, 'security'))
+        self.assertEqual(result.get_group_count(), 2)
+
+        result = accessor.execute_query(data_util.Query(None, None, 'Peru', None, None))
+        self.assertEqual(result.get_group_count(), 2)
+
+    def test_stable_ids(self):
+        with open(os.path.join('txt', 'serialized.txt')) as f:
+            prior_lines = f.read().split('\n')
+
+        prior_ids = {}
+        for line in prior_lines:
+            if line.startswith('n '):
+                pieces = line.split(' ')
+                prior_ids[' '.join(pieces[2:])[1:-1]] = pieces[1]
+
+        lines = serialized_gen.build(self._path, os.path.join('txt', 'serialized.txt'), 1)
+        self.assertTrue('n %s "Kenya"' % prior_ids['Kenya'] in lines)
+
+    def test_delta(self):
+        base_path = os.path.join(self._temp_dir.name, 'base.csv')
+        with open(base_path, 'w') as f:
+            f.write(HEADER + ''.join(ROWS[:2]))
+
+        new_path = os.path.join(self._temp_dir.name, 'new.csv')
+        with open(new_path, 'w') as f:
+            f.write(HEADER + ''.join(ROWS[2:]))
+
+        serialized_path = os.path.join(self._temp_dir.name, 'serialized.txt')
+        base_lines = serialized_gen.build(base_path, None, 1)
+        with open(serialized_path, 'w') as f:
+            f.write('\n'.join(base_lines))
+
+        delta_lines = serialized_gen.build_delta(new_path, serialized_path, 1)
+        self.assertEqual(len(list(filter(lambda x: x.startswith('n '), delta_lines))), 1)
+
+        accessor = data_util.CompressedDataAccessor(base_lines)
+        accessor.apply_delta(delta_lines)
+        result = accessor.execute_query(data_util.Query(None, None, 'Peru', None, None))
+        self.assertEqual(result.get_group_count(), 2)
+
+        serialized_gen.apply_delta(new_path, serialized_path, base_path, 1)
+        with open(serialized_path) as f:
+            reloaded = data_util.CompressedDataAccessor(f.read().split('\n'), base_path)
+
+        query = data_util.Query(None, None, None, None, 'prices')
+        result = reloaded.execute_query(query)
+        self.assertEqual(result.get_group_count(), 1)
+
+        with open(base_path) as f:
+            contents = f.read()
+
+        self.assertEqual(contents, HEADER + ''.join(ROWS))
+
+        offsets = reloaded.get_offsets(query)
+        assert offsets is not None
+        self.assertEqual(contents[offsets[0]:].split('\n')[0], ROWS[2].strip())
+
+    def test_reload_delta(self):
+        serialized_path = os.path.join(self._temp_dir.name, 'serialized.txt')
+        with open(serialized_path, 'w') as f:
+            f.write('\n'.join(serialized_gen.build(self._path, None, 1)) + '\n')
+
+        def factory():
+            with open(serialized_path) as f:
+                return f.read()
+
+        reloader = reload_util.Reloader(
+            [serialized_path, self._path],
+            factory,
+            0,
+            appendable=[serialized_path, self._path]
+        )
+
+        new_path = os.path.join(self._temp_dir.name, 'new.csv')
+        with open(new_path, 'w') as f:
+            f.write(HEADER + 'e\tx\tx\t2024-02-01\tChile\tcopper\tmining\teconomy and industry\n')
+
+        delta_lines = serialized_gen.apply_delta(new_path, serialized_path, self._path, 1)
+
+        self.assertTrue(reloader.check())
+        while reloader.get_is_building():
+            time.sleep(0.01)
+
+        self.assertIsNone(reloader.take())
+        delta = reloader.take_delta()
+        assert delta is not None
+        self.assertEqual(delta[serialized_path], delta_lines)
+        self.assertEqual(len(delta[self._path]), 1)
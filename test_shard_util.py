@@ -0,0 +1,88 @@
+"""Tests for splitting the compressed article format into shards loaded on demand.
+
+License: BSD
+"""
+
+import os
+import tempfile
+import unittest
+
+import data_util
+import shard_util
+
+
+def read_text(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def describe(result: data_util.Result):
+    def describe_groups(groups):
+        return sorted(map(lambda x: (x.get_name(), x.get_count()), groups))
+
+    return (
+        result.get_total_count(),
+        result.get_group_count(),
+        describe_groups(result.get_categories()),
+        describe_groups(result.get_countries()),
+        describe_groups(result.get_country_totals()),
+        describe_groups(result.get_tags()),
+        describe_groups(result.get_keywords()),
+        result.get_has_filters(),
+        describe_groups(result.get_buckets()),
+        describe_groups(result.get_bucket_totals())
+    )
+
+
+class ShardUtilTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.TemporaryDirectory()
+        cls._num_shards = shard_util.build_shards(
+            os.path.join('txt', 'serialized.txt'),
+            cls._temp_dir.name
+        )
+        cls._full = data_util.CompressedDataAccessor(
+            read_text(os.path.join('txt', 'serialized.txt')).split('\n')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._temp_dir.cleanup()
+
+    def setUp(self):
+        accessor = shard_util.load_sharded(read_text, self._temp_dir.name)
+        assert accessor is not None
+        self._accessor = accessor
+
+    def test_defaults_without_shards(self):
+        for category in [None] + sorted(data_util.CATEGORIES):
+            query = data_util.Query(category, None, None, None, None)
+            self.assertEqual(
+                describe(self._accessor.execute_query(query)),
+                describe(self._full.execute_query(query))
+            )
+
+        self.assertEqual(self._accessor.get_loaded(), set())
+
+    def test_country_loads_selected(self):
+        query = data_util.Query(None, None, 'Kenya', None, None, '2024-01', '2024-06')
+        self.assertEqual(
+            describe(self._accessor.execute_query(query)),
+            describe(self._full.execute_query(query))
+        )
+        self.assertEqual(len(self._accessor.get_loaded()), 1)
+        self.assertEqual(self._accessor.get_offsets(query), self._full.get_offsets(query))
+
+    def test_other_filter_loads_all(self):
+        query = data_util.Query('food and materials', None, None, None, 'security')
+        self.assertEqual(
+            describe(self._accessor.execute_query(query)),
+            describe(self._full.execute_query(query))
+        )
+        self.assertEqual(len(self._accessor.get_loaded()), self._num_shards)
+
+    def test_missing(self):
+        missing = os.path.join(self._temp_dir.name, 'missing')
+        self.assertIsNone(shard_util.load_sharded(read_text, missing))
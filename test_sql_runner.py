@@ -0,0 +1,91 @@
+"""Tests for local SQL execution of the reference queries.
+
+License: BSD
+"""
+
+import os
+import tempfile
+import unittest
+
+import data_util
+import serialized_gen
+import sql_runner
+
+HEADER = 'url\ttitle_original\ttitle_english\tpublished\tcountry\tkeywords\ttags\tcategories\n'
+ROWS = [
+    'a\tx\tx\t2024-01-01\tKenya\tsecurity;hunger\tfood security;hunger\thealth and body\n',
+    'b\tx\tx\t2024-01-02\tKenya\thunger\thunger\thealth and body;economy and industry\n',
+    'c\tx\tx\t2024-01-03\tPeru\tprices\tprice\teconomy and industry\n',
+    'd\tx\tx\t2024-01-04\tPeru\t\t\teconomy and industry\n'
+]
+
+
+class SqlRunnerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self._temp_dir.name, 'articles.csv')
+        with open(path, 'w') as f:
+            f.write(HEADER + ''.join(ROWS))
+
+        serialized_lines = serialized_gen.build(path, None, 1)
+        self._expected = data_util.CompressedDataAccessor(serialized_lines)
+        self._actual = sql_runner.SqlDataAccessor(
+            sql_runner.build_database(path, serialized_lines)
+        )
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_total(self):
+        result = self._actual.execute_query(data_util.Query(None, None, None, 'hunger', None))
+        self.assertEqual(result.get_total_count(), 2)
+
+    def test_keywords(self):
+        result = self._actual.execute_query(data_util.Query(None, None, 'Kenya', None, None))
+        counts = dict(map(lambda x: (x.get_name(), x.get_count()), result.get_keywords()))
+        self.assertEqual(counts, {'security': 1, 'hunger': 2})
+
+    def test_matches_compressed(self):
+        queries = [
+            data_util.Query(None, None, None, None, None),
+            data_util.Query(None, None, 'Peru', None, None),
+            data_util.Query(None, 'economy and industry', None, None, None),
+            data_util.Query('health and body', None, None, None, None),
+            data_util.Query(None, None, None, 'price', None),
+            data_util.Query(None, None, 'Kenya', None, 'security'),
+            data_util.Query(None, None, 'Peru', None, None, '2024-01', '2024-01')
+        ]
+        self.assertEqual(sql_runner.get_mismatches(self._expected, self._actual, queries), [])
+
+    def test_fill_template(self):
+        template = sql_runner.load_templates()['tags']
+        filled = sql_runner.fill_template(template, 'frame target_frame', ['WHERE a', 'WHERE b'])
+        self.assertFalse(sql_runner.WHERE_CLAUSE_PLACEHOLDER in filled)
+        self.assertFalse(sql_runner.TARGET_FRAME_PLACEHOLDER in filled)
+        self.assertTrue(filled.index('WHERE a') < filled.index('WHERE b'))
+        self.assertTrue(filled.endswith('LIMIT ?'))
+
+        with self.assertRaises(RuntimeError):
+            sql_runner.fill_template(template, 'frame target_frame', ['WHERE a'])
+
+    def test_approximate_within_bounds(self):
+        queries = [
+            data_util.Query(None, None, None, None, None),
+            data_util.Query(None, None, 'Kenya', None, None),
+            data_util.Query(None, 'economy and industry', None, None, None)
+        ]
+        violations = sql_runner.get_bound_violations(self._expected, self._actual, queries, 1)
+        self.assertEqual(violations, [])
+
+    def test_approximate_total(self):
+        query = data_util.Query(None, None, None, 'hunger', None)
+        result, errors = self._actual.execute_approximate(query)
+        self.assertEqual(result.get_total_count(), 2)
+        self.assertEqual(errors['tags'], 0)
+
+    def test_approximate_empty(self):
+        query = data_util.Query(None, None, 'Peru', 'hunger', None)
+        result, errors = self._actual.execute_approximate(query)
+        self.assertEqual(result.get_total_count(), 0)
+        self.assertEqual(result.get_keywords(), [])
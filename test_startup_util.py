@@ -0,0 +1,32 @@
+"""Tests for utilities which load startup assets concurrently.
+
+License: BSD
+"""
+
+import unittest
+
+import startup_util
+
+
+class AssetLoaderTests(unittest.TestCase):
+
+    def test_get(self):
+        loader = startup_util.AssetLoader({'a': lambda: 1, 'b': lambda: 'b'})
+        loader.start()
+        self.assertEqual(loader.get('a'), 1)
+        self.assertEqual(loader.get('b'), 'b')
+        self.assertEqual(set(loader.get_timings().keys()), {'a', 'b'})
+
+    def test_error(self):
+        def fail():
+            raise ValueError('test')
+
+        loader = startup_util.AssetLoader({'a': fail})
+        loader.start()
+        with self.assertRaises(ValueError):
+            loader.get('a')
+
+    def test_not_started(self):
+        loader = startup_util.AssetLoader({'a': lambda: 1})
+        with self.assertRaises(RuntimeError):
+            loader.get('a')
@@ -28,3 +28,24 @@ class TestStatGenerator(unittest.TestCase):
             'dimension': 'country'
         })
         self.assertTrue(result['Australia'] > 0)
+
+    def test_approximate_matches_exact(self):
+        inner_getter = article_getter.LocalArticleGetter()
+        generator = article_stat_gen.StatGenerator(inner_getter)
+        params = {'keyword': 'security', 'dimension': 'tag'}
+        exact = generator.execute(params)
+        approximate = generator.execute_approximate(params, 20)
+
+        self.assertEqual(len(approximate), 20)
+        for name, estimate in approximate.items():
+            self.assertTrue(estimate.get_low() <= exact[name] <= estimate.get_high())
+
+    def test_approximate_param(self):
+        inner_getter = article_getter.LocalArticleGetter()
+        generator = article_stat_gen.StatGenerator(inner_getter)
+        result = generator.execute({
+            'keyword': 'security',
+            'dimension': 'country',
+            'approximate': 'true'
+        })
+        self.assertTrue(result['Australia'] > 0)
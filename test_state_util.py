@@ -20,6 +20,19 @@ class StateUtilTest(unittest.TestCase):
         state.toggle_category_selected('test')
         self.assertIsNone(state.get_category_selected())
 
+    def test_toggle_included(self):
+        state = state_util.VizState()
+        state.toggle_country_included('b')
+        state.toggle_country_included('a')
+        self.assertEqual(state.get_country_selected(), 'a;b')
+        self.assertEqual(state.get_query().get_countries(), frozenset(['a', 'b']))
+
+        state.toggle_country_included('b')
+        self.assertEqual(state.get_country_selected(), 'a')
+
+        state.set_country_selected('c;d')
+        self.assertEqual(state.get_countries_selected(), frozenset(['c', 'd']))
+
     def test_get_query(self):
         state = state_util.VizState()
         query = state.get_query()
@@ -39,3 +52,33 @@ class StateUtilTest(unittest.TestCase):
 
         state_2.toggle_category_selected('test')
         self.assertEqual(state_1.serialize(), state_2.serialize())
+
+    def test_snapshot_version(self):
+        state = state_util.VizState()
+        snapshot = state.get_snapshot()
+
+        state.set_category_hovering('test')
+        self.assertIs(state.get_snapshot(), snapshot)
+
+        state.toggle_category_selected('test')
+        changed = state.get_snapshot()
+        self.assertGreater(changed.get_version(), snapshot.get_version())
+        self.assertEqual(changed.get_query().get_pre_category(), 'test')
+        self.assertIsNone(snapshot.get_query().get_pre_category())
+
+    def test_subscription(self):
+        state = state_util.VizState()
+        subscription = state.subscribe()
+        self.assertTrue(subscription.get_is_stale())
+        self.assertIsNotNone(subscription.take())
+        self.assertIsNone(subscription.take())
+
+        state.toggle_tag_included('test')
+        self.assertTrue(subscription.get_is_stale())
+        taken = subscription.take()
+        assert taken is not None
+        self.assertEqual(taken.get_query().get_tags(), frozenset(['test']))
+        self.assertFalse(subscription.get_is_stale())
+
+        subscription.reset()
+        self.assertIsNotNone(subscription.take())
@@ -0,0 +1,59 @@
+"""Tests for deploy-time generation of static statistics files.
+
+License: BSD
+"""
+
+import unittest
+
+import accessor_stat_gen
+import article_getter
+import article_stat_gen
+import data_util
+import serialized_gen
+import static_stat_gen
+
+SAMPLE_STEP = 50
+
+
+class StaticStatGenTests(unittest.TestCase):
+
+    def setUp(self):
+        self._accessor = static_stat_gen.load_accessor()
+
+    def test_filter_tasks(self):
+        tasks = static_stat_gen.get_filter_tasks(self._accessor)
+        self.assertEqual(tasks[0], ('all', 'all'))
+        self.assertTrue(('keyword', 'security') in tasks)
+
+    def test_generate_for_filter(self):
+        generator = accessor_stat_gen.AccessorStatGenerator(self._accessor)
+        csvs = static_stat_gen.generate_for_filter(generator, ('keyword', 'security'))
+        self.assertEqual(set(csvs.keys()), set(static_stat_gen.DIMENSIONS))
+        self.assertTrue(csvs['keyword'].startswith('name,percent'))
+        self.assertTrue('security,1.0' in csvs['keyword'])
+
+    def test_content_filename(self):
+        filename_1 = static_stat_gen.get_content_filename('a')
+        filename_2 = static_stat_gen.get_content_filename('b')
+        self.assertEqual(filename_1, static_stat_gen.get_content_filename('a'))
+        self.assertNotEqual(filename_1, filename_2)
+        self.assertTrue(filename_1.endswith('.csv'))
+
+    def test_matches_lambda(self):
+        lines = serialized_gen.build(serialized_gen.DEFAULT_ARTICLES_PATH, None, 1)
+        accessor = data_util.CompressedDataAccessor(lines)
+        static_generator = accessor_stat_gen.AccessorStatGenerator(accessor)
+        lambda_generator = article_stat_gen.StatGenerator(article_getter.PreloadedArticleGetter())
+
+        tasks = static_stat_gen.get_filter_tasks(accessor)[::SAMPLE_STEP]
+        for filter_name, filter_value in tasks:
+            for dimension in static_stat_gen.DIMENSIONS:
+                params = {'dimension': dimension}
+                if filter_name != static_stat_gen.NO_FILTER:
+                    params[filter_name] = filter_value
+
+                self.assertEqual(
+                    static_generator.execute(params),
+                    lambda_generator.execute(params),
+                    params
+                )
@@ -3,26 +3,52 @@
 Main entry point for the news article visualization, logic which can be used through import or
 through CLI invocation. If used from command line, takes an optional argument for mode where
 interactive means run interactively and static means execute in static mode, outputting an image.
-This is typically used for testing. If the mode is not interactive or static, defaults to static.
+This is typically used for testing. If the mode is timing, executes in static mode and prints how
+long each component took to load. If the mode is not interactive, static, or timing, defaults to
+static.
+
+Only the overview is built at startup. Other movements are built the first time they are shown such
+that launch does not wait on queries and tables for views the user may never open.
+
+Filter changes are kept in an undo / redo history (z to undo, y to redo, and h to export the history
+for replay with history_util) whose steps keep their results such that going back does not execute
+queries again.
 
 License: BSD
 """
 
 import os
 import sys
+import time
 import typing
 
 import sketchingpy
+import sketchingpy.data_struct
 
+import abstract
 import article_preview_viz
+import basemap_util
 import const
 import data_util
 import grid_viz
+import history_util
 import overview_viz
+import reload_util
 import selection_viz
+import shard_util
+import startup_util
 import state_util
 import table_util
 
+HISTORY_PATH = 'history.json'
+
+SELECTORS = {
+    'country': selection_viz.CountrySelectionMovement,
+    'category': selection_viz.CategorySelectionMovement,
+    'tag': selection_viz.TagSelectionMovement,
+    'keyword': selection_viz.KeywordSelectionMovement
+}
+
 
 class NewsVisualization:
     """Create a new news metadata visualization."""
@@ -50,43 +76,43 @@ class NewsVisualization:
         self._movement = 'overview'
         self._button_hover = 'none'
         self._last_major_movement = 'overview'
+        self._movements: typing.Dict[str, abstract.VizMovement] = {}
+        self._subscriptions: typing.Dict[str, state_util.Subscription] = {}
+        self._timings: typing.Dict[str, float] = {}
 
+        assets_start = time.perf_counter()
         data_layer = self._sketch.get_data_layer()
         assert data_layer is not None
         path = os.path.join('txt', 'serialized.txt')
-        compressed_data = data_layer.get_text(path)
-        compressed_lines = compressed_data.split('\n')
-        self._accessor = data_util.CompressedDataAccessor(compressed_lines)
-
-        self._overview = overview_viz.OverviewViz(self._sketch, self._accessor, self._state)
-        self._grid = grid_viz.GridViz(self._sketch, self._accessor, self._state)
-        self._selectors = {
-            'country': selection_viz.CountrySelectionMovement(
-                self._sketch,
-                self._accessor,
-                self._state
-            ),
-            'category': selection_viz.CategorySelectionMovement(
-                self._sketch,
-                self._accessor,
-                self._state
-            ),
-            'tag': selection_viz.TagSelectionMovement(
-                self._sketch,
-                self._accessor,
-                self._state
-            ),
-            'keyword': selection_viz.KeywordSelectionMovement(
-                self._sketch,
-                self._accessor,
-                self._state
+        manifest = startup_util.load_manifest(data_layer)
+        assets = startup_util.AssetLoader({
+            'data': lambda: load_startup_accessor(data_layer, path, manifest.resolve),
+            'map': lambda: basemap_util.load_source(
+                data_layer,
+                const.MAP_CENTER_X,
+                const.MAP_CENTER_Y,
+                manifest.resolve
             )
-        }
-        self._article_preview = article_preview_viz.ArticlePreviewViz(
-            self._sketch,
-            self._accessor,
-            self._state
-        )
+        })
+        assets.start()
+
+        self._accessor = data_util.SwappableDataAccessor(assets.get('data'))
+        self._history = history_util.History(self._state.get_snapshot().get_filters())
+        self._history_accessor = history_util.HistoryDataAccessor(self._accessor, self._history)
+        self._map_source: basemap_util.MapSource = assets.get('map')
+        self._timings.update(assets.get_timings())
+        self._timings['assets'] = time.perf_counter() - assets_start
+
+        self._serialized_path = path
+        self._reloader: typing.Optional[reload_util.Reloader] = None
+        if self._interactive and reload_util.reload_available:
+            self._reloader = reload_util.Reloader(
+                [path, data_util.ARTICLES_PATH],
+                lambda: load_accessor(path),
+                appendable=[path, data_util.ARTICLES_PATH]
+            )
+
+        self._get_movement('overview')
 
         if self._interactive:
             self._sketch.on_step(lambda sketch: self._draw())
@@ -96,33 +122,80 @@ class NewsVisualization:
                 lambda button: self._respond_to_click(button)  # type: ignore
             )
 
+            keyboard = self._sketch.get_keyboard()
+            if keyboard is not None:
+                keyboard.on_key_press(
+                    lambda button: self._respond_to_key(button)  # type: ignore
+                )
+
         self._table_counter = 0
         self._overlaid = False
 
+        table_start = time.perf_counter()
         table_util.create_dotted_line(self._sketch)
+        self._timings['tables'] = time.perf_counter() - table_start
 
     def show(self):
         """Display this visualization or save image if not interactive."""
         if self._interactive:
             self._sketch.show()
         else:
-            self._draw()
-            self._sketch.save_image('static.png')
+            self.save_image('static.png')
+
+    def get_state(self) -> state_util.VizState:
+        """Get the global visualization state.
+
+        Returns:
+            State object shared by all movements in this visualization.
+        """
+        return self._state
+
+    def get_timings(self) -> typing.Dict[str, float]:
+        """Get how long each component took to load.
+
+        Returns:
+            Mapping from component to seconds spent building it in the order loaded. Components are
+            the startup assets (data and map, loaded concurrently, along with assets for the wall
+            time of loading both), tables, and movements by name once shown.
+        """
+        return dict(self._timings)
+
+    def set_movement(self, movement: str):
+        """Change the movement shown and refresh data to reflect the current state.
+
+        Args:
+            movement: Name of the movement to show like overview, grid, or the name of a selector
+                (country, category, tag, keyword).
+        """
+        target_viz = self._get_movement(movement)
+
+        self._movement = movement
+        if movement in ['overview', 'grid']:
+            self._last_major_movement = movement
+
+        self._refresh_data()
+        target_viz.on_change_to()
+
+        self._changed = True
+        self._drawn = False
+
+    def save_image(self, path: str):
+        """Draw the current movement and save it to an image file.
+
+        Args:
+            path: The path at which the image should be written.
+        """
+        self._changed = True
+        self._draw()
+        self._sketch.save_image(path)
 
     def _draw(self):
+        self._check_reload()
+
         self._sketch.push_transform()
         self._sketch.push_style()
 
-        movements = {
-            'overview': self._overview,
-            'grid': self._grid,
-            'download': self._article_preview
-        }
-
-        for name in self._selectors:
-            movements[name] = self._selectors[name]
-
-        target_viz = movements[self._movement]
+        target_viz = self._get_movement(self._movement)
 
         self._check_mouse_pos()
 
@@ -140,17 +213,7 @@ class NewsVisualization:
         self._sketch.pop_transform()
 
     def _check_mouse_pos(self, force=False):
-        movements = {
-            'overview': self._overview,
-            'grid': self._grid,
-            'download': self._article_preview,
-            'country': self._selectors['country'],
-            'category': self._selectors['category'],
-            'tag': self._selectors['tag'],
-            'keyword': self._selectors['keyword']
-        }
-
-        target_viz = movements[self._movement]
+        target_viz = self._get_movement(self._movement)
 
         if self._interactive:
             mouse = self._sketch.get_mouse()
@@ -205,27 +268,38 @@ class NewsVisualization:
 
         self._check_mouse_pos(force=True)
 
+        # Holding shift adds to or removes from a filter instead of replacing it.
+        including = self._get_is_shift_held()
+
         category = self._state.get_category_hovering()
         if category == 'All':
             self._state.set_category_selected(None)
+        elif category is not None and including:
+            self._state.toggle_category_included(category)
         elif category is not None:
             self._state.toggle_category_selected(category)
 
         country = self._state.get_country_hovering()
         if country == 'All':
             self._state.set_country_selected(None)
+        elif country is not None and including:
+            self._state.toggle_country_included(country)
         elif country is not None:
             self._state.toggle_country_selected(country)
 
         keyword = self._state.get_keyword_hovering()
         if keyword == 'All':
             self._state.set_keyword_selected(None)
+        elif keyword is not None and including:
+            self._state.toggle_keyword_included(keyword)
         elif keyword is not None:
             self._state.toggle_keyword_selected(keyword)
 
         tag = self._state.get_tag_hovering()
         if tag == 'All':
             self._state.set_tag_selected(None)
+        elif tag is not None and including:
+            self._state.toggle_tag_included(tag)
         elif tag is not None:
             self._state.toggle_tag_selected(tag)
 
@@ -239,48 +313,159 @@ class NewsVisualization:
             else:
                 self._movement = self._last_major_movement
 
-            if self._movement == 'grid':
-                self._grid.on_change_to()
-            elif self._movement == 'overview':
-                self._overview.on_change_to()
+            if self._movement in ['grid', 'overview']:
+                self._get_movement(self._movement).on_change_to()
             else:
                 raise RuntimeError('Unexpected movement.')
         elif self._button_hover == 'countries':
             self._state.set_country_selected(None)
             self._movement = 'country'
-            self._selectors['country'].on_change_to()
+            self._get_movement('country').on_change_to()
         elif self._button_hover == 'categories':
             self._state.set_category_selected(None)
             self._movement = 'category'
-            self._selectors['category'].on_change_to()
+            self._get_movement('category').on_change_to()
         elif self._button_hover == 'tags':
             self._state.set_tag_selected(None)
             self._movement = 'tag'
-            self._selectors['tag'].on_change_to()
+            self._get_movement('tag').on_change_to()
         elif self._button_hover == 'keywords':
             self._state.set_keyword_selected(None)
             self._movement = 'keyword'
-            self._selectors['keyword'].on_change_to()
+            self._get_movement('keyword').on_change_to()
         elif self._button_hover == 'download':
             if self._movement == 'download':
                 self._download_articles()
-            elif self._movement in self._selectors:
+            elif self._movement in SELECTORS:
                 self._ask_manual()
             else:
                 self._movement = 'download'
-                self._article_preview.on_change_to()
+                self._get_movement('download').on_change_to()
         elif self._movement not in ['grid', 'overview', 'download'] and not self._overlaid:
             self._movement = self._last_major_movement
 
-        self._grid.refresh_data()
-        self._overview.refresh_data()
+        self._refresh_data()
+
+        self._changed = True
+        self._drawn = False
+
+    def _respond_to_key(self, button):
+        if self._overlaid:
+            return
 
-        for selector in self._selectors.values():
-            selector.refresh_data()
+        name = button.get_name()
+        if name == 'z':
+            filters = self._history.undo()
+        elif name == 'y':
+            filters = self._history.redo()
+        elif name == 'h':
+            self._sketch.get_data_layer().write_json(self._history.export(), HISTORY_PATH)
+            return
+        else:
+            return
+
+        if filters is None:
+            return
+
+        self._state.restore(filters)
+        if self._movement == 'download':
+            self._movement = self._last_major_movement
+
+        self._refresh_data()
 
         self._changed = True
         self._drawn = False
 
+    def _get_is_shift_held(self) -> bool:
+        keyboard = self._sketch.get_keyboard()
+        if keyboard is None:
+            return False
+
+        names = map(lambda x: x.get_name(), keyboard.get_keys_pressed())
+        return 'shift' in names
+
+    def _check_reload(self):
+        if self._reloader is None:
+            return
+
+        self._reloader.check()
+        new_accessor = self._reloader.take()
+        if new_accessor is not None:
+            self._accessor.swap(new_accessor)
+
+        delta = self._reloader.take_delta()
+        delta_lines = [] if delta is None else delta.get(self._serialized_path, [])
+        if len(delta_lines) > 0:
+            inner = self._accessor.get_inner()
+            if isinstance(inner, data_util.CompressedDataAccessor):
+                inner.apply_delta(delta_lines)
+            else:
+                self._accessor.swap(load_accessor(self._serialized_path))
+
+        # Offsets into a grown article table are checked again by the accessor.
+        if new_accessor is None and delta is None:
+            return
+
+        self._history.clear_results()
+        if 'download' in self._movements:
+            self._get_article_preview().reset()
+
+        for subscription in self._subscriptions.values():
+            subscription.reset()
+
+        self._refresh_data()
+        self._changed = True
+
+    def _get_movement(self, name: str) -> abstract.VizMovement:
+        movement = self._movements.get(name, None)
+        if movement is not None:
+            return movement
+
+        start = time.perf_counter()
+        movement = self._build_movement(name)
+        self._timings[name] = time.perf_counter() - start
+
+        # Movements load the current data when built.
+        subscription = self._state.subscribe()
+        subscription.take()
+        self._subscriptions[name] = subscription
+
+        self._movements[name] = movement
+        return movement
+
+    def _build_movement(self, name: str) -> abstract.VizMovement:
+        if name == 'overview':
+            return overview_viz.OverviewViz(
+                self._sketch,
+                self._history_accessor,
+                self._state,
+                self._map_source
+            )
+        elif name == 'grid':
+            return grid_viz.GridViz(self._sketch, self._history_accessor, self._state)
+        elif name == 'download':
+            return article_preview_viz.ArticlePreviewViz(self._sketch, self._accessor, self._state)
+        elif name in SELECTORS:
+            return SELECTORS[name](self._sketch, self._history_accessor, self._state)
+        else:
+            raise RuntimeError('Unexpected movement.')
+
+    def _get_article_preview(self) -> article_preview_viz.ArticlePreviewViz:
+        movement = self._get_movement('download')
+        return typing.cast(article_preview_viz.ArticlePreviewViz, movement)
+
+    def _refresh_data(self):
+        self._history.record(self._state.get_snapshot().get_filters())
+
+        # Only the movement shown refreshes and only if the filters changed since it last did.
+        # Hidden movements catch up when shown and the preview loads on draw.
+        if self._movement == 'download':
+            return
+
+        movement = self._get_movement(self._movement)
+        if self._subscriptions[self._movement].take() is not None:
+            movement.refresh_data()
+
     def _draw_footer(self):
         self._sketch.push_transform()
         self._sketch.push_style()
@@ -400,25 +585,17 @@ class NewsVisualization:
     def _get_secondary_text(self) -> str:
         if self._movement == 'download':
             return 'Download All >'
-        elif self._movement in self._selectors:
+        elif self._movement in SELECTORS:
             return 'Enter Manually >'
         else:
             return 'Get Articles >'
 
     def _download_articles(self):
-        self._article_preview.download_articles()
+        self._get_article_preview().download_articles()
 
     def _ask_manual(self):
         self._overlaid = True
-        movement = {
-            'overview': self._overview,
-            'grid': self._grid,
-            'download': self._article_preview,
-            'country': self._selectors['country'],
-            'category': self._selectors['category'],
-            'tag': self._selectors['tag'],
-            'keyword': self._selectors['keyword']
-        }[self._movement]
+        movement = self._get_movement(self._movement)
         movement.lock()
 
         def callback(value_cased):
@@ -436,23 +613,57 @@ class NewsVisualization:
             elif self._movement == 'keyword':
                 self._state.set_keyword_selected(value)
 
-            self._grid.refresh_data()
-            self._overview.refresh_data()
-
-            for selector in self._selectors.values():
-                selector.refresh_data()
+            self._movement = self._last_major_movement
+            self._refresh_data()
 
             self._changed = True
             self._drawn = False
 
-            self._movement = self._last_major_movement
-
             self._overlaid = False
             movement.unlock()
 
         self._sketch.get_dialog_layer().show_prompt('Enter term:', callback)
 
 
+def load_startup_accessor(data_layer: sketchingpy.data_struct.DataLayer, path: str,
+    resolve: startup_util.RESOLVER) -> data_util.DataAccessor:
+    """Load the accessor used when the visualization starts.
+
+    Args:
+        data_layer: The data layer from which the compressed file or its shards are read.
+        path: Path to the compressed file like txt/serialized.txt.
+        resolve: Function which maps paths of assets to the paths from which they should be fetched
+            like startup_util.Manifest.resolve.
+
+    Returns:
+        Accessor which loads shards on demand if preferred and available or, otherwise, which is
+        fully loaded from the compressed file.
+    """
+    def get_text(target: str) -> str:
+        return data_layer.get_text(resolve(target))
+
+    if shard_util.sharded_preferred:
+        sharded = shard_util.load_sharded(get_text)
+        if sharded is not None:
+            return sharded
+
+    compressed_data = get_text(path)
+    return data_util.CompressedDataAccessor(compressed_data.split('\n'))
+
+
+def load_accessor(path: str) -> data_util.CompressedDataAccessor:
+    """Load an accessor from a compressed file on the local file system.
+
+    Args:
+        path: Path to the compressed file like txt/serialized.txt.
+
+    Returns:
+        Fully loaded accessor.
+    """
+    with open(path) as f:
+        return data_util.CompressedDataAccessor(f.read().split('\n'))
+
+
 def main():
     """Entry point for the visualization script if run outside browser."""
     if len(sys.argv) > 1:
@@ -464,6 +675,10 @@ def main():
     visualization = NewsVisualization(interactive=is_interactive)
     visualization.show()
 
+    if mode == 'timing':
+        for name, seconds in visualization.get_timings().items():
+            print('%s: %.3f s' % (name, seconds))
+
 
 if __name__ == '__main__':
     main()